@@ -0,0 +1,294 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from numpy_model import NumpyPokerModel
+from opponent_model import OPPONENT_FEATURES
+from replay import ReplayBuffer, RolloutCollector
+from vec_env import OBSERVATION_SIZE, VectorPokerEnv
+
+# Byte alignment of each array inside a shared block
+ALIGNMENT = 64
+# Seats at every self-play table
+SEATS = 6
+
+
+class SharedBlock:
+    def __init__(self, specs, name=None):
+        """
+        Named arrays laid out in one shared-memory segment, so they can be shared between processes.
+        :param specs: List of (name, shape, dtype) tuples.
+        :param name: Name of an existing segment to attach to; a new segment is created when None.
+        """
+        self.specs = specs
+        offsets = []
+        size = 0
+        for _, shape, dtype in specs:
+            offsets.append(size)
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            size += -(-nbytes // ALIGNMENT) * ALIGNMENT
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 1))
+        self.name = self.shm.name
+        self.arrays = {array_name: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offset)
+                       for (array_name, shape, dtype), offset in zip(specs, offsets)}
+        if self.owner:
+            for array in self.arrays.values():
+                array.fill(0)
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def replay_specs(num_actors, capacity, state_size=OBSERVATION_SIZE):
+    """
+    Layout of the shared replay memory: one ring region of `capacity` transitions per actor, and
+    per-actor counts of transitions written.
+    """
+    total = num_actors * capacity
+    return [("states", (total, state_size), np.float32), ("actions", (total,), np.int64),
+            ("rewards", (total,), np.float32), ("next_states", (total, state_size), np.float32),
+            ("dones", (total,), np.float32), ("written", (num_actors,), np.int64)]
+
+
+def weight_specs(parameter_shapes):
+    """
+    Layout of the published weights: the flattened parameters, a version counter and a stop flag.
+    """
+    count = sum(int(np.prod(shape)) for _, shape in parameter_shapes)
+    return [("weights", (count,), np.float32), ("version", (1,), np.int64), ("stop", (1,), np.int64)]
+
+
+def write_window(num_tables, steps_per_round):
+    """
+    Most transitions an actor stores in one round: at every step, each table stores at most the acting
+    seat's previous decision and one transition per seat of a finished hand.
+    """
+    return steps_per_round * num_tables * (SEATS + 1)
+
+
+class SharedReplayBuffer(ReplayBuffer):
+    def __init__(self, block, num_actors, capacity, batch_size=256, seed=None, window=0):
+        """
+        The learner's view of every actor's region of the shared replay memory.
+        Minibatches are drawn uniformly over the filled entries, except those an actor may be
+        overwriting while they are copied, which would give torn transitions (see `sample`).
+        :param window: Most transitions an actor writes per round (see write_window).
+        """
+        super().__init__(num_actors * capacity, batch_size=batch_size, seed=seed,
+                         arrays={name: block.arrays[name] for name in
+                                 ("states", "actions", "rewards", "next_states", "dones")})
+        self.region_capacity = capacity
+        self.window = window
+        self.written = block.arrays["written"]
+
+    def _regions(self, written):
+        """
+        Each actor's ring head follows from its published count of written transitions. The round in
+        progress writes at most one window past that head, and the count may be one round behind, so
+        the oldest entries within two windows of the head are skipped.
+        :param written: Snapshot of the per-actor counts of written transitions.
+        :return: Per-actor (filled entries, skipped oldest entries, entries that may be sampled).
+        """
+        sizes = np.minimum(written, self.region_capacity)
+        skip = np.clip(sizes + 2 * self.window - self.region_capacity, 0, sizes)
+        return sizes, skip, sizes - skip
+
+    def sample(self):
+        capacity = self.region_capacity
+        written = self.written.copy()
+        sizes, skip, counts = self._regions(written)
+        ends = np.cumsum(counts)
+        picks = self.rng.integers(0, ends[-1], size=len(self.batch["actions"]))
+        region = np.searchsorted(ends, picks, side="right")
+        # Position in the region counted from its oldest entry, mapped back to the ring
+        age = skip[region] + picks - (ends[region] - counts[region])
+        index = region * capacity + (written[region] - sizes[region] + age) % capacity
+        for name, out in self.batch.items():
+            np.take(getattr(self, name), index, axis=0, out=out)
+        return self.batch
+
+    def __len__(self):
+        """
+        Number of entries `sample` draws from, so a buffer with a length is safe to sample.
+        """
+        return int(self._regions(self.written.copy())[2].sum())
+
+
+def publish_weights(block, model):
+    """
+    Copies the model's parameters into the shared weights. The version is odd while the copy is
+    in progress, so readers can detect and skip a half-written update (a sequence lock).
+    """
+    weights = block.arrays["weights"]
+    version = block.arrays["version"]
+    flat = np.concatenate([tensor.detach().numpy().ravel() for tensor in model.state_dict().values()])
+    version[0] += 1
+    weights[:] = flat
+    version[0] += 1
+
+
+def read_weights(block, parameter_shapes, last_version):
+    """
+    Reads a consistent copy of the published weights if they changed since `last_version`.
+    :return: (version, NumpyPokerModel), or (last_version, None) if there is nothing new to read.
+    """
+    version = int(block.arrays["version"][0])
+    if version == last_version or version % 2:
+        return last_version, None
+    flat = block.arrays["weights"].copy()
+    if int(block.arrays["version"][0]) != version:
+        return last_version, None
+    state_dict = {}
+    start = 0
+    for name, shape in parameter_shapes:
+        size = int(np.prod(shape))
+        state_dict[name] = flat[start:start + size].reshape(shape)
+        start += size
+    return version, NumpyPokerModel.from_state_dict(state_dict)
+
+
+def actor_loop(actor_id, replay_name, weights_name, num_actors, capacity, parameter_shapes, num_tables,
+               steps_per_round, epsilon, seed, opponent_model=False):
+    """
+    Self-play worker: plays VectorPokerEnv tables with the latest published weights (run by the NumPy
+    backend, so actors never import torch) and writes transitions into its region of the replay memory.
+    """
+    env = VectorPokerEnv(num_tables, SEATS, seed=seed, opponent_model=opponent_model)
+    replay = SharedBlock(replay_specs(num_actors, capacity, env.observation_size), replay_name)
+    shared_weights = SharedBlock(weight_specs(parameter_shapes), weights_name)
+    region = slice(actor_id * capacity, (actor_id + 1) * capacity)
+    buffer = ReplayBuffer(capacity, batch_size=1, arrays={name: replay.arrays[name][region] for name in
+                                                          ("states", "actions", "rewards", "next_states", "dones")})
+    collector = RolloutCollector(env, buffer)
+    written = replay.arrays["written"]
+    stop = shared_weights.arrays["stop"]
+    version, policy = -1, None
+    try:
+        while not stop[0]:
+            version, model = read_weights(shared_weights, parameter_shapes, version)
+            if model is not None:
+                policy = model
+            if policy is None:
+                time.sleep(0.01)
+                continue
+            stored = collector.collect(policy, steps_per_round, epsilon)
+            written[actor_id] += stored
+    finally:
+        del buffer, collector, written, stop
+        replay.close()
+        shared_weights.close()
+
+
+def run_actor_learner(num_steps, output="trained_model_learner.pth", num_actors=None, tables_per_actor=256,
+                      capacity_per_actor=100000, batch_size=512, steps_per_round=8, epsilon=0.1,
+                      publish_every=50, checkpoint_every=1000, initial_checkpoint=None, seed=0,
+                      opponent_model=False):
+    """
+    Trains a PokerAIModel with one learner (this process) and several self-play actor processes that
+    share the replay memory and the weights through shared memory. The learner never stops the actors:
+    it publishes new weights every `publish_every` steps and the actors pick them up between rounds.
+    :param num_steps: Number of minibatch updates.
+    :param output: Checkpoint path; written every `checkpoint_every` steps and at the end as a plain
+                   state dict, loadable like trained_model_*.pth.
+    :param num_actors: Number of actor processes (defaults to the CPU count minus one for the learner).
+    :param initial_checkpoint: Optional checkpoint to start from.
+    :param opponent_model: Train on observations with the opponent features (see VectorPokerEnv).
+    :return: Dictionary with the elapsed seconds and collected and trained transitions per second.
+    """
+    import torch
+    from rl_model import PokerAIModel
+    from training import QTrainer
+
+    num_actors = num_actors or max(1, (os.cpu_count() or 2) - 1)
+    window = write_window(tables_per_actor, steps_per_round)
+    if capacity_per_actor <= 2 * window:
+        raise ValueError(f"The replay capacity per actor must exceed {2 * window} transitions, twice what an actor "
+                         f"can write in one round.")
+    torch.manual_seed(seed)
+    state_size = OBSERVATION_SIZE + (OPPONENT_FEATURES if opponent_model else 0)
+    model = PokerAIModel(input_size=state_size, action_size=3)
+    if initial_checkpoint:
+        model.load_state_dict(torch.load(initial_checkpoint, weights_only=True))
+    parameter_shapes = [(name, tuple(tensor.shape)) for name, tensor in model.state_dict().items()]
+    replay = SharedBlock(replay_specs(num_actors, capacity_per_actor, state_size))
+    shared_weights = SharedBlock(weight_specs(parameter_shapes))
+    buffer = SharedReplayBuffer(replay, num_actors, capacity_per_actor, batch_size, seed, window)
+    trainer = QTrainer(model)
+    publish_weights(shared_weights, model)
+
+    def save_checkpoint():
+        temporary = output + ".tmp"
+        torch.save(model.state_dict(), temporary)
+        os.replace(temporary, output)
+
+    context = multiprocessing.get_context("spawn")
+    actor_seeds = np.random.SeedSequence(seed).spawn(num_actors)
+    actors = [context.Process(target=actor_loop, daemon=True,
+                              args=(i, replay.name, shared_weights.name, num_actors, capacity_per_actor,
+                                    parameter_shapes, tables_per_actor, steps_per_round, epsilon, actor_seeds[i],
+                                    opponent_model))
+              for i in range(num_actors)]
+    for actor in actors:
+        actor.start()
+    start = time.perf_counter()
+    try:
+        while len(buffer) < batch_size:
+            if not any(actor.is_alive() for actor in actors):
+                raise RuntimeError("Every actor process exited before producing transitions.")
+            time.sleep(0.01)
+        for step in range(1, num_steps + 1):
+            trainer.train_step(buffer)
+            if step % publish_every == 0:
+                publish_weights(shared_weights, model)
+            if step % checkpoint_every == 0:
+                save_checkpoint()
+        save_checkpoint()
+    finally:
+        shared_weights.arrays["stop"][0] = 1
+        for actor in actors:
+            actor.join(timeout=10)
+            if actor.is_alive():
+                actor.terminate()
+        elapsed = time.perf_counter() - start
+        collected = int(replay.arrays["written"].sum())
+        del buffer
+        replay.close()
+        shared_weights.close()
+    return {"actors": num_actors, "steps": num_steps, "seconds": elapsed,
+            "collected_per_second": collected / elapsed, "trained_per_second": num_steps * batch_size / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actor-learner self-play training over shared memory.")
+    parser.add_argument("--steps", type=int, default=5000, help="Learner minibatch updates")
+    parser.add_argument("--actors", type=int, default=None, help="Actor processes (default: CPU count - 1)")
+    parser.add_argument("--tables", type=int, default=256, help="Tables per actor")
+    parser.add_argument("--capacity", type=int, default=100000, help="Replay capacity per actor")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--publish-every", type=int, default=50)
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--init", help="Checkpoint to start from")
+    parser.add_argument("--output", default="trained_model_learner.pth")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opponent-model", action="store_true",
+                        help="Add the opponent features to the observations, for `main.py --opponent-model`")
+    args = parser.parse_args()
+
+    result = run_actor_learner(args.steps, args.output, args.actors, args.tables, args.capacity, args.batch_size,
+                               publish_every=args.publish_every, checkpoint_every=args.checkpoint_every,
+                               initial_checkpoint=args.init, seed=args.seed, opponent_model=args.opponent_model)
+    print(f"{result['steps']} updates with {result['actors']} actors in {result['seconds']:.1f}s: "
+          f"{result['collected_per_second']:.0f} transitions/second collected, "
+          f"{result['trained_per_second']:.0f} transitions/second trained. Model saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
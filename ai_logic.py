@@ -1,41 +1,164 @@
-import random
-
 import numpy as np
-import torch
+
+from equity import (MAX_PREFLOP_OPPONENTS, PREFLOP_TABLE_FILE, EquityCache, cached_equity, canonical_key,
+                    estimate_equity, load_preflop_table, preflop_equity)
+from utils import cards_to_ints
+
+ACTIONS = ("fold", "call", "raise")
+
+
+class DecisionCache(EquityCache):
+    def __init__(self, max_size=100000, state_step=1 / 32, pot_odds_buckets=20):
+        """
+        Size-bounded LRU cache of bot decisions keyed on a quantized, canonical state, so that
+        effectively identical decisions skip the equity estimate or the model forward pass.
+        Model decisions are keyed on the encoded state rounded down to multiples of `state_step`;
+        heuristic decisions on the suit-canonical cards (which fix the street), the number of
+        opponents and the pot-odds bucket (the heuristic does not depend on position).
+        Entries are dropped whenever the model's weights change.
+        :param max_size: Maximum number of entries kept before the least recently used is evicted.
+        :param state_step: Quantization step of the model's state features.
+        :param pot_odds_buckets: Number of equal-width pot-odds buckets.
+        """
+        super().__init__(max_size)
+        self.state_scale = 1.0 / state_step
+        self.pot_odds_buckets = pot_odds_buckets
+        self.model_version = None
+        self.invalidations = 0
+
+    def state_key(self, state):
+        """
+        Quantizes an encoded model state: every feature is multiplied by state_scale (1 / state_step)
+        and floored, so features within the same step share a value, and stored as int16 to keep keys
+        short. int16 holds features up to 32767 steps (1023 at the default step); the encoder's
+        features lie in [-1, 1].
+        :param state: Encoded state vector, as passed to the model.
+        :return: Bytes of the int16 feature steps.
+        """
+        return np.floor(np.asarray(state, dtype=np.float32) * self.state_scale).astype(np.int16).tobytes()
+
+    def heuristic_key(self, hole_cards, community_cards, num_opponents, pot_odds):
+        """
+        Key of a heuristic decision. Pot odds fall into pot_odds_buckets equal-width buckets over
+        [0, 1), bucket int(pot_odds * pot_odds_buckets); pot odds of 1 or more go to the last bucket.
+        :param hole_cards: The AI's 2 hole cards as ints.
+        :param community_cards: Community cards as ints.
+        :param num_opponents: Number of opponents still in the hand.
+        :param pot_odds: Pot odds in [0, 1], as from utils.calculate_pot_odds.
+        :return: (suit-canonical cards, number of opponents, pot-odds bucket).
+        """
+        bucket = min(int(pot_odds * self.pot_odds_buckets), self.pot_odds_buckets - 1)
+        return canonical_key(hole_cards, community_cards), num_opponents, bucket
+
+    def check_model(self, model):
+        """
+        Clears the cache if the model's weights changed since the last check. Torch parameters count
+        their in-place updates (optimizer steps, load_state_dict), so a change is detected without
+        comparing weights; models without parameters (e.g. NumpyPokerModel) never change.
+        """
+        parameters = getattr(model, "parameters", None)
+        version = (id(model), tuple(parameter._version for parameter in parameters()) if parameters else None)
+        if version != self.model_version:
+            if self.model_version is not None:
+                self.invalidate()
+            self.model_version = version
+
+    def invalidate(self):
+        """
+        Drops every entry.
+        """
+        self.entries.clear()
+        self.invalidations += 1
+
+    def __repr__(self):
+        return (f"DecisionCache with {len(self.entries)}/{self.max_size} entries, hit rate: {self.hit_rate():.1%}, "
+                f"evictions: {self.evictions}, invalidations: {self.invalidations}")
 
 
 class AIDecisionMaker:
-    def __init__(self, model=None):
+    def __init__(self, model=None, equity_samples=2000, equity_margin=0.02, equity_time_limit=0.005,
+                 executor=None, seed=None, preflop_table=PREFLOP_TABLE_FILE, equity_cache=None,
+                 decision_cache=None):
         """
         Initialize the AI decision-maker.
         :param model: A trained reinforcement learning model (optional).
+        :param equity_samples: Monte Carlo sample budget per equity estimate.
+        :param equity_margin: Stop sampling once the 95% confidence half-width is below this.
+        :param equity_time_limit: Hard cap in seconds on each equity estimate.
+        :param executor: Optional process pool to spread equity simulations over.
+        :param seed: Seed for reproducible simulations.
+        :param preflop_table: Path of the memory-mapped preflop equity table, or None to always simulate.
+        :param equity_cache: EquityCache for postflop estimates (optional); may be shared between AIs.
+        :param decision_cache: DecisionCache for whole decisions (optional); share it only between AIs
+                               using the same model.
         """
         self.model = model
+        self.equity_samples = equity_samples
+        self.equity_margin = equity_margin
+        self.equity_time_limit = equity_time_limit
+        self.executor = executor
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.preflop_table = load_preflop_table(preflop_table) if preflop_table else None
+        self.equity_cache = equity_cache
+        self.decision_cache = decision_cache
 
-    def calculate_win_probability(self, hole_cards, community_cards):
+    def calculate_win_probability(self, hole_cards, community_cards, num_opponents=1):
         """
-        Simulates the AI's win probability based on hole and community cards.
+        Estimates the AI's equity (win probability, with ties shared) against random opponent hands.
+        :param hole_cards: The AI's hole cards.
+        :param community_cards: The community cards on the table.
+        :param num_opponents: Number of opponents still in the hand.
+        :return: Equity as a float between 0 and 1.
         """
-        # Placeholder: Replace with a more advanced calculation or simulation
-        return random.uniform(0, 1)
+        hole_cards = cards_to_ints(hole_cards)
+        if not community_cards and self.preflop_table is not None and num_opponents <= MAX_PREFLOP_OPPONENTS:
+            return preflop_equity(self.preflop_table, hole_cards, num_opponents)
+        options = dict(max_samples=self.equity_samples, target_margin=self.equity_margin,
+                       time_limit=self.equity_time_limit, seed=self.seed_sequence.spawn(1)[0], executor=self.executor)
+        if self.equity_cache is not None:
+            return cached_equity(self.equity_cache, hole_cards, cards_to_ints(community_cards), num_opponents,
+                                 **options).equity
+        return estimate_equity(hole_cards, cards_to_ints(community_cards), num_opponents, **options).equity
 
-    def decide_action(self, hole_cards, community_cards, pot_odds, current_state=None):
+    def decide_action(self, hole_cards, community_cards, pot_odds, current_state=None, num_opponents=1):
         """
         Makes a decision (fold, call, raise) using the RL model or simple heuristics.
         :param hole_cards: The AI's hole cards.
         :param community_cards: The community cards on the table.
         :param pot_odds: The current pot odds.
         :param current_state: Encoded state representation for the RL model (optional).
+        :param num_opponents: Number of opponents still in the hand.
         :return: The chosen action ('fold', 'call', 'raise').
         """
+        cache = self.decision_cache
         # If the RL model is available and a state is provided
         if self.model and current_state is not None:
-            action_probs = self.model.predict(current_state)
-            action = torch.argmax(action_probs).item()  # Choose the action with the highest probability
-            return ["fold", "call", "raise"][action]
+            if cache is None:
+                return self._model_action(current_state)
+            cache.check_model(self.model)
+            key = cache.state_key(current_state)
+            action = cache.get(key)
+            if action is None:
+                action = self._model_action(current_state)
+                cache.put(key, action)
+            return action
 
         # Fall back to heuristic-based decision-making
-        win_prob = self.calculate_win_probability(hole_cards, community_cards)
+        if cache is None:
+            return self._heuristic_action(hole_cards, community_cards, pot_odds, num_opponents)
+        key = cache.heuristic_key(cards_to_ints(hole_cards), cards_to_ints(community_cards), num_opponents, pot_odds)
+        action = cache.get(key)
+        if action is None:
+            action = self._heuristic_action(hole_cards, community_cards, pot_odds, num_opponents)
+            cache.put(key, action)
+        return action
+
+    def _model_action(self, current_state):
+        action_probs = self.model.predict(current_state)
+        return ACTIONS[int(action_probs.argmax())]  # Choose the action with the highest probability
+
+    def _heuristic_action(self, hole_cards, community_cards, pot_odds, num_opponents):
+        win_prob = self.calculate_win_probability(hole_cards, community_cards, num_opponents)
         if win_prob > 0.8:
             return "raise"
         elif win_prob > pot_odds:
@@ -52,12 +175,16 @@ class AIDecisionMaker:
         """
         if self.model is None:
             raise ValueError("No model available for learning.")
+        import torch
 
         # Example: Simple Q-Learning update
         state, action, next_state = experience
+        state = torch.as_tensor(state, dtype=torch.float32)
+        next_state = torch.as_tensor(next_state, dtype=torch.float32)
         current_q_values = self.model(state)
-        max_next_q = np.max(self.model(next_state))
-        target = current_q_values.clone()
+        with torch.no_grad():
+            max_next_q = self.model(next_state).max().item()
+        target = current_q_values.detach().clone()
         target[action] = reward + 0.99 * max_next_q
 
         # Backpropagate the loss
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from hand_history import CALL, MAX_SEATS, RAISE, read_blocks
+
+
+class PlayerStats:
+    def __init__(self):
+        """
+        Per-seat counters aggregated from hand-history blocks. Every counter is a small array indexed
+        by seat, so partial results from separate chunks, files or processes merge by addition.
+        Positions count from the small blind: position 0 is the first seat after the button and
+        position num_seats - 1 is the button.
+        """
+        self.hands = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.vpip = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.pfr = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.postflop_raises = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.postflop_calls = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.showdowns = np.zeros(MAX_SEATS, dtype=np.int64)
+        self.showdown_wins = np.zeros(MAX_SEATS, dtype=np.int64)
+        # Hands, chips won and big blinds won per (seat, position)
+        self.position_hands = np.zeros((MAX_SEATS, MAX_SEATS), dtype=np.int64)
+        self.position_chips = np.zeros((MAX_SEATS, MAX_SEATS))
+        self.position_big_blinds = np.zeros((MAX_SEATS, MAX_SEATS))
+
+    def add(self, hands, actions):
+        """
+        Aggregates one block of hand records and their action records.
+        """
+        num_hands = len(hands)
+        if not num_hands:
+            return
+        seats = np.arange(MAX_SEATS)
+        num_seats = hands["num_seats"].astype(np.int64)[:, None]
+        dealt = seats < num_seats
+        self.hands += dealt.sum(axis=0)
+
+        # Actions are stored hand after hand, so each one's hand index follows from the counts
+        hand_of = np.repeat(np.arange(num_hands), hands["num_actions"])
+        seat = actions["seat"].astype(np.int64)
+        code = actions["action"]
+        preflop = actions["street"] == 0
+        calls = code == CALL
+        raises = code == RAISE
+        for counter, mask in ((self.vpip, preflop & (calls | raises)), (self.pfr, preflop & raises)):
+            played = np.zeros(num_hands * MAX_SEATS, dtype=bool)
+            played[hand_of[mask] * MAX_SEATS + seat[mask]] = True
+            counter += played.reshape(num_hands, MAX_SEATS).sum(axis=0)
+        self.postflop_raises += np.bincount(seat[~preflop & raises], minlength=MAX_SEATS)
+        self.postflop_calls += np.bincount(seat[~preflop & calls], minlength=MAX_SEATS)
+
+        showdown = (hands["showdown_mask"][:, None] >> seats) & 1
+        self.showdowns += showdown.sum(axis=0)
+        self.showdown_wins += (showdown & (hands["winner_mask"][:, None] >> seats)).sum(axis=0)
+
+        position = (seats - hands["dealer"].astype(np.int64)[:, None] - 1) % num_seats
+        cell = (seats * MAX_SEATS + position)[dealt]
+        deltas = hands["deltas"]
+        size = MAX_SEATS * MAX_SEATS
+        self.position_hands += np.bincount(cell, minlength=size).reshape(MAX_SEATS, MAX_SEATS)
+        self.position_chips += np.bincount(cell, weights=deltas[dealt], minlength=size).reshape(MAX_SEATS, MAX_SEATS)
+        big_blinds = deltas / np.maximum(hands["big_blind"], 1)[:, None]
+        self.position_big_blinds += np.bincount(cell, weights=big_blinds[dealt],
+                                                minlength=size).reshape(MAX_SEATS, MAX_SEATS)
+
+    def merge(self, other):
+        """
+        Adds the counters of another PlayerStats.
+        :return: self
+        """
+        for name, counter in vars(self).items():
+            counter += getattr(other, name)
+        return self
+
+    def report(self):
+        """
+        :return: List with one dictionary per seat that played: hands, VPIP, PFR, postflop aggression
+                 factor (raises per call), showdown win rate, and chips won per hand and big blinds
+                 won per 100 hands by position. Undefined ratios are None.
+        """
+        def ratio(numerator, denominator):
+            return float(numerator / denominator) if denominator else None
+
+        seats = []
+        for seat in np.flatnonzero(self.hands):
+            hands = self.position_hands[seat]
+            played = np.flatnonzero(hands)
+            seats.append({
+                "seat": int(seat), "hands": int(self.hands[seat]),
+                "vpip": ratio(self.vpip[seat], self.hands[seat]), "pfr": ratio(self.pfr[seat], self.hands[seat]),
+                "aggression_factor": ratio(self.postflop_raises[seat], self.postflop_calls[seat]),
+                "showdown_win_rate": ratio(self.showdown_wins[seat], self.showdowns[seat]),
+                "chips_per_hand_by_position": {int(position): ratio(self.position_chips[seat, position],
+                                                                    hands[position]) for position in played},
+                "bb_per_100_by_position": {int(position): 100 * ratio(self.position_big_blinds[seat, position],
+                                                                      hands[position]) for position in played}})
+        return seats
+
+
+def analyze_file(path, shard=0, num_shards=1):
+    """
+    Aggregates one file (or one shard of its blocks) block by block, so memory use is bounded by
+    the block size however large the file is.
+    :return: PlayerStats.
+    """
+    stats = PlayerStats()
+    for hands, actions in read_blocks(path, shard, num_shards):
+        stats.add(hands, actions)
+    return stats
+
+
+def analyze(paths, workers=None):
+    """
+    Aggregates hand-history files over a process pool: every file is split into one shard per
+    worker, and the partial results are merged.
+    :param paths: Hand-history files written by hand_history.HandHistoryWriter.
+    :param workers: Number of worker processes (defaults to the CPU count); 1 runs in this process.
+    :return: PlayerStats.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = PlayerStats()
+    if workers == 1:
+        for path in paths:
+            stats.merge(analyze_file(path))
+        return stats
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(analyze_file, path, shard, workers) for path in paths for shard in range(workers)]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-seat player statistics from binary hand histories.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = analyze(args.paths, args.workers).report()
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    hands = sum(seat["hands"] for seat in report) / max(len(report), 1)
+    print(f"~{hands:.0f} hands per seat analyzed in {elapsed:.2f}s")
+
+    def percent(value):
+        return "-" if value is None else f"{100 * value:.1f}%"
+
+    for seat in report:
+        factor = seat["aggression_factor"]
+        positions = " ".join(f"{position}:{bb:+.1f}" for position, bb in seat["bb_per_100_by_position"].items())
+        print(f"seat {seat['seat']}: {seat['hands']} hands, VPIP {percent(seat['vpip'])}, PFR {percent(seat['pfr'])}, "
+              f"AF {'-' if factor is None else f'{factor:.2f}'}, W$SD {percent(seat['showdown_win_rate'])}, "
+              f"bb/100 by position {positions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from ai_logic import AIDecisionMaker
+from engine import DecisionMakerAgent, HandEngine, RandomAgent
+from equity import NUM_COMBOS, EquityCache, estimate_equity, range_equity
+from game_mechanics import CARDS, Deck
+from hand_evaluator import evaluate7, evaluate_batch
+from hand_history import HandHistoryWriter
+from opponent_model import OPPONENT_FEATURES, OpponentModel
+from state_encoder import StateEncoder
+from utils import calculate_hand_strength, evaluate_hand
+from vec_env import OBSERVATION_SIZE, VectorPokerEnv
+
+BATCH_SIZES = (1, 16, 256, 4096)
+# Inference backends timed by model_cases
+MODEL_BACKENDS = ("model", "numpy_float32", "numpy_int8")
+
+
+def measure(func, operations=1, min_time=0.5, repeat=3):
+    """
+    Times `func`, calling it in a loop until at least `min_time` seconds pass, and keeps the best
+    of `repeat` runs.
+    :param func: Zero-argument callable.
+    :param operations: Number of operations one call performs (e.g. the batch size).
+    :return: Dictionary with seconds per operation and operations per second.
+    """
+    func()
+    target = min_time / repeat
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target:
+            break
+        number = max(2 * number, int(number * target / max(elapsed, 1e-9)) + 1)
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    seconds = best / (number * operations)
+    return {"seconds_per_op": seconds, "ops_per_second": 1.0 / seconds}
+
+
+def benchmark_cases(selected=None):
+    """
+    Builds the benchmark cases.
+    :param selected: Optional collection of case names; the model cases (and torch) are only set up
+                     when one of them is selected.
+    :return: List of (name, func, operations per call).
+    """
+    rng = np.random.default_rng(0)
+    seven = [CARDS[card] for card in rng.choice(52, 7, replace=False)]
+    seven_ids = [card.id for card in seven]
+    batch = np.array([rng.choice(52, 7, replace=False) for _ in range(10000)], dtype=np.int8)
+    deck = Deck(seed=0)
+    engine = HandEngine([RandomAgent(seed=seat) for seat in range(6)], seed=0)
+
+    def deal():
+        deck.reshuffle()
+        deck.deal_ids(17)
+
+    def play_hand():
+        engine.play_hand([1000] * 6)
+
+    # The same self-play with every hand recorded, against engine_hand_6_players for the writer's overhead
+    # (the writer keeps its own handle, so it goes on writing once the temporary file is unlinked)
+    with tempfile.NamedTemporaryFile(suffix=".thh") as history_file:
+        history = HandHistoryWriter(history_file.name)
+    history_engine = HandEngine([RandomAgent(seed=seat) for seat in range(6)], listener=history, seed=0)
+
+    def play_recorded_hand():
+        history_engine.play_hand([1000] * 6)
+
+    # Heuristic AIs deciding from equity estimates, with the state encoder listening as in main.py
+    encoder = StateEncoder(6)
+    equity_cache = EquityCache()
+    ai_agents = [DecisionMakerAgent(AIDecisionMaker(seed=seat, equity_cache=equity_cache), encoder)
+                 for seat in range(6)]
+    ai_engine = HandEngine(ai_agents, listener=encoder, seed=0)
+
+    def play_ai_hand():
+        ai_engine.play_hand([1000] * 6)
+
+    opponents = OpponentModel(6)
+    opponents.on_hand_start(0, None, None)
+    opponents.on_street("Flop", [])
+    opponent_features = np.zeros(OPPONENT_FEATURES, dtype=np.float32)
+
+    env = VectorPokerEnv(1024, seed=0)
+    env.reset()
+    actions = rng.integers(0, 3, size=1024)
+
+    cases = [
+        ("evaluate_hand", lambda: evaluate_hand(seven), 1),
+        ("calculate_hand_strength", lambda: calculate_hand_strength(seven[:2], seven[2:]), 1),
+        ("evaluate7", lambda: evaluate7(*seven_ids), 1),
+        ("evaluate_batch", lambda: evaluate_batch(batch), len(batch)),
+        ("equity_flop_2000_samples", lambda: estimate_equity(seven_ids[:2], seven_ids[2:5], 2, max_samples=2000,
+                                                             allow_exact=False, seed=0), 1),
+        ("range_equity_full_flop", lambda: range_equity(np.ones(NUM_COMBOS), np.ones(NUM_COMBOS), seven_ids[2:5]), 1),
+        ("deck_deal_17", deal, 1),
+        ("engine_hand_6_players", play_hand, 1),
+        ("engine_hand_6_players_history", play_recorded_hand, 1),
+        ("engine_hand_6_ai_players", play_ai_hand, 1),
+        ("opponent_model_action", lambda: opponents.on_action(2, "raise", 200, 500), 1),
+        ("opponent_model_features", lambda: opponents.features(0, opponent_features), 1),
+        ("vec_env_step_1024_tables", lambda: env.step(actions), 1024),
+    ]
+    if not selected or set(selected) & set(model_case_names()):
+        cases.extend(model_cases(rng))
+    return cases
+
+
+def model_case_names():
+    """
+    Names of the cases model_cases builds, known without importing torch.
+    """
+    return [f"{backend}_inference_batch_{size}" for size in BATCH_SIZES for backend in MODEL_BACKENDS]
+
+
+def model_cases(rng):
+    """
+    PokerAIModel inference cases at several batch sizes (operations are states), with torch and
+    with the NumPy backend.
+    """
+    import torch
+    from inference import BatchInference
+    from numpy_model import NumpyPokerModel
+    from rl_model import PokerAIModel
+    torch.manual_seed(0)
+    model = PokerAIModel(input_size=OBSERVATION_SIZE, action_size=3)
+    model.eval()
+    policies = {"model": BatchInference(model, max_batch=max(BATCH_SIZES))}
+    for dtype in ("float32", "int8"):
+        policies[f"numpy_{dtype}"] = NumpyPokerModel.from_state_dict(model.state_dict(), dtype)
+    cases = []
+    for size in BATCH_SIZES:
+        states = rng.random((size, OBSERVATION_SIZE), dtype=np.float32)
+        for backend in MODEL_BACKENDS:
+            policy = policies[backend]
+            cases.append((f"{backend}_inference_batch_{size}", lambda states=states, policy=policy: policy.act(states),
+                          size))
+    return cases
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(selected=None, min_time=0.5):
+    """
+    Runs the benchmark cases.
+    :param selected: Optional collection of case names to run (default: all).
+    :return: Machine-readable results dictionary.
+    """
+    results = {}
+    for name, func, operations in benchmark_cases(selected):
+        if selected and name not in selected:
+            continue
+        results[name] = measure(func, operations, min_time)
+    return {"revision": git_revision(), "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths and write the results as JSON.")
+    parser.add_argument("benchmarks", nargs="*", help="Names of the benchmarks to run (default: all)")
+    parser.add_argument("--output", help="File to write the JSON results to")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds spent timing each benchmark")
+    args = parser.parse_args()
+
+    report = run_benchmarks(set(args.benchmarks), args.min_time)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    for name, result in report["results"].items():
+        line = f"{name:32s} {result['seconds_per_op'] * 1e6:12.3f} us/op {result['ops_per_second']:14.0f} ops/s"
+        if name in baseline:
+            line += f"  x{baseline[name]['seconds_per_op'] / result['seconds_per_op']:.2f} vs baseline"
+        print(line)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import argparse
+import json
+import random
+import time
+import types
+
+from game_mechanics import CARDS, Deck
+from hand_state import HandState
+from utils import calculate_pot_odds
+
+STREETS = ("Pre-Flop", "Flop", "Turn", "River")
+# Community cards on the table once each street has been dealt
+BOARD_SIZES = (0, 3, 4, 5)
+
+
+class HandEngine:
+    def __init__(self, agents, small_blind=50, big_blind=100, listener=None, seed=None):
+        """
+        Quiet, event-driven No-Limit Hold'em hand engine.
+        :param agents: One callable per seat, called as agent(engine, seat) whenever the seat must act.
+                       It returns 'fold', 'call' (a check when nothing is owed) or 'raise', or a tuple
+                       ('raise', total_bet) to raise to a specific amount (clamped to the legal range).
+        :param small_blind: Small blind amount.
+        :param big_blind: Big blind amount, also the minimum raise size.
+        :param listener: Optional callable listener(event, **details) notified of every game event.
+                         Events: hand_start (with the stacks before the blinds), blind, street, action (fold/check/call/raise), win
+                         and hand_end. With no listener the engine produces no output at all.
+        :param seed: Seed (or NumPy Generator) for the card shuffles.
+        """
+        self.agents = agents
+        self.num_seats = len(agents)
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.listener = listener
+        self.deck = Deck(seed)
+
+        n = self.num_seats
+        self.chips = [0] * n
+        self.bets = [0] * n
+        self.contributed = [0] * n
+        self.folded = [False] * n
+        self.all_in = [False] * n
+        self.acted = [False] * n
+        self.hole_cards = [None] * n
+        # Evaluator state per seat, extended as each street is dealt
+        self.hand_states = [HandState() for _ in range(n)]
+        self.board = []
+        self.pot = 0
+        self.highest_bet = 0
+        self.last_raise = big_blind
+        self.num_active = 0
+        self.num_can_act = 0
+        self.pending = 0
+        self.street = 0
+        self.dealer = 0
+
+    @property
+    def listener(self):
+        return self._listener
+
+    @listener.setter
+    def listener(self, listener):
+        self._listener = listener
+        # Calling an object goes through its type's __call__ slot, which with keyword arguments costs
+        # about twice as much as calling the bound method; events are sent through that method instead
+        call = getattr(type(listener), "__call__", None)
+        self.notify = listener.__call__ if isinstance(call, types.FunctionType) else listener
+
+    def to_call(self, seat):
+        """
+        Chips `seat` must add to stay in the hand.
+        """
+        return min(self.highest_bet - self.bets[seat], self.chips[seat])
+
+    def min_raise_to(self):
+        """
+        Smallest legal total bet for a raise.
+        """
+        return self.highest_bet + self.last_raise
+
+    def can_raise(self, seat):
+        """
+        A seat may raise if it has chips beyond the call, the betting was reopened since it last
+        acted, and someone else can still respond.
+        """
+        return (not self.acted[seat] and self.chips[seat] > self.highest_bet - self.bets[seat]
+                and self.num_can_act > 1)
+
+    def board_cards(self):
+        """
+        Community cards visible on the current street.
+        """
+        return self.board[:BOARD_SIZES[self.street]]
+
+    def play_hand(self, chips, dealer=0):
+        """
+        Plays one complete hand, asking the agents for every decision.
+        :param chips: Starting stack of every seat (all must be positive); updated in place.
+        :param dealer: Seat of the dealer button.
+        :return: List of chip deltas per seat.
+        """
+        steps = self.hand_steps(chips, dealer)
+        agents = self.agents
+        try:
+            seat = next(steps)
+            while True:
+                seat = steps.send(agents[seat](self, seat))
+        except StopIteration as finished:
+            return finished.value
+
+    def hand_steps(self, chips, dealer=0):
+        """
+        Plays one hand as a generator, so the caller decides how actions are obtained (e.g. awaited
+        from a network client). It yields the seat that must act and expects the agent's decision
+        to be sent back; the agents given to the engine are not called.
+        :param chips: Starting stack of every seat (all must be positive); updated in place.
+        :param dealer: Seat of the dealer button.
+        :return: List of chip deltas per seat (as the StopIteration value).
+        """
+        n = self.num_seats
+        start = list(chips)
+        self.chips = chips
+        for seat in range(n):
+            self.bets[seat] = 0
+            self.contributed[seat] = 0
+            self.folded[seat] = False
+            self.all_in[seat] = False
+            self.acted[seat] = False
+        self.pot = 0
+        self.dealer = dealer
+        self.street = 0
+        self.num_active = self.num_can_act = n
+
+        self.deck.reshuffle()
+        cards = self.deck.deal_ids(2 * n + 5)
+        for seat in range(n):
+            self.hole_cards[seat] = cards[2 * seat:2 * seat + 2]
+            self.hand_states[seat].reset(self.hole_cards[seat])
+        self.board = cards[2 * n:]
+        listener = self.notify
+        if listener:
+            listener("hand_start", dealer=dealer, hole_cards=self.hole_cards, chips=start)
+
+        if n == 2:
+            small_blind_seat, big_blind_seat = dealer, (dealer + 1) % n
+        else:
+            small_blind_seat, big_blind_seat = (dealer + 1) % n, (dealer + 2) % n
+        self._post_blind(small_blind_seat, self.small_blind, "small")
+        self._post_blind(big_blind_seat, self.big_blind, "big")
+        self.highest_bet = self.big_blind
+        self.last_raise = self.big_blind
+
+        first = (big_blind_seat + 1) % n
+        for street in range(4):
+            self.street = street
+            if street:
+                for seat in range(n):
+                    self.bets[seat] = 0
+                    self.acted[seat] = False
+                self.highest_bet = 0
+                self.last_raise = self.big_blind
+                first = (dealer + 1) % n
+                dealt = self.board[BOARD_SIZES[street - 1]:BOARD_SIZES[street]]
+                for seat in range(n):
+                    if not self.folded[seat]:
+                        self.hand_states[seat].add(dealt)
+            if listener:
+                listener("street", street=STREETS[street], board=self.board_cards())
+            yield from self._betting_round(first)
+            if self.num_active == 1:
+                break
+
+        self._award_pots()
+        deltas = [chips[seat] - start[seat] for seat in range(n)]
+        if listener:
+            listener("hand_end", deltas=deltas)
+        return deltas
+
+    def _post_blind(self, seat, amount, blind):
+        amount = min(amount, self.chips[seat])
+        self._commit(seat, amount)
+        if self.notify:
+            self.notify("blind", seat=seat, amount=amount, blind=blind)
+
+    def _commit(self, seat, amount):
+        """
+        Moves `amount` chips from `seat` into the pot.
+        """
+        self.chips[seat] -= amount
+        self.bets[seat] += amount
+        self.contributed[seat] += amount
+        self.pot += amount
+        if self.chips[seat] == 0 and not self.all_in[seat]:
+            self.all_in[seat] = True
+            self.num_can_act -= 1
+
+    def _betting_round(self, seat):
+        """
+        Collects actions until every seat that can act has matched the highest bet.
+        """
+        n = self.num_seats
+        self.pending = self.num_can_act
+        while self.pending > 0 and self.num_active > 1:
+            if not (self.folded[seat] or self.all_in[seat]):
+                if self.num_can_act == 1 and self.bets[seat] >= self.highest_bet:
+                    # Everyone else is all-in or folded and nothing is owed
+                    self.pending = 0
+                    break
+                yield from self._act(seat)
+            seat = (seat + 1) % n
+
+    def _act(self, seat):
+        decision = yield seat
+        if isinstance(decision, tuple):
+            action, amount = decision
+        else:
+            action, amount = decision, None
+        owed = self.highest_bet - self.bets[seat]
+
+        if action == "raise" and self.can_raise(seat):
+            limit = self.bets[seat] + self.chips[seat]
+            total = self.min_raise_to() if amount is None else max(amount, self.min_raise_to())
+            total = min(total, limit)
+            raise_size = total - self.highest_bet
+            self._commit(seat, total - self.bets[seat])
+            self.highest_bet = total
+            if raise_size >= self.last_raise:
+                # A full raise reopens the betting for everyone else
+                self.last_raise = raise_size
+                for other in range(self.num_seats):
+                    self.acted[other] = False
+            self.acted[seat] = True
+            self.pending = self.num_can_act - (0 if self.all_in[seat] else 1)
+        elif action == "fold" and owed > 0:
+            self.folded[seat] = True
+            self.num_active -= 1
+            self.num_can_act -= 1
+            self.pending -= 1
+            amount = 0
+        else:
+            action = "call" if owed > 0 else "check"
+            amount = min(owed, self.chips[seat])
+            self._commit(seat, amount)
+            self.acted[seat] = True
+            self.pending -= 1
+        if self.notify:
+            self.notify("action", seat=seat, action=action, amount=self.bets[seat], pot=self.pot)
+
+    def showdown_ranks(self):
+        """
+        Hand ranks of every seat still in the hand (None for folded seats), read from the hand
+        states kept up to date street by street.
+        """
+        return [None if self.folded[seat] else self.hand_states[seat].rank for seat in range(self.num_seats)]
+
+    def _award_pots(self):
+        """
+        Splits the main pot and side pots between the best hands eligible for each.
+        Odd chips go to the first winner clockwise from the dealer.
+        """
+        n = self.num_seats
+        if self.num_active == 1:
+            winner = self.folded.index(False)
+            self.chips[winner] += self.pot
+            if self.notify:
+                self.notify("win", seats=[winner], amount=self.pot, rank=None)
+            self.pot = 0
+            return
+
+        ranks = self.showdown_ranks()
+        order = [(self.dealer + 1 + i) % n for i in range(n)]
+        remaining = list(self.contributed)
+        winners = []
+        while self.pot > 0:
+            live = [remaining[seat] for seat in range(n) if ranks[seat] is not None and remaining[seat] > 0]
+            if live:
+                level = min(live)
+                eligible = [seat for seat in order if ranks[seat] is not None and remaining[seat] >= level]
+                best = max(ranks[seat] for seat in eligible)
+                winners = [seat for seat in eligible if ranks[seat] == best]
+            else:
+                # Chips folded seats put in beyond every live stake go to the last pot's winners
+                level = max(remaining)
+            side_pot = 0
+            for seat in range(n):
+                taken = min(remaining[seat], level)
+                remaining[seat] -= taken
+                side_pot += taken
+            share, odd = divmod(side_pot, len(winners))
+            for seat in winners:
+                self.chips[seat] += share
+            self.chips[winners[0]] += odd
+            self.pot -= side_pot
+            if self.notify:
+                self.notify("win", seats=winners, amount=side_pot, rank=ranks[winners[0]])
+
+
+def calling_agent(engine, seat):
+    """
+    Agent that always checks or calls.
+    """
+    return "call"
+
+
+class RandomAgent:
+    def __init__(self, fold=0.2, raise_=0.2, seed=None):
+        """
+        Agent picking fold/call/raise at random with the given probabilities.
+        """
+        self.fold = fold
+        self.raise_ = raise_
+        self.rng = random.Random(seed)
+
+    def __call__(self, engine, seat):
+        roll = self.rng.random()
+        if roll < self.fold:
+            return "fold"
+        if roll < self.fold + self.raise_:
+            return "raise"
+        return "call"
+
+
+class DecisionMakerAgent:
+    def __init__(self, decision_maker, encoder=None):
+        """
+        Adapts an AIDecisionMaker to the engine's agent interface.
+        :param decision_maker: AIDecisionMaker instance.
+        :param encoder: StateEncoder listening to the engine (optional). When given, its state vector
+                        is passed to decide_action so the decision maker's model is used.
+        """
+        self.decision_maker = decision_maker
+        self.encoder = encoder
+
+    def __call__(self, engine, seat):
+        owed = engine.to_call(seat)
+        pot_odds = calculate_pot_odds(engine.bets[seat], engine.pot, owed)
+        hole_cards = [CARDS[card] for card in engine.hole_cards[seat]]
+        community_cards = [CARDS[card] for card in engine.board_cards()]
+        current_state = self.encoder.encode(seat) if self.encoder else None
+        return self.decision_maker.decide_action(hole_cards, community_cards, pot_odds, current_state,
+                                                 num_opponents=engine.num_active - 1)
+
+
+def self_play(agents, num_hands, stack=1000, small_blind=50, big_blind=100, seed=None, profiler=None, listener=None):
+    """
+    Plays `num_hands` bot-only hands. Every hand starts from full stacks and the button rotates.
+    :param agents: One agent callable per seat.
+    :param num_hands: Number of hands to play.
+    :param stack: Starting stack per seat for each hand.
+    :param profiler: Optional instrumentation.GameProfiler to attach to the engine.
+    :param listener: Optional engine listener, e.g. a hand_history.HandHistoryWriter.
+    :return: Dictionary with total winnings per seat, hands played, elapsed seconds and hands/second.
+    """
+    engine = HandEngine(agents, small_blind, big_blind, listener, seed=seed)
+    if profiler:
+        profiler.attach(engine)
+    num_seats = len(agents)
+    winnings = [0] * num_seats
+    chips = [stack] * num_seats
+    start = time.perf_counter()
+    for hand in range(num_hands):
+        for seat in range(num_seats):
+            chips[seat] = stack
+        deltas = engine.play_hand(chips, hand % num_seats)
+        for seat in range(num_seats):
+            winnings[seat] += deltas[seat]
+    elapsed = time.perf_counter() - start
+    return {"winnings": winnings, "hands": num_hands, "seconds": elapsed,
+            "hands_per_second": num_hands / elapsed if elapsed else float("inf")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless bot-only hands and report throughput.")
+    parser.add_argument("--hands", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--profile", action="store_true", help="Print per-street and per-decision timings as JSON")
+    parser.add_argument("--history", help="Append the hands to this binary hand-history file")
+    args = parser.parse_args()
+
+    agents = [RandomAgent(seed=None if args.seed is None else args.seed + seat) for seat in range(args.players)]
+    profiler = None
+    if args.profile:
+        from instrumentation import GameProfiler
+        profiler = GameProfiler()
+    history = None
+    if args.history:
+        from hand_history import HandHistoryWriter
+        history = HandHistoryWriter(args.history)
+    try:
+        result = self_play(agents, args.hands, seed=args.seed, profiler=profiler, listener=history)
+    finally:
+        if history:
+            history.close()
+    print(f"{result['hands']} hands in {result['seconds']:.2f}s ({result['hands_per_second']:.0f} hands/second)")
+    print("Winnings per seat:", result["winnings"])
+    if profiler:
+        print(json.dumps(profiler.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
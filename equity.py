@@ -0,0 +1,512 @@
+import itertools
+import math
+import os
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import wait
+
+import numpy as np
+
+from hand_evaluator import NUM_CARDS, evaluate_batch, evaluate_partial_batch, partial_hand
+
+# z-score of the two-sided 95% confidence interval used for the stopping rule
+CONFIDENCE_Z = 1.96
+
+# An enumerated combination costs about a third of a Monte Carlo sample, since the known
+# board is pre-evaluated and no cards need to be shuffled
+ENUMERATION_SPEEDUP = 3
+
+EquityResult = namedtuple("EquityResult", ["equity", "margin", "samples"])
+
+
+def _remaining_deck(dead_cards):
+    """
+    Returns the cards not in `dead_cards` as an int8 array.
+    """
+    live = np.ones(NUM_CARDS, dtype=bool)
+    live[list(dead_cards)] = False
+    return np.flatnonzero(live).astype(np.int8)
+
+
+def sample_without_replacement(deck, num_samples, num_cards, rng):
+    """
+    Draws `num_cards` distinct cards from `deck` for each of `num_samples` rows
+    with a vectorized partial Fisher-Yates shuffle.
+    :param deck: 1-D array of available cards.
+    :param num_samples: Number of independent draws (rows).
+    :param num_cards: Cards per draw.
+    :param rng: numpy Generator.
+    :return: Array of shape (num_samples, num_cards).
+    """
+    decks = np.broadcast_to(deck, (num_samples, deck.size)).copy()
+    rows = np.arange(num_samples)
+    for i in range(num_cards):
+        j = rng.integers(i, deck.size, size=num_samples)
+        picked = decks[rows, j]
+        decks[rows, j] = decks[:, i]
+        decks[:, i] = picked
+    return decks[:, :num_cards]
+
+
+def _simulate_batch(hole_cards, community_cards, num_opponents, deck, num_samples, rng):
+    """
+    Plays out `num_samples` random opponent holdings and runouts.
+    :return: Array of the hero's equity share (1 for a win, 1/k for a k-way tie, 0 for a loss) per sample.
+    """
+    missing = 5 - len(community_cards)
+    draws = sample_without_replacement(deck, num_samples, 2 * num_opponents + missing, rng)
+    board = np.empty((num_samples, 5), dtype=np.int8)
+    board[:, :len(community_cards)] = community_cards
+    board[:, len(community_cards):] = draws[:, 2 * num_opponents:]
+
+    hands = np.empty((num_samples, 7), dtype=np.int8)
+    hands[:, 2:] = board
+    hands[:, :2] = hole_cards
+    hero = evaluate_batch(hands)
+    opponent_ranks = []
+    for opponent in range(num_opponents):
+        hands[:, :2] = draws[:, 2 * opponent:2 * opponent + 2]
+        opponent_ranks.append(evaluate_batch(hands))
+    return _equity_shares(hero, opponent_ranks)
+
+
+def _equity_shares(hero, opponent_ranks):
+    """
+    Converts hand ranks into the hero's pot share per row.
+    :param hero: Array of the hero's ranks.
+    :param opponent_ranks: List of arrays with each opponent's ranks on the same rows.
+    :return: Array with 1 for a win, 1/k for a k-way tie and 0 for a loss.
+    """
+    best_opponent = np.zeros(hero.size, dtype=hero.dtype)
+    ties = np.zeros(hero.size, dtype=np.int16)
+    for ranks in opponent_ranks:
+        ties += ranks == hero
+        np.maximum(best_opponent, ranks, out=best_opponent)
+    return np.where(hero > best_opponent, 1.0, np.where(hero == best_opponent, 1.0 / (ties + 1), 0.0))
+
+
+def _run(hole_cards, community_cards, num_opponents, max_samples, target_margin, time_limit, batch_size, seed):
+    """
+    Samples in batches until the sample budget, the confidence target or the deadline is reached.
+    After the first batch, a batch is only started if one as long as the last still fits before the deadline.
+    :return: (sum of equities, sum of squared equities, samples).
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    rng = np.random.default_rng(seed)
+    deck = _remaining_deck(list(hole_cards) + list(community_cards))
+    total = total_sq = 0.0
+    samples = 0
+    while samples < max_samples:
+        batch_start = time.perf_counter()
+        shares = _simulate_batch(hole_cards, community_cards, num_opponents, deck,
+                                 min(batch_size, max_samples - samples), rng)
+        total += shares.sum()
+        total_sq += np.dot(shares, shares)
+        samples += shares.size
+        if target_margin is not None and _margin(total, total_sq, samples) <= target_margin:
+            break
+        if deadline is not None:
+            now = time.perf_counter()
+            if now + (now - batch_start) >= deadline:
+                break
+    return total, total_sq, samples
+
+
+def _run_until(deadline, hole_cards, community_cards, num_opponents, max_samples, target_margin, batch_size, seed):
+    """
+    _run for an executor chunk. The deadline is a time.time() value, which other processes share, so
+    time spent queued counts against the chunk; a chunk that only starts after the deadline returns
+    no samples.
+    """
+    time_limit = None
+    if deadline is not None:
+        time_limit = deadline - time.time()
+        if time_limit <= 0:
+            return 0.0, 0.0, 0
+    return _run(hole_cards, community_cards, num_opponents, max_samples, target_margin, time_limit, batch_size, seed)
+
+
+def _margin(total, total_sq, samples):
+    """
+    Half-width of the 95% confidence interval of the mean equity.
+    """
+    mean = total / samples
+    variance = max(total_sq / samples - mean * mean, 0.0)
+    return CONFIDENCE_Z * math.sqrt(variance / samples)
+
+
+def estimate_equity(hole_cards, community_cards=(), num_opponents=1, max_samples=10000, target_margin=None,
+                    time_limit=None, batch_size=500, seed=None, executor=None, num_chunks=None, allow_exact=True):
+    """
+    Estimates the equity of a hand against random opponent holdings by Monte Carlo simulation.
+    When enumerating every outcome is cheaper than the sample budget (typically heads-up on the
+    turn or river), the exact equity is computed instead.
+    :param hole_cards: The player's 2 hole cards as ints (see hand_evaluator).
+    :param community_cards: 0 to 5 known community cards as ints.
+    :param num_opponents: Number of opponents still in the hand.
+    :param max_samples: Sample budget.
+    :param target_margin: Stop once the 95% confidence half-width drops below this (optional).
+    :param time_limit: Cap on wall-clock seconds (optional). At least one batch is always run, so the
+                       cap can be overshot by the first batch, or by a batch that runs slower than the
+                       one before it.
+    :param batch_size: Samples evaluated per vectorized batch; also bounds how far the time cap can overshoot.
+    :param seed: Seed or numpy SeedSequence for reproducible results.
+    :param executor: concurrent.futures executor to split the budget over (optional). Worth it for large
+                     budgets only; per-decision estimates are faster in-process.
+    :param num_chunks: Number of work items submitted to the executor (defaults to the CPU count).
+    :param allow_exact: Use exact_equity when it is cheaper than sampling.
+    :return: EquityResult(equity, margin, samples).
+    """
+    hole_cards = tuple(int(c) for c in hole_cards)
+    community_cards = tuple(int(c) for c in community_cards)
+    if len(hole_cards) != 2 or len(community_cards) > 5:
+        raise ValueError("Expected 2 hole cards and at most 5 community cards.")
+    if num_opponents < 1 or 2 * num_opponents + 7 > NUM_CARDS:
+        raise ValueError(f"Unsupported number of opponents: {num_opponents}.")
+
+    if allow_exact and enumeration_size(hole_cards, community_cards, num_opponents) <= max_samples * ENUMERATION_SPEEDUP:
+        return exact_equity(hole_cards, community_cards, num_opponents)
+    if executor is None:
+        total, total_sq, samples = _run(hole_cards, community_cards, num_opponents, max_samples,
+                                        target_margin, time_limit, batch_size, seed)
+    else:
+        total, total_sq, samples = _run_parallel(hole_cards, community_cards, num_opponents, max_samples,
+                                                 target_margin, time_limit, batch_size, seed,
+                                                 executor, num_chunks)
+    return EquityResult(float(total / samples), _margin(total, total_sq, samples), samples)
+
+
+def _run_parallel(hole_cards, community_cards, num_opponents, max_samples, target_margin, time_limit,
+                  batch_size, seed, executor, num_chunks):
+    """
+    Splits the sample budget into independently seeded chunks and merges their sums. The first chunk
+    runs in this process while the others run on `executor`, so there is an estimate by the deadline
+    however busy the executor is. Chunks that have not finished by the deadline are left out: queued
+    ones are cancelled, and running ones stop at the deadline by themselves but are not waited for.
+    The deadline holds up to the overshoot of the in-process chunk (see estimate_equity).
+    """
+    start = time.perf_counter()
+    deadline = None if time_limit is None else time.time() + time_limit
+    if num_chunks is None:
+        num_chunks = os.cpu_count() or 1
+    seeds = (seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)).spawn(num_chunks)
+    budgets = [max_samples // num_chunks + (i < max_samples % num_chunks) for i in range(num_chunks)]
+    # Every chunk must reach the margin target by itself, so scale it by sqrt(num_chunks)
+    chunk_margin = None if target_margin is None else target_margin * math.sqrt(num_chunks)
+    futures = [executor.submit(_run_until, deadline, hole_cards, community_cards, num_opponents, budget,
+                               chunk_margin, batch_size, chunk_seed)
+               for budget, chunk_seed in zip(budgets[1:], seeds[1:]) if budget]
+    remaining = None if time_limit is None else max(0.0, start + time_limit - time.perf_counter())
+    results = [_run(hole_cards, community_cards, num_opponents, budgets[0], chunk_margin, remaining, batch_size,
+                    seeds[0])]
+    timeout = None if time_limit is None else max(0.0, start + time_limit - time.perf_counter())
+    done, pending = wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+    results += [future.result() for future in done]
+    return tuple(map(sum, zip(*results)))
+
+
+def enumeration_size(hole_cards, community_cards, num_opponents):
+    """
+    Counts the (runout, opponent holdings) combinations exact_equity would evaluate.
+    """
+    remaining = NUM_CARDS - len(hole_cards) - len(community_cards)
+    missing = 5 - len(community_cards)
+    size = math.comb(remaining, missing)
+    remaining -= missing
+    for _ in range(num_opponents):
+        size *= math.comb(remaining, 2)
+        remaining -= 2
+    return size
+
+
+def exact_equity(hole_cards, community_cards, num_opponents=1):
+    """
+    Computes equity exactly by enumerating every runout and every opponent holding.
+    The known board is pre-evaluated once; the hero's hand is ranked once per runout and
+    opponents' hands only add their hole cards and the runout to the board's partial result.
+    :param hole_cards: The player's 2 hole cards as ints.
+    :param community_cards: 3 to 5 known community cards as ints (practical for the turn and river).
+    :param num_opponents: Number of opponents still in the hand.
+    :return: EquityResult(equity, 0.0, number of enumerated combinations).
+    """
+    hole_cards = [int(c) for c in hole_cards]
+    community_cards = [int(c) for c in community_cards]
+    deck = _remaining_deck(hole_cards + community_cards)
+    missing = 5 - len(community_cards)
+    runouts = list(itertools.combinations(deck, missing))
+    runouts = np.array(runouts, dtype=np.int8).reshape(len(runouts), missing)
+    hero_by_runout = evaluate_partial_batch(partial_hand(hole_cards + community_cards), runouts)
+
+    # Expand every runout with each disjoint pair of hole cards, one opponent at a time
+    card_bits = np.left_shift(np.uint64(1), np.arange(NUM_CARDS, dtype=np.uint64))
+    pairs = np.array(list(itertools.combinations(deck, 2)), dtype=np.int8)
+    pair_bits = card_bits[pairs[:, 0]] | card_bits[pairs[:, 1]]
+    runout_index = np.arange(runouts.shape[0])
+    used = np.bitwise_or.reduce(card_bits[runouts], axis=1) if missing else np.zeros(1, dtype=np.uint64)
+    holdings = []
+    for _ in range(num_opponents):
+        row, pair = np.nonzero((used[:, None] & pair_bits[None, :]) == 0)
+        runout_index = runout_index[row]
+        used = used[row] | pair_bits[pair]
+        holdings = [h[row] for h in holdings] + [pairs[pair]]
+
+    board_partial = partial_hand(community_cards)
+    runout_cards = runouts[runout_index]
+    opponent_ranks = [evaluate_partial_batch(board_partial, np.hstack((h, runout_cards))) for h in holdings]
+    shares = _equity_shares(hero_by_runout[runout_index], opponent_ranks)
+    return EquityResult(float(shares.mean()), 0.0, shares.size)
+
+
+# Precomputed preflop equities: one row per strategically distinct starting hand (169) and
+# one column per opponent count (1-9). Built by generate_preflop_table.py.
+PREFLOP_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.npy")
+MAX_PREFLOP_OPPONENTS = 9
+NUM_STARTING_HANDS = 169
+_preflop_tables = {}
+
+
+def starting_hand_index(card1, card2):
+    """
+    Maps two hole cards to one of the 169 starting hands on a 13x13 grid:
+    pairs on the diagonal, suited hands at (high, low) and offsuit hands at (low, high).
+    :param card1: Card int.
+    :param card2: Card int.
+    :return: Index in 0..168.
+    """
+    high, low = max(card1 >> 2, card2 >> 2), min(card1 >> 2, card2 >> 2)
+    if (card1 & 3) == (card2 & 3):
+        return high * 13 + low
+    return low * 13 + high
+
+
+def starting_hand_indices(first, second):
+    """
+    Vectorized starting_hand_index for integer arrays of first and second hole cards.
+    """
+    high = np.maximum(first >> 2, second >> 2)
+    low = np.minimum(first >> 2, second >> 2)
+    return np.where((first & 3) == (second & 3), high * 13 + low, low * 13 + high)
+
+
+def starting_hand_cards(index):
+    """
+    Returns representative hole cards for a starting hand index (inverse of starting_hand_index).
+    """
+    row, column = divmod(index, 13)
+    if row == column:
+        return row * 4, row * 4 + 1
+    if row > column:
+        return row * 4, column * 4
+    return column * 4, row * 4 + 1
+
+
+def load_preflop_table(path=PREFLOP_TABLE_FILE):
+    """
+    Memory-maps the preflop equity table. Every process mapping the same file shares one copy
+    of it through the page cache, and repeated loads in one process return the same map.
+    :param path: Path of the .npy file written by generate_preflop_table.py.
+    :return: Read-only float32 array of shape (169, 9), or None if the file does not exist.
+    """
+    table = _preflop_tables.get(path)
+    if table is None:
+        if not os.path.exists(path):
+            return None
+        table = np.load(path, mmap_mode="r")
+        if table.shape != (NUM_STARTING_HANDS, MAX_PREFLOP_OPPONENTS):
+            raise ValueError(f"Unexpected preflop table shape {table.shape} in {path}.")
+        _preflop_tables[path] = table
+    return table
+
+
+def preflop_equity(table, hole_cards, num_opponents):
+    """
+    Looks up the preflop equity of two hole cards against `num_opponents` random hands.
+    """
+    return float(table[starting_hand_index(hole_cards[0], hole_cards[1]), num_opponents - 1])
+
+
+def canonical_key(hole_cards, community_cards):
+    """
+    Maps a hand to a key shared by every suit permutation of it. Each suit is described by
+    the rank masks of its hole cards and board cards; sorting those descriptions removes the
+    suit labels, so isomorphic hands (which have identical equity) get identical keys.
+    :param hole_cards: Hole card ints.
+    :param community_cards: Community card ints (their order does not matter).
+    :return: Hashable tuple.
+    """
+    suits = [0, 0, 0, 0]
+    for card in hole_cards:
+        suits[card & 3] |= 1 << (13 + (card >> 2))
+    for card in community_cards:
+        suits[card & 3] |= 1 << (card >> 2)
+    return tuple(sorted(suits, reverse=True))
+
+
+class EquityCache:
+    def __init__(self, max_size=100000):
+        """
+        Size-bounded LRU cache of equity results keyed on canonical hands.
+        :param max_size: Maximum number of entries kept before the least recently used is evicted.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached value for `key` (marking it recently used), or None on a miss.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores `value`, evicting the least recently used entry when the cache is full.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self):
+        """
+        Fraction of lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return (f"EquityCache with {len(self.entries)}/{self.max_size} entries, hits: {self.hits}, "
+                f"misses: {self.misses}, evictions: {self.evictions}")
+
+
+def cached_equity(cache, hole_cards, community_cards=(), num_opponents=1, max_samples=10000, target_margin=None,
+                  **kwargs):
+    """
+    estimate_equity behind an EquityCache: suit-isomorphic requests with the same sample budget and
+    confidence target are only simulated once. An estimate the time limit cut off before it reached
+    either is returned but not cached, so a later request gets a fresh, possibly better one.
+    :param cache: EquityCache instance.
+    :param kwargs: Passed on to estimate_equity on a cache miss.
+    :return: EquityResult.
+    """
+    key = (canonical_key(hole_cards, community_cards), num_opponents, max_samples, target_margin)
+    result = cache.get(key)
+    if result is None:
+        result = estimate_equity(hole_cards, community_cards, num_opponents, max_samples, target_margin, **kwargs)
+        # Exact results have no margin
+        if (result.samples >= max_samples or result.margin == 0.0
+                or (target_margin is not None and result.margin <= target_margin)):
+            cache.put(key, result)
+    return result
+
+
+# Every two-card holding, in itertools.combinations order: COMBOS[combo_index(a, b)] == (a, b) for a < b
+COMBOS = np.array(list(itertools.combinations(range(NUM_CARDS), 2)), dtype=np.int8)
+NUM_COMBOS = len(COMBOS)
+
+RangeEquityResult = namedtuple("RangeEquityResult", ["matrix", "equity", "runouts"])
+
+
+def combo_index(card1, card2):
+    """
+    Index of a two-card holding in COMBOS (card order does not matter).
+    """
+    low, high = min(card1, card2), max(card1, card2)
+    return low * (2 * NUM_CARDS - low - 1) // 2 + high - low - 1
+
+
+def starting_hand_range(weights):
+    """
+    Expands weights per starting hand (the 169-hand grid of starting_hand_index) to a weight per
+    combo, so e.g. a preflop chart can be used as a range.
+    :param weights: Array of 169 weights.
+    :return: float64 array of NUM_COMBOS weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights[starting_hand_indices(COMBOS[:, 0].astype(np.int64), COMBOS[:, 1].astype(np.int64))]
+
+
+def range_equity(range1, range2, community_cards):
+    """
+    Computes the equity of every combo of one range against every combo of another on a board,
+    by enumerating all runouts. Each runout is ranked once for all combos (one vectorized pass
+    over runouts x combos), and the combo-versus-combo results are then accumulated per runout
+    with whole-matrix comparisons. Card removal is handled with per-runout masks: a pair of combos
+    only counts the runouts that share no card with either of them.
+    :param range1: Weights of the first range, one per combo in COMBOS order (zero = not in range).
+    :param range2: Weights of the second range.
+    :param community_cards: 3 to 5 known community cards as ints.
+    :return: RangeEquityResult(matrix, equity, runouts): matrix is a float32 NUM_COMBOS x NUM_COMBOS
+             array of the first combo's equity (wins plus half the ties) against the second, NaN
+             wherever a combo is outside its range, blocked by the board or shares a card with
+             the other combo; equity is the weighted average of the matrix for range1 against
+             range2; runouts is the number of runouts enumerated.
+    """
+    community_cards = [int(c) for c in community_cards]
+    if not 3 <= len(community_cards) <= 5:
+        raise ValueError("range_equity needs a flop, turn or river board (3 to 5 cards).")
+    range1 = np.asarray(range1, dtype=np.float64)
+    range2 = np.asarray(range2, dtype=np.float64)
+    card_bits = np.left_shift(np.uint64(1), np.arange(NUM_CARDS, dtype=np.uint64))
+    combo_bits = card_bits[COMBOS[:, 0]] | card_bits[COMBOS[:, 1]]
+    board_bits = np.bitwise_or.reduce(card_bits[community_cards])
+
+    # Only combos in either range and not blocked by the board take part
+    used = np.flatnonzero(((range1 > 0) | (range2 > 0)) & (combo_bits & board_bits == 0))
+    combos = COMBOS[used]
+    bits = combo_bits[used]
+
+    deck = _remaining_deck(community_cards)
+    missing = 5 - len(community_cards)
+    runouts = list(itertools.combinations(deck, missing))
+    runouts = np.array(runouts, dtype=np.int8).reshape(len(runouts), missing)
+    runout_bits = np.bitwise_or.reduce(card_bits[runouts], axis=1) if missing else np.zeros(1, dtype=np.uint64)
+    # valid[r, i]: combo i can be held on runout r
+    valid = (runout_bits[:, None] & bits[None, :]) == 0
+
+    # Rank every combo on every runout in one pass; blocked combos get rank 0, below any hand
+    runout_index, held = np.nonzero(valid)
+    ranks = np.zeros(valid.shape, dtype=np.int16)
+    ranks[runout_index, held] = evaluate_partial_batch(
+        partial_hand(community_cards), np.concatenate((runouts[runout_index], combos[held]), axis=1))
+
+    # wins[i, j]: runouts on which combo i outranks combo j. A blocked j (rank 0) is beaten by every
+    # valid i, which the correction term below removes again.
+    wins = np.zeros((len(combos), len(combos)), dtype=np.int32)
+    for row in ranks:
+        wins += row[:, None] > row[None, :]
+    valid = valid.astype(np.float32)
+    wins -= np.rint(valid.T @ (1.0 - valid)).astype(np.int32)
+    # Runouts compatible with both combos of a pair, and the ties among them
+    shared = np.rint(valid.T @ valid).astype(np.int32)
+    ties = shared - wins - wins.T
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        equity = (wins + 0.5 * ties) / shared
+    equity[(bits[:, None] & bits[None, :]) != 0] = np.nan
+
+    matrix = np.full((NUM_COMBOS, NUM_COMBOS), np.nan, dtype=np.float32)
+    rows = range1[used] > 0
+    columns = range2[used] > 0
+    matrix[np.ix_(used[rows], used[columns])] = equity[np.ix_(rows, columns)]
+
+    block = matrix[np.ix_(used[rows], used[columns])]
+    weights = range1[used[rows]][:, None] * range2[used[columns]][None, :]
+    weights = np.where(np.isnan(block), 0.0, weights)
+    total = weights.sum()
+    overall = float((np.nan_to_num(block) * weights).sum() / total) if total else float("nan")
+    return RangeEquityResult(matrix, overall, len(runouts))
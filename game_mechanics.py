@@ -1,25 +1,85 @@
-import random
+import numpy as np
+
+# Defined here rather than imported from hand_evaluator, whose lookup tables take a while to load
+NUM_CARDS = 52
 
 
 class Card:
     SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
     RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
-
-    def __init__(self, rank, suit):
-        self.rank = rank
-        self.suit = suit
+    __slots__ = ("rank", "suit", "id", "rank_index", "suit_bit")
+    _interned = {}
+
+    def __new__(cls, rank, suit):
+        """
+        Returns the single shared instance of the card: there are exactly 52 Card objects.
+        Besides the rank and suit names, each card carries its integer id (rank_index * 4 + suit_index,
+        as in hand_evaluator), its rank index in Card.RANKS and its suit bitmask (1 << suit_index).
+        """
+        card = cls._interned.get((rank, suit))
+        if card is None:
+            if rank not in cls.RANKS or suit not in cls.SUITS:
+                raise ValueError(f"Invalid card: {rank} of {suit}")
+            card = super().__new__(cls)
+            card.rank = rank
+            card.suit = suit
+            card.rank_index = cls.RANKS.index(rank)
+            suit_index = cls.SUITS.index(suit)
+            card.id = card.rank_index * 4 + suit_index
+            card.suit_bit = 1 << suit_index
+            cls._interned[(rank, suit)] = card
+        return card
+
+    def __reduce__(self):
+        # Unpickling goes through __new__ and so yields the shared instance again
+        return Card, (self.rank, self.suit)
 
     def __repr__(self):
         return f"{self.rank} of {self.suit}"
 
 
+# One Card per integer id
+CARDS = [Card(rank, suit) for rank in Card.RANKS for suit in Card.SUITS]
+
+
 class Deck:
-    def __init__(self):
+    def __init__(self, seed=None):
+        """
+        Initializes a shuffled deck of 52 cards. The deck is an array of integer card ids
+        (see hand_evaluator) that is reset in place and dealt by a partial Fisher-Yates shuffle,
+        so a hand only pays for the cards it uses.
+        :param seed: Seed, SeedSequence or NumPy Generator for the shuffles. Equal seeds deal equal cards
+                     on every machine and in every process.
+        """
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        self.order = self.rng.permutation(NUM_CARDS).tolist()
+        self.position = 0
+
+    @property
+    def cards(self):
+        """
+        Cards remaining in the deck, as Card objects.
+        """
+        return [CARDS[card] for card in self.order[self.position:]]
+
+    def deal_ids(self, num):
         """
-        Initializes a shuffled deck of 52 cards.
+        Deals `num` cards as integer ids. Each card is drawn uniformly from the undealt part of the
+        array and swapped to the front of it.
+        :param num: Number of cards to deal.
+        :return: List of card ids.
         """
-        self.cards = [Card(rank, suit) for suit in Card.SUITS for rank in Card.RANKS]
-        random.shuffle(self.cards)
+        start = self.position
+        end = start + num
+        if end > NUM_CARDS:
+            raise ValueError("Not enough cards left in the deck to deal.")
+        order = self.order
+        draws = self.rng.random(num).tolist()
+        for i in range(start, end):
+            j = i + int(draws[i - start] * (NUM_CARDS - i))
+            order[i], order[j] = order[j], order[i]
+        self.position = end
+        return order[start:end]
 
     def deal(self, num):
         """
@@ -27,21 +87,33 @@ class Deck:
         :param num: Number of cards to deal.
         :return: List of Card objects.
         """
-        if num > len(self.cards):
-            raise ValueError("Not enough cards left in the deck to deal.")
-        return [self.cards.pop() for _ in range(num)]
+        return [CARDS[card] for card in self.deal_ids(num)]
 
     def reshuffle(self):
         """
-        Reshuffles the deck, restoring it to its full 52 cards.
+        Reshuffles the deck, restoring it to its full 52 cards. Nothing is rebuilt: the array already
+        holds all 52 cards, and the next deal shuffles the cards it draws.
         """
-        self.__init__()
+        self.position = 0
+
+    def spawn(self, count):
+        """
+        Creates independent decks, e.g. one per worker process, with streams derived from this deck's.
+        :param count: Number of decks.
+        :return: List of Deck objects.
+        """
+        return [Deck(rng) for rng in self.rng.spawn(count)]
+
+    def __len__(self):
+        return NUM_CARDS - self.position
 
     def __repr__(self):
-        return f"Deck with {len(self.cards)} cards remaining."
+        return f"Deck with {len(self)} cards remaining."
 
 
 class Player:
+    __slots__ = ("name", "chips", "hand", "current_bet", "active")
+
     def __init__(self, name, chips=1000):
         self.name = name
         self.chips = chips
@@ -0,0 +1,16 @@
+import argparse
+
+from hand_evaluator import HAND_TABLES_FILE, save_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the lookup tables loaded by hand_evaluator.")
+    parser.add_argument("--output", default=HAND_TABLES_FILE)
+    args = parser.parse_args()
+
+    save_tables(args.output)
+    print(f"Hand evaluator tables written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
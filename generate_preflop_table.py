@@ -0,0 +1,39 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from equity import (MAX_PREFLOP_OPPONENTS, NUM_STARTING_HANDS, PREFLOP_TABLE_FILE, estimate_equity,
+                    starting_hand_cards)
+
+
+def hand_equities(index, samples, seed):
+    """
+    Simulates the equity of one starting hand against 1 to 9 opponents.
+    """
+    hole_cards = starting_hand_cards(index)
+    seeds = np.random.SeedSequence([seed, index]).spawn(MAX_PREFLOP_OPPONENTS)
+    return [estimate_equity(hole_cards, (), opponents, max_samples=samples, seed=seeds[opponents - 1]).equity
+            for opponents in range(1, MAX_PREFLOP_OPPONENTS + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the preflop equity table used by AIDecisionMaker.")
+    parser.add_argument("--samples", type=int, default=50000, help="Monte Carlo samples per hand and opponent count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=PREFLOP_TABLE_FILE)
+    args = parser.parse_args()
+
+    table = np.zeros((NUM_STARTING_HANDS, MAX_PREFLOP_OPPONENTS), dtype=np.float32)
+    with ProcessPoolExecutor(args.workers) as executor:
+        rows = executor.map(hand_equities, range(NUM_STARTING_HANDS),
+                            [args.samples] * NUM_STARTING_HANDS, [args.seed] * NUM_STARTING_HANDS)
+        for index, row in enumerate(rows):
+            table[index] = row
+    np.save(args.output, table)
+    print(f"Preflop equity table written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import itertools
+import os
+
+import numpy as np
+
+# Integer card encoding: card = rank_index * 4 + suit_index, where rank_index follows
+# Card.RANKS ('2' .. 'Ace') and suit_index follows Card.SUITS.
+NUM_RANKS = 13
+NUM_SUITS = 4
+NUM_CARDS = NUM_RANKS * NUM_SUITS
+
+# Hand categories, numbered like utils.HAND_RANKS
+HIGH_CARD = 1
+ONE_PAIR = 2
+TWO_PAIR = 3
+THREE_OF_A_KIND = 4
+STRAIGHT = 5
+FLUSH = 6
+FULL_HOUSE = 7
+FOUR_OF_A_KIND = 8
+STRAIGHT_FLUSH = 9
+ROYAL_FLUSH = 10
+
+# Per-rank keys chosen so that the sum over any 5, 6 or 7 cards (at most four of a rank)
+# identifies the rank multiset uniquely.
+RANK_KEYS = (0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181)
+
+# Each card contributes its rank key above the suit field and a one in its suit's 4-bit
+# counter, so a single sum carries both the rank multiset and the suit counts.
+SUIT_BITS = 16
+SUIT_MASK = (1 << SUIT_BITS) - 1
+CARD_KEYS = tuple((RANK_KEYS[card >> 2] << SUIT_BITS) + (1 << (4 * (card & 3))) for card in range(NUM_CARDS))
+CARD_BITS = tuple(1 << (card >> 2) for card in range(NUM_CARDS))
+
+# Adding 3 to every suit counter sets its top bit exactly when that suit holds 5+ cards.
+FLUSH_CHECK_ADD = 0x3333
+FLUSH_CHECK_MASK = 0x8888
+FLUSH_SUITS = {0x8: 0, 0x80: 1, 0x800: 2, 0x8000: 3}
+
+# Bit masks of the ten straights, from Ace-high down to the wheel (A-2-3-4-5)
+STRAIGHT_MASKS = tuple((0b11111 << (high - 4), high) for high in range(12, 3, -1)) + ((0b1000000001111, 3),)
+
+
+def _straight_high(mask):
+    """
+    Finds the highest straight contained in a 13-bit rank mask.
+    :param mask: Bit mask with bit r set when rank index r is present.
+    :return: Rank index of the straight's top card, or None if there is no straight.
+    """
+    for straight, high in STRAIGHT_MASKS:
+        if mask & straight == straight:
+            return high
+    return None
+
+
+def _flush_class(mask):
+    """
+    Determines the best hand among suited cards.
+    :param mask: Rank mask of the 5+ cards of the flush suit.
+    :return: A (category, tie_break) tuple.
+    """
+    high = _straight_high(mask)
+    if high == 12:
+        return ROYAL_FLUSH, (high,)
+    if high is not None:
+        return STRAIGHT_FLUSH, (high,)
+    return FLUSH, tuple(r for r in range(12, -1, -1) if mask >> r & 1)[:5]
+
+
+def _rank_class(counts):
+    """
+    Determines the best non-flush hand available from a rank multiset.
+    :param counts: Tuple of 13 counts, one per rank index.
+    :return: A (category, tie_break) tuple.
+    """
+    present = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in present if counts[r] == 4]
+    trips = [r for r in present if counts[r] == 3]
+    pairs = [r for r in present if counts[r] == 2]
+
+    if quads:
+        return FOUR_OF_A_KIND, (quads[0], [r for r in present if r != quads[0]][0])
+    if trips and (len(trips) > 1 or pairs):
+        return FULL_HOUSE, (trips[0], max(trips[1:] + pairs))
+    high = _straight_high(sum(1 << r for r in present))
+    if high is not None:
+        return STRAIGHT, (high,)
+    if trips:
+        return THREE_OF_A_KIND, (trips[0],) + tuple(r for r in present if r != trips[0])[:2]
+    if len(pairs) >= 2:
+        top = pairs[:2]
+        return TWO_PAIR, tuple(top) + (next(r for r in present if r not in top),)
+    if pairs:
+        return ONE_PAIR, (pairs[0],) + tuple(r for r in present if r != pairs[0])[:3]
+    return HIGH_CARD, tuple(present[:5])
+
+
+def _rank_multisets(size):
+    """
+    Yields every rank count vector of `size` cards with at most four cards per rank.
+    """
+    for combo in itertools.combinations_with_replacement(range(NUM_RANKS), size):
+        counts = [0] * NUM_RANKS
+        for r in combo:
+            counts[r] += 1
+        if max(counts) <= 4:
+            yield tuple(counts)
+
+
+def _build_tables():
+    """
+    Builds the lookup tables. Every hand class is first described as a
+    (category, tie_break) tuple, then all classes are sorted into dense integer ranks.
+    :return: (rank_tables, flush_table, rank_classes)
+    """
+    flush_classes = [None] * (1 << NUM_RANKS)
+    for mask in range(1 << NUM_RANKS):
+        if 5 <= bin(mask).count("1") <= 7:
+            flush_classes[mask] = _flush_class(mask)
+
+    rank_classes_by_size = {}
+    for size in (5, 6, 7):
+        table = {}
+        for counts in _rank_multisets(size):
+            table[sum(RANK_KEYS[r] * n for r, n in enumerate(counts))] = _rank_class(counts)
+        rank_classes_by_size[size] = table
+
+    # Five-card hands already produce all 7462 distinct classes
+    classes = sorted(set(c for c in flush_classes if c is not None) | set(rank_classes_by_size[5].values()))
+    dense = {cls: i + 1 for i, cls in enumerate(classes)}
+
+    flush_table = [0 if cls is None else dense[cls] for cls in flush_classes]
+    rank_tables = {size: {key: dense[cls] for key, cls in table.items()}
+                   for size, table in rank_classes_by_size.items()}
+    return rank_tables, flush_table, [None] + classes
+
+
+# Precomputed tables, written by generate_hand_tables.py; building them takes about a second
+HAND_TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hand_tables.npz")
+# Longest tie-break tuple (five kickers), the width of the stored tie-break rows
+MAX_TIE_BREAK = 5
+
+
+def save_tables(path=HAND_TABLES_FILE):
+    """
+    Builds the lookup tables and saves them as compressed arrays: the keys and ranks of each rank
+    table, the flush table, and the category and (-1 padded) tie-break of every rank.
+    """
+    rank_tables, flush_table, rank_classes = _build_tables()
+    arrays = {"rank_keys": np.array(RANK_KEYS, dtype=np.int32), "flush_table": np.array(flush_table, dtype=np.int16)}
+    for size, table in rank_tables.items():
+        arrays[f"keys{size}"] = np.fromiter(table.keys(), dtype=np.int32, count=len(table))
+        arrays[f"ranks{size}"] = np.fromiter(table.values(), dtype=np.int16, count=len(table))
+    arrays["categories"] = np.zeros(len(rank_classes), dtype=np.int8)
+    arrays["tie_breaks"] = np.full((len(rank_classes), MAX_TIE_BREAK), -1, dtype=np.int8)
+    for rank, (category, tie_break) in enumerate(rank_classes[1:], 1):
+        arrays["categories"][rank] = category
+        arrays["tie_breaks"][rank, :len(tie_break)] = tie_break
+    np.savez_compressed(path, **arrays)
+
+
+def _load_tables(path=HAND_TABLES_FILE):
+    """
+    Loads the tables saved by save_tables, or builds them when the file is missing or was made with
+    other rank keys.
+    :return: (rank_tables, flush_table, rank_classes), as from _build_tables.
+    """
+    if not os.path.exists(path):
+        return _build_tables()
+    with np.load(path) as data:
+        if data["rank_keys"].tolist() != list(RANK_KEYS):
+            return _build_tables()
+        rank_tables = {size: dict(zip(data[f"keys{size}"].tolist(), data[f"ranks{size}"].tolist()))
+                       for size in (5, 6, 7)}
+        flush_table = data["flush_table"].tolist()
+        rank_classes = [None] + [(category, tuple(r for r in tie_break if r >= 0)) for category, tie_break
+                                 in zip(data["categories"][1:].tolist(), data["tie_breaks"][1:].tolist())]
+    return rank_tables, flush_table, rank_classes
+
+
+RANK_TABLES, FLUSH_TABLE, RANK_CLASSES = _load_tables()
+RANK_TABLE_7 = RANK_TABLES[7]
+MAX_HAND_RANK = len(RANK_CLASSES) - 1
+
+
+def evaluate(cards):
+    """
+    Evaluates 5 to 7 integer-encoded cards.
+    :param cards: Sequence of card ints (0-51).
+    :return: Integer hand rank in 1..7462; higher ranks beat lower ones, equal ranks tie.
+    """
+    key = 0
+    for card in cards:
+        key += CARD_KEYS[card]
+    flush = (key + FLUSH_CHECK_ADD) & FLUSH_CHECK_MASK
+    if flush:
+        return flush_rank(cards, FLUSH_SUITS[flush])
+    return RANK_TABLES[len(cards)][key >> SUIT_BITS]
+
+
+def evaluate7(c1, c2, c3, c4, c5, c6, c7):
+    """
+    Unrolled version of `evaluate` for exactly seven cards, used on the hottest paths.
+    :return: Integer hand rank in 1..7462.
+    """
+    keys = CARD_KEYS
+    key = keys[c1] + keys[c2] + keys[c3] + keys[c4] + keys[c5] + keys[c6] + keys[c7]
+    flush = (key + FLUSH_CHECK_ADD) & FLUSH_CHECK_MASK
+    if flush:
+        return flush_rank((c1, c2, c3, c4, c5, c6, c7), FLUSH_SUITS[flush])
+    return RANK_TABLE_7[key >> SUIT_BITS]
+
+
+def flush_rank(cards, suit):
+    """
+    Looks up the rank of the flush formed by the cards of `suit`; used when a hand key shows a flush.
+    :param cards: 5 to 7 card ints with at least five of `suit`.
+    :param suit: Suit index (card & 3).
+    """
+    mask = 0
+    for card in cards:
+        if card & 3 == suit:
+            mask |= CARD_BITS[card]
+    return FLUSH_TABLE[mask]
+
+
+def hand_category(rank):
+    """
+    Returns the category of a hand rank, numbered like utils.HAND_RANKS.
+    """
+    return RANK_CLASSES[rank][0]
+
+
+def hand_tie_break(rank):
+    """
+    Returns the tie-break tuple of rank indices (Card.RANKS positions) for a hand rank.
+    """
+    return RANK_CLASSES[rank][1]
+
+
+# NumPy versions of the tables for batch evaluation. The non-flush tables are dense arrays
+# indexed directly by rank-key sums; they are built on first use.
+CARD_KEYS_ARRAY = np.array(CARD_KEYS, dtype=np.int64)
+CARD_BITS_ARRAY = np.array(CARD_BITS, dtype=np.int64)
+FLUSH_TABLE_ARRAY = np.array(FLUSH_TABLE, dtype=np.int16)
+_RANK_ARRAYS = {}
+
+
+def _rank_array(size):
+    """
+    Returns the dense NumPy rank table for hands of `size` cards, building it on first use.
+    """
+    array = _RANK_ARRAYS.get(size)
+    if array is None:
+        table = RANK_TABLES[size]
+        keys = np.fromiter(table.keys(), dtype=np.int64, count=len(table))
+        array = np.zeros(int(keys.max()) + 1, dtype=np.int16)
+        array[keys] = np.fromiter(table.values(), dtype=np.int16, count=len(table))
+        _RANK_ARRAYS[size] = array
+    return array
+
+
+def evaluate_batch(cards):
+    """
+    Evaluates many hands in one vectorized pass.
+    :param cards: Integer array of shape (N, 7) (or (N, 5) / (N, 6)) of distinct card ints per row.
+    :return: int16 array of shape (N,) with the same ranks `evaluate` returns for each row.
+    """
+    cards = np.asarray(cards)
+    if cards.ndim != 2 or not 5 <= cards.shape[1] <= 7:
+        raise ValueError("Expected an array of shape (N, 5), (N, 6) or (N, 7).")
+
+    keys = CARD_KEYS_ARRAY[cards[:, 0]]
+    for column in range(1, cards.shape[1]):
+        keys += CARD_KEYS_ARRAY[cards[:, column]]
+    ranks = _rank_array(cards.shape[1])[keys >> SUIT_BITS]
+
+    flush = (keys + FLUSH_CHECK_ADD) & FLUSH_CHECK_MASK
+    rows = np.flatnonzero(flush)
+    if rows.size:
+        flush_cards = cards[rows]
+        flush = flush[rows]
+        suits = (flush > 0x8).astype(np.int64) + (flush > 0x80) + (flush > 0x800)
+        suited = (flush_cards & 3) == suits[:, None]
+        masks = np.where(suited, CARD_BITS_ARRAY[flush_cards], 0).sum(axis=1)
+        ranks[rows] = FLUSH_TABLE_ARRAY[masks]
+    return ranks
+
+
+def partial_hand(cards):
+    """
+    Pre-evaluates the known part of a hand so that it can be completed many times cheaply.
+    :param cards: Known card ints (e.g. a player's hole cards plus the board so far).
+    :return: A (key, suit_masks, num_cards) tuple for evaluate_partial / evaluate_partial_batch.
+    """
+    key = 0
+    masks = [0, 0, 0, 0]
+    for card in cards:
+        key += CARD_KEYS[card]
+        masks[card & 3] |= CARD_BITS[card]
+    return key, tuple(masks), len(cards)
+
+
+def evaluate_partial_batch(partial, extra_cards):
+    """
+    Completes a pre-evaluated hand with each row of `extra_cards` in one vectorized pass.
+    :param partial: Tuple returned by partial_hand.
+    :param extra_cards: Integer array of shape (N, m); the known and extra cards must total 5 to 7.
+    :return: int16 array of shape (N,), equal to evaluate(known + row) for each row.
+    """
+    key, masks, num_known = partial
+    extra_cards = np.asarray(extra_cards)
+    keys = np.full(extra_cards.shape[0], key, dtype=np.int64)
+    for column in range(extra_cards.shape[1]):
+        keys += CARD_KEYS_ARRAY[extra_cards[:, column]]
+    ranks = _rank_array(num_known + extra_cards.shape[1])[keys >> SUIT_BITS]
+
+    flush = (keys + FLUSH_CHECK_ADD) & FLUSH_CHECK_MASK
+    rows = np.flatnonzero(flush)
+    if rows.size:
+        flush_cards = extra_cards[rows]
+        flush = flush[rows]
+        suits = (flush > 0x8).astype(np.int64) + (flush > 0x80) + (flush > 0x800)
+        suited = (flush_cards & 3) == suits[:, None]
+        extra_masks = np.where(suited, CARD_BITS_ARRAY[flush_cards], 0).sum(axis=1)
+        ranks[rows] = FLUSH_TABLE_ARRAY[np.array(masks, dtype=np.int64)[suits] | extra_masks]
+    return ranks
@@ -0,0 +1,336 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+from itertools import chain
+
+import numpy as np
+
+from engine import STREETS
+
+# Format: an 8-byte file header, then blocks of hands. Each block is an 8-byte block header (hand
+# and action counts), the fixed-width hand records of the block, then its fixed-width action
+# records. A block is written with a single write, so a reader sees whole blocks only.
+MAGIC = b"THH\x01"
+MAX_SEATS = 10
+NO_CARD = 255
+
+FILE_HEADER = struct.Struct("<4sHH")
+BLOCK_HEADER = struct.Struct("<II")
+
+# Action codes; blinds are recorded as actions so the betting sequence is complete
+ACTION_CODES = {"fold": 0, "check": 1, "call": 2, "raise": 3, "small": 4, "big": 5}
+ACTION_NAMES = ("fold", "check", "call", "raise", "small_blind", "big_blind")
+FOLD, CHECK, CALL, RAISE, SMALL_BLIND, BIG_BLIND = range(6)
+STREET_INDEX = {street: index for index, street in enumerate(STREETS)}
+
+# One record per hand. first_action is the index of the hand's first action within its block.
+# chips are the stacks before the blinds; showdown_mask and winner_mask have one bit per seat.
+HAND_DTYPE = np.dtype([("hand_id", "<u8"), ("num_seats", "u1"), ("dealer", "u1"), ("showdown_mask", "<u2"),
+                       ("winner_mask", "<u2"), ("num_actions", "<u2"), ("first_action", "<u4"),
+                       ("small_blind", "<i4"), ("big_blind", "<i4"), ("hole_cards", "u1", (MAX_SEATS, 2)),
+                       ("board", "u1", (5,)), ("chips", "<i4", (MAX_SEATS,)), ("deltas", "<i4", (MAX_SEATS,))])
+
+# One record per action: amount is the seat's total bet on the street afterwards, pot the pot size
+ACTION_DTYPE = np.dtype([("seat", "u1"), ("street", "u1"), ("action", "u1"), ("flags", "u1"),
+                         ("amount", "<i4"), ("pot", "<i4")])
+
+
+class HandHistoryWriter:
+    def __init__(self, path, listener=None, block_hands=4096, max_pending=8):
+        """
+        Engine listener that appends every hand to a binary hand-history file. The game loop only
+        keeps each event's values in Python lists; a background thread packs every full block into
+        fixed-width records with bulk NumPy operations and writes it.
+        Use it as the engine's listener (other listeners can be chained behind it) and close it,
+        or use it as a context manager, to write the last partial block.
+        :param path: File to append to; the file header is written when the file is new or empty.
+                     A partly written last block (from an interrupted writer) is cut off first.
+        :param listener: Optional listener every event is passed on to.
+        :param block_hands: Hands per block.
+        :param max_pending: Blocks that may wait for the writer thread before the game loop blocks.
+        """
+        self.path = path
+        self.listener = listener
+        self.block_hands = block_hands
+        self.hand_id, end = complete_blocks(path) if os.path.exists(path) else (0, 0)
+        self.file = open(path, "r+b" if end else "wb")
+        self.file.truncate(end)
+        self.file.seek(end)
+        if end == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, HAND_DTYPE.itemsize, ACTION_DTYPE.itemsize))
+        self.error = None
+        self.queue = queue.Queue(max_pending)
+        self.thread = threading.Thread(target=self._write_blocks, name="hand-history-writer", daemon=True)
+        self.thread.start()
+
+        # Hand tuples and (seat, street, action code, amount, pot) action rows of the current block
+        self.hands = []
+        self.actions = []
+        self.block_start = self.hand_id
+        # Number of actions that belong to finished hands
+        self.ended_actions = 0
+        # Current hand
+        self.first_action = 0
+        self.dealer = 0
+        self.hole_cards = []
+        self.chips = []
+        self.board = ()
+        self.street = 0
+        self.winner_mask = 0
+        self.showdown = 0
+        self.small_blind = 0
+        self.big_blind = 0
+
+    def __call__(self, event, **details):
+        if event == "action":
+            # The most frequent event, kept to a single list append
+            self.actions.append((details["seat"], self.street, ACTION_CODES[details["action"]], details["amount"],
+                                 details["pot"]))
+        elif event == "street":
+            self.street = STREET_INDEX[details["street"]]
+            self.board = details["board"]
+        elif event == "blind":
+            amount = details["amount"]
+            if details["blind"] == "small":
+                self.small_blind = amount
+                self.actions.append((details["seat"], 0, SMALL_BLIND, amount, amount))
+            else:
+                self.big_blind = amount
+                self.actions.append((details["seat"], 0, BIG_BLIND, amount, self.small_blind + amount))
+        elif event == "hand_start":
+            chips = details["chips"]
+            if len(chips) > MAX_SEATS:
+                raise ValueError(f"Hand histories hold at most {MAX_SEATS} seats, got {len(chips)}.")
+            self.first_action = len(self.actions)
+            self.dealer = details["dealer"]
+            # The engine reuses its list of hole cards, but not the per-seat card lists
+            self.hole_cards = details["hole_cards"][:]
+            self.chips = chips
+            self.board = ()
+            self.street = self.winner_mask = self.showdown = self.small_blind = self.big_blind = 0
+        elif event == "win":
+            for seat in details["seats"]:
+                self.winner_mask |= 1 << seat
+            if details["rank"] is not None:
+                self.showdown = 1
+        elif event == "hand_end":
+            num_actions = len(self.actions)
+            self.hands.append((self.dealer, self.winner_mask, self.showdown, self.small_blind, self.big_blind,
+                               num_actions - self.first_action, self.hole_cards, self.board, self.chips,
+                               details["deltas"]))
+            self.ended_actions = num_actions
+            self.hand_id += 1
+            if len(self.hands) >= self.block_hands:
+                self.flush()
+        if self.listener:
+            self.listener(event, **details)
+
+    def flush(self):
+        """
+        Hands the completed hands to the writer thread as one block.
+        """
+        if self.error:
+            raise self.error
+        if self.hands:
+            # Actions of a hand still in progress stay for the next block
+            ended = self.ended_actions
+            self.queue.put((self.block_start, self.hands, self.actions[:ended]))
+            self.block_start += len(self.hands)
+            self.hands = []
+            del self.actions[:ended]
+            self.first_action -= ended
+            self.ended_actions = 0
+
+    def _write_blocks(self):
+        while True:
+            block = self.queue.get()
+            if block is None:
+                break
+            try:
+                self.file.write(pack_block(*block))
+            except OSError as error:
+                self.error = error
+
+    def close(self):
+        """
+        Writes the remaining hands and waits for the writer thread to finish.
+        """
+        if self.file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+            self.file.close()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _columns(rows, width):
+    """
+    Stacks equally long tuples of ints into a (len(rows), width) array without going through
+    Python objects per element.
+    """
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width).reshape(len(rows), width)
+
+
+def _padded(rows, width, fill):
+    """
+    Stacks variable-length rows of ints into a (len(rows), width) array padded with `fill`,
+    converting the rows of each length in one go.
+    """
+    out = np.full((len(rows), width), fill, dtype=np.int64)
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    for length in np.unique(lengths).tolist():
+        if length:
+            index = np.flatnonzero(lengths == length)
+            out[index, :length] = _columns([rows[i] for i in index.tolist()], length)
+    return out
+
+
+def pack_block(first_hand_id, hands, actions):
+    """
+    Packs the hands recorded by HandHistoryWriter into one block (header, hand records, action records).
+    :param first_hand_id: Id of the first hand of the block.
+    :param hands: (dealer, winner_mask, showdown, small_blind, big_blind, num_actions, hole_cards, board,
+                  chips, deltas) tuples.
+    :param actions: (seat, street, action code, amount, pot) tuples of those hands, in order.
+    :return: The block as bytes.
+    """
+    n = len(hands)
+    dealer, winner_mask, showdown, small_blind, big_blind, num_actions = _columns(
+        [hand[:6] for hand in hands], 6).T
+    hole_cards, board, chips, deltas = zip(*[hand[6:] for hand in hands])
+    action_rows = _columns(actions, 5)
+    records = np.zeros(len(actions), dtype=ACTION_DTYPE)
+    for column, name in enumerate(("seat", "street", "action", "amount", "pot")):
+        records[name] = action_rows[:, column]
+
+    hand_records = np.zeros(n, dtype=HAND_DTYPE)
+    num_seats = np.fromiter(map(len, chips), dtype=np.int64, count=n)
+    hand_records["hand_id"] = first_hand_id + np.arange(n)
+    hand_records["num_seats"] = num_seats
+    hand_records["dealer"] = dealer
+    hand_records["winner_mask"] = winner_mask
+    hand_records["num_actions"] = num_actions
+    hand_records["first_action"] = np.cumsum(num_actions) - num_actions
+    hand_records["small_blind"] = small_blind
+    hand_records["big_blind"] = big_blind
+    hole_cards = [tuple(chain.from_iterable(cards)) for cards in hole_cards]
+    hand_records["hole_cards"] = _padded(hole_cards, 2 * MAX_SEATS, NO_CARD).reshape(n, MAX_SEATS, 2)
+    hand_records["board"] = _padded(board, 5, NO_CARD)
+    hand_records["chips"] = _padded(chips, MAX_SEATS, 0)
+    hand_records["deltas"] = _padded(deltas, MAX_SEATS, 0)
+    # Seats still in at a showdown are the dealt seats that did not fold
+    folds = action_rows[:, 2] == FOLD
+    folded = np.zeros(n, dtype=np.int64)
+    np.bitwise_or.at(folded, np.repeat(np.arange(n), num_actions)[folds], 1 << action_rows[folds, 0])
+    hand_records["showdown_mask"] = np.where(showdown != 0, ((1 << num_seats) - 1) & ~folded, 0)
+    return BLOCK_HEADER.pack(n, len(actions)) + hand_records.tobytes() + records.tobytes()
+
+
+def complete_blocks(path):
+    """
+    Scans the block headers of a hand-history file (block contents are not read).
+    :return: (number of hands, byte offset of the end of the last complete block); the offset is 0
+             when the file does not even hold a complete file header.
+    """
+    size = os.path.getsize(path)
+    if size < FILE_HEADER.size:
+        return 0, 0
+    with open(path, "rb") as f:
+        magic, hand_size, action_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or hand_size != HAND_DTYPE.itemsize or action_size != ACTION_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a hand-history file of this version.")
+        hands = 0
+        end = FILE_HEADER.size
+        while end + BLOCK_HEADER.size <= size:
+            f.seek(end)
+            num_hands, num_actions = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+            block_end = end + BLOCK_HEADER.size + num_hands * HAND_DTYPE.itemsize + num_actions * ACTION_DTYPE.itemsize
+            if block_end > size:
+                break
+            hands += num_hands
+            end = block_end
+    return hands, end
+
+
+def read_blocks(path, shard=0, num_shards=1):
+    """
+    Memory-maps a hand-history file and yields its blocks as zero-copy NumPy record arrays, for
+    vectorized scans. A truncated last block (e.g. from an interrupted writer) is skipped.
+    :param path: File written by HandHistoryWriter.
+    :param shard: With num_shards, yields only blocks number shard, shard + num_shards, ..., so
+                  several processes can split one file; skipped blocks are never touched.
+    :return: Generator of (hands, actions) arrays with HAND_DTYPE and ACTION_DTYPE records.
+    """
+    if os.path.getsize(path) < FILE_HEADER.size:
+        return
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, hand_size, action_size = FILE_HEADER.unpack(data[:FILE_HEADER.size].tobytes())
+    if magic != MAGIC or hand_size != HAND_DTYPE.itemsize or action_size != ACTION_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a hand-history file of this version.")
+    offset = FILE_HEADER.size
+    index = 0
+    while offset + BLOCK_HEADER.size <= len(data):
+        num_hands, num_actions = BLOCK_HEADER.unpack(data[offset:offset + BLOCK_HEADER.size].tobytes())
+        offset += BLOCK_HEADER.size
+        hands_end = offset + num_hands * HAND_DTYPE.itemsize
+        actions_end = hands_end + num_actions * ACTION_DTYPE.itemsize
+        if actions_end > len(data):
+            return
+        if index % num_shards == shard:
+            yield data[offset:hands_end].view(HAND_DTYPE), data[hands_end:actions_end].view(ACTION_DTYPE)
+        offset = actions_end
+        index += 1
+
+
+def read_hands(path):
+    """
+    Streams the hands of a hand-history file one at a time.
+    :param path: File written by HandHistoryWriter.
+    :return: Generator of dictionaries with the hand id, dealer, blinds, hole cards and board (card
+             ints), starting chips, chip deltas, showdown and winning seats, and the actions as
+             (seat, street, action, amount, pot) tuples.
+    """
+    for hands, actions in read_blocks(path):
+        for hand in hands:
+            n = int(hand["num_seats"])
+            first = int(hand["first_action"])
+            board = hand["board"]
+            yield {"hand_id": int(hand["hand_id"]), "dealer": int(hand["dealer"]),
+                   "small_blind": int(hand["small_blind"]), "big_blind": int(hand["big_blind"]),
+                   "hole_cards": hand["hole_cards"][:n].tolist(), "board": board[board != NO_CARD].tolist(),
+                   "chips": hand["chips"][:n].tolist(), "deltas": hand["deltas"][:n].tolist(),
+                   "showdown": [seat for seat in range(n) if hand["showdown_mask"] >> seat & 1],
+                   "winners": [seat for seat in range(n) if hand["winner_mask"] >> seat & 1],
+                   "actions": [(seat, street, ACTION_NAMES[action], amount, pot) for seat, street, action, _, amount, pot
+                               in actions[first:first + int(hand["num_actions"])].tolist()]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a binary hand-history file.")
+    parser.add_argument("path")
+    parser.add_argument("--show", type=int, default=0, help="Print the first N hands")
+    args = parser.parse_args()
+
+    num_hands = num_actions = 0
+    for hands, actions in read_blocks(args.path):
+        num_hands += len(hands)
+        num_actions += len(actions)
+    print(f"{num_hands} hands, {num_actions} actions")
+    for hand, _ in zip(read_hands(args.path), range(args.show)):
+        print(hand)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from hand_evaluator import (CARD_BITS, CARD_KEYS, FLUSH_CHECK_ADD, FLUSH_CHECK_MASK, FLUSH_SUITS, RANK_TABLES,
+                            STRAIGHT_MASKS, SUIT_BITS, flush_rank, hand_category)
+
+
+class HandState:
+    __slots__ = ("cards", "key", "rank")
+
+    def __init__(self, hole_cards=()):
+        """
+        One player's evaluator state, updated street by street: the cards seen, their running key
+        (rank multiset and suit counts) and the rank of the best made hand so far. Adding the flop, turn or
+        river costs one table lookup, and at showdown the ranks are plain integers to compare
+        (higher wins, equal ranks split; kickers are part of the rank).
+        :param hole_cards: The player's hole card ints.
+        """
+        self.reset(hole_cards)
+
+    def reset(self, hole_cards):
+        """
+        Starts a new hand from the player's hole cards.
+        """
+        self.cards = []
+        self.key = 0
+        self.rank = 0
+        self.add(hole_cards)
+
+    def add(self, cards):
+        """
+        Adds newly dealt community cards and updates the best made hand.
+        :param cards: Card ints (e.g. the three flop cards).
+        """
+        key = self.key
+        for card in cards:
+            key += CARD_KEYS[card]
+        self.key = key
+        held = self.cards
+        held.extend(cards)
+        if len(held) >= 5:
+            flush = (key + FLUSH_CHECK_ADD) & FLUSH_CHECK_MASK
+            if flush:
+                self.rank = flush_rank(held, FLUSH_SUITS[flush])
+            else:
+                self.rank = RANK_TABLES[len(held)][key >> SUIT_BITS]
+
+    @property
+    def num_cards(self):
+        return len(self.cards)
+
+    @property
+    def category(self):
+        """
+        Category of the best made hand (see hand_evaluator), or None before the flop.
+        """
+        return hand_category(self.rank) if self.rank else None
+
+    @property
+    def flush_draw(self):
+        """
+        True when four cards of one suit are held and more cards are to come.
+        """
+        if self.num_cards >= 7:
+            return False
+        return any(((self.key >> (4 * suit)) & 0xF) == 4 for suit in range(4))
+
+    @property
+    def straight_outs(self):
+        """
+        Bit mask of the ranks that would complete a straight not yet made (one bit for a gutshot,
+        two for an open-ended draw); 0 once the river is out.
+        """
+        if self.num_cards >= 7:
+            return 0
+        outs = 0
+        rank_mask = 0
+        for card in self.cards:
+            rank_mask |= CARD_BITS[card]
+        for straight, _ in STRAIGHT_MASKS:
+            missing = straight & ~rank_mask
+            if missing and not missing & (missing - 1):
+                outs |= missing
+        return outs
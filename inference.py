@@ -0,0 +1,67 @@
+import numpy as np
+import torch
+
+
+class BatchInference:
+    def __init__(self, model, max_batch=4096):
+        """
+        Answers pending decisions from many tables or seats with a single forward pass.
+        Inputs are written into one preallocated buffer that shares memory with the model's
+        input tensor, and the pass runs under torch.inference_mode.
+        :param model: A PokerAIModel (or any module mapping (B, input_size) to (B, actions)).
+        :param max_batch: Capacity of the input buffer; a full buffer is flushed automatically.
+        """
+        self.model = model
+        model.eval()
+        self.input_size = model.fc[0].in_features
+        self.max_batch = max_batch
+        self.inputs = torch.zeros((max_batch, self.input_size), dtype=torch.float32)
+        self.buffer = self.inputs.numpy()
+        self.callbacks = [None] * max_batch
+        self.pending = 0
+
+    def submit(self, state, callback):
+        """
+        Queues one decision.
+        :param state: Encoded state (input_size floats).
+        :param callback: Called with the chosen action index (0 fold, 1 call, 2 raise) on the next flush.
+        """
+        if self.pending == self.max_batch:
+            self.flush()
+        self.buffer[self.pending] = state
+        self.callbacks[self.pending] = callback
+        self.pending += 1
+
+    def flush(self):
+        """
+        Runs one forward pass over every queued decision and delivers the actions to their callbacks.
+        :return: Number of decisions answered.
+        """
+        count = self.pending
+        if not count:
+            return 0
+        actions = self._forward(count).tolist()
+        callbacks = self.callbacks[:count]
+        self.pending = 0
+        for callback, action in zip(callbacks, actions):
+            callback(action)
+        return count
+
+    def act(self, states):
+        """
+        Chooses actions for a whole array of states at once.
+        :param states: Array of shape (N, input_size).
+        :return: int64 array of shape (N,) with the greedy action per state.
+        """
+        self.flush()
+        states = np.asarray(states, dtype=np.float32)
+        actions = np.empty(states.shape[0], dtype=np.int64)
+        for start in range(0, states.shape[0], self.max_batch):
+            chunk = states[start:start + self.max_batch]
+            self.buffer[:chunk.shape[0]] = chunk
+            actions[start:start + chunk.shape[0]] = self._forward(chunk.shape[0])
+        return actions
+
+    def _forward(self, count):
+        with torch.inference_mode():
+            return self.model(self.inputs[:count]).argmax(dim=1).numpy()
@@ -0,0 +1,106 @@
+import time
+from collections import Counter
+
+from engine import STREETS
+
+
+class Histogram:
+    def __init__(self):
+        """
+        Timing histogram with power-of-two microsecond buckets: bucket b counts durations in
+        [2^(b-1), 2^b) microseconds (bucket 0 is under a microsecond).
+        """
+        self.buckets = [0] * 40
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), 39)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """
+        Upper bound of the bucket holding the given fraction of the samples, in microseconds.
+        """
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return float(1 << bucket)
+        return 0.0
+
+    def summary(self):
+        """
+        :return: Dictionary with the sample count, mean, approximate percentiles and maximum in microseconds.
+        """
+        return {"count": self.count, "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+                "p50_us": self.percentile(0.5), "p90_us": self.percentile(0.9), "p99_us": self.percentile(0.99),
+                "max_us": self.max * 1e6}
+
+
+class GameProfiler:
+    def __init__(self):
+        """
+        Opt-in instrumentation for HandEngine: per-street and per-decision timing histograms and
+        event counters. Nothing is measured unless the profiler is attached to an engine, so an
+        engine without one runs exactly as before.
+        """
+        self.street_times = {street: Histogram() for street in STREETS}
+        self.decision_times = {street: Histogram() for street in STREETS}
+        self.hand_times = Histogram()
+        self.counters = Counter()
+        self.listener = None
+        self.street = None
+        self.street_start = 0.0
+        self.hand_start = 0.0
+
+    def attach(self, engine):
+        """
+        Times the engine's agents and listens to its events, passing them on to its existing listener.
+        """
+        engine.agents = [self._timed(agent) for agent in engine.agents]
+        self.listener = engine.listener
+        engine.listener = self
+        return engine
+
+    def _timed(self, agent):
+        decision_times = self.decision_times
+
+        def timed_agent(engine, seat):
+            start = time.perf_counter()
+            decision = agent(engine, seat)
+            decision_times[STREETS[engine.street]].add(time.perf_counter() - start)
+            return decision
+
+        return timed_agent
+
+    def __call__(self, event, **details):
+        now = time.perf_counter()
+        self.counters[event] += 1
+        if event == "street" or event == "hand_end":
+            if self.street is not None:
+                self.street_times[self.street].add(now - self.street_start)
+            self.street = details["street"] if event == "street" else None
+            self.street_start = now
+        if event == "action":
+            self.counters[details["action"]] += 1
+        elif event == "hand_start":
+            self.hand_start = now
+        elif event == "hand_end":
+            self.hand_times.add(now - self.hand_start)
+        if self.listener:
+            self.listener(event, **details)
+
+    def report(self):
+        """
+        :return: Machine-readable dictionary of every histogram summary and counter.
+        """
+        return {"hands": self.hand_times.summary(),
+                "streets": {street: histogram.summary() for street, histogram in self.street_times.items()},
+                "decisions": {street: histogram.summary() for street, histogram in self.decision_times.items()},
+                "counters": dict(self.counters)}
@@ -1,223 +1,190 @@
-from game_mechanics import Deck, Player
-from ai_logic import AIDecisionMaker
-from rl_model import PokerAIModel
-from utils import calculate_hand_strength
-import torch
+import argparse
 
+from game_mechanics import CARDS, Player
+from ai_logic import AIDecisionMaker, DecisionCache
+from engine import DecisionMakerAgent, HandEngine
+from equity import EquityCache
+from opponent_model import OPPONENT_FEATURES, OpponentModel
+from state_encoder import StateEncoder
+from utils import HAND_NAMES
+from hand_evaluator import hand_category
+from vec_env import OBSERVATION_SIZE
 
-def betting_round(players, ai_models, community_cards, pot_size, highest_bet, start_index):
+
+def human_agent(engine, seat):
     """
-    Handles a betting round where all active players must act until the betting resolves.
-    :param players: List of all players.
-    :param ai_models: List of AI decision models.
-    :param community_cards: Current community cards.
-    :param pot_size: Current pot size.
-    :param highest_bet: The highest bet placed in this round.
-    :param start_index: Index of the player who acts first in this round.
-    :return: Updated pot_size, highest_bet, and a boolean indicating if the hand is complete.
+    Asks the human at the terminal for an action.
+    :param engine: The HandEngine playing the hand.
+    :param seat: The human's seat.
+    :return: An engine action.
     """
-    current_index = start_index
+    owed = engine.to_call(seat)
+    print(f"\nCurrent Pot: {engine.pot}, to call: {owed}, your chips: {engine.chips[seat]}")
+    options = ["fold", "call"] if owed else ["check"]
+    if engine.can_raise(seat):
+        options.append("raise")
     while True:
-        changes_made = False
-        for _ in range(len(players)):
-            player = players[current_index]
-            if not player.active:
-                current_index = (current_index + 1) % len(players)
-                continue
-
-            print(f"\nCurrent Pot: {pot_size}")
-            print("Player Purses:")
-            for p in players:
-                print(f"{p.name}: {p.chips} chips")
-
-            print(f"{player.name}'s turn to act.")
-
-            if "AI" in player.name:
-                # AI action
-                ai = ai_models[current_index]
-                win_prob = ai.calculate_win_probability(player.hand, community_cards)
-                pot_odds = (highest_bet - player.current_bet) / max(1, pot_size)
-
-                action = ai.decide_action(player.hand, community_cards, pot_odds)
-                if action == "fold":
-                    print(f"{player.name} (AI) chose to fold.")
-                    player.active = False
-                elif action == "call":
-                    call_amount = min(highest_bet - player.current_bet, player.chips)
-                    player.chips -= call_amount
-                    player.current_bet += call_amount
-                    pot_size += call_amount
-                    print(f"{player.name} (AI) called.")
-                elif action == "raise" and player.chips > highest_bet * 2:
-                    raise_amount = min(highest_bet * 2, player.chips)
-                    call_amount = highest_bet - player.current_bet
-                    total_raise = call_amount + raise_amount
-                    player.chips -= total_raise
-                    player.current_bet += total_raise
-                    highest_bet = player.current_bet
-                    pot_size += total_raise
-                    print(f"{player.name} (AI) raised to {highest_bet} chips.")
-                    changes_made = True
-            else:
-                # Human action
-                if player.current_bet < highest_bet:
-                    while True:
-                        action = input("Choose your action (fold, call, raise): ").strip().lower()
-                        if action == "fold":
-                            print(f"{player.name} chose to fold.")
-                            player.active = False
-                            break
-                        elif action == "call":
-                            call_amount = min(highest_bet - player.current_bet, player.chips)
-                            player.chips -= call_amount
-                            player.current_bet += call_amount
-                            pot_size += call_amount
-                            print(f"{player.name} chose to call.")
-                            break
-                        elif action == "raise" and player.chips > highest_bet * 2:
-                            raise_amount = min(highest_bet * 2, player.chips)
-                            call_amount = highest_bet - player.current_bet
-                            total_raise = call_amount + raise_amount
-                            player.chips -= total_raise
-                            player.current_bet += total_raise
-                            highest_bet = player.current_bet
-                            pot_size += total_raise
-                            print(f"{player.name} raised to {highest_bet} chips.")
-                            changes_made = True
-                            break
-                        else:
-                            print("Invalid action. Choose 'fold', 'call', or 'raise'.")
-                else:
-                    while True:
-                        action = input("Choose your action (check, raise): ").strip().lower()
-                        if action == "check":
-                            print(f"{player.name} chose to check.")
-                            break
-                        elif action == "raise" and player.chips > highest_bet * 2:
-                            raise_amount = min(highest_bet * 2, player.chips)
-                            player.chips -= raise_amount
-                            player.current_bet += raise_amount
-                            highest_bet = player.current_bet
-                            pot_size += raise_amount
-                            print(f"{player.name} raised to {highest_bet} chips.")
-                            changes_made = True
-                            break
-                        else:
-                            print("Invalid action. Choose 'check' or 'raise'.")
-
-            # Check if only one player remains
-            active_players = [p for p in players if p.active]
-            if len(active_players) == 1:
-                winner = active_players[0]
-                print(f"Winner: {winner.name} (last player standing).")
-                winner.chips += pot_size
-                return pot_size, highest_bet, True
-
-            current_index = (current_index + 1) % len(players)
-
-        # End betting round if no changes and bets are matched
-        active_players = [p for p in players if p.active]
-        if not changes_made and all(p.current_bet == highest_bet for p in active_players):
-            break
+        action = input(f"Choose your action ({', '.join(options)}): ").strip().lower()
+        if action == "check" and not owed:
+            return "call"
+        if action in options and action != "raise":
+            return action
+        if action == "raise" and action in options:
+            minimum, maximum = engine.min_raise_to(), engine.bets[seat] + engine.chips[seat]
+            amount = input(f"Raise to ({min(minimum, maximum)}-{maximum}, Enter for {min(minimum, maximum)}): ").strip()
+            if not amount:
+                return "raise"
+            if amount.isdigit():
+                return "raise", int(amount)
+        print(f"Invalid action. Choose {', '.join(repr(option) for option in options)}.")
+
+
+class TerminalListener:
+    def __init__(self, players):
+        """
+        Prints engine events for the players at the terminal.
+        :param players: Player objects, in seat order.
+        """
+        self.players = players
+        self.engine = None
+
+    def __call__(self, event, **details):
+        getattr(self, f"on_{event}")(**details)
+
+    def on_hand_start(self, dealer, hole_cards, chips):
+        print("New Hand Begins!")
+        for player, cards in zip(self.players, hole_cards):
+            player.clear_hand()
+            player.receive_cards([CARDS[card] for card in cards])
+            print(f"{player.name}'s Hand: {'[Hidden]' if 'AI' in player.name else player.show_hand()}")
 
-    return pot_size, highest_bet, False
+    def on_blind(self, seat, amount, blind):
+        print(f"{self.players[seat].name} posts the {blind} blind: {amount}")
+        self.players[seat].current_bet = amount
+
+    def on_street(self, street, board):
+        print(f"\n--- {street} Phase ---")
+        print(f"Community Cards: {', '.join(str(CARDS[card]) for card in board) if board else 'None'}")
+        self.print_purses()
+
+    def on_action(self, seat, action, amount, pot):
+        player = self.players[seat]
+        player.current_bet = amount
+        if action == "raise":
+            print(f"{player.name} raised to {amount} chips.")
+        elif action == "fold":
+            print(f"{player.name} chose to fold.")
+        elif action == "check":
+            print(f"{player.name} chose to check.")
+        else:
+            print(f"{player.name} called.")
+
+    def on_win(self, seats, amount, rank):
+        names = ", ".join(self.players[seat].name for seat in seats)
+        if rank is None:
+            print(f"Winner: {names} (last player standing).")
+        elif len(seats) == 1:
+            print(f"Winner: {names} wins {amount} (best hand: {HAND_NAMES[hand_category(rank)]}).")
+        else:
+            print(f"Split pot of {amount} between {names} ({HAND_NAMES[hand_category(rank)]}).")
 
+    def on_hand_end(self, deltas):
+        for player in self.players:
+            player.current_bet = 0
 
-def main():
-    # Initialize game components
-    deck = Deck()
-    players = [Player(f"AI{i + 1}") for i in range(5)] + [Player("Human")]
-    dealer_index = 0  # Start with the first player as the dealer
+    def print_purses(self):
+        print(f"Current Pot: {self.engine.pot}")
+        print("Player Purses:")
+        for player, chips in zip(self.players, self.engine.chips):
+            print(f"{player.name}: {chips} chips")
 
-    # Create individual AI models for each AI player
-    ai_models = [AIDecisionMaker(PokerAIModel(input_size=10, action_size=3)) for _ in range(5)]
 
-    # Load the pre-trained AI model into each AI
-    for i, model in enumerate(ai_models):
+def load_models(checkpoints, backend="torch", input_size=OBSERVATION_SIZE):
+    """
+    Loads the AI players' models; torch is only imported here. Seats naming the same checkpoint
+    share a single copy of its weights.
+    :param checkpoints: Checkpoint path per AI player.
+    :param backend: 'torch', or 'numpy' to run the models with numpy_model.NumpyPokerModel.
+    :param input_size: Length of the state vector the models must have been trained on.
+    :return: List of models, or None if one could not be loaded.
+    """
+    if backend == "numpy":
+        from numpy_model import load as load_numpy_model
+
+        def load_model(checkpoint):
+            model = load_numpy_model(checkpoint)
+            if model.input_size != input_size:
+                raise ValueError(f"{checkpoint} was trained on {model.input_size} inputs, not {input_size}.")
+            return model
+    else:
+        from rl_model import load_model as load_torch_model
+
+        def load_model(checkpoint):
+            return load_torch_model(checkpoint, input_size)
+    models = []
+    for i, checkpoint in enumerate(checkpoints):
         try:
-            model.model.load_state_dict(torch.load(f"trained_model_{i + 1}.pth", weights_only=True))
+            models.append(load_model(checkpoint))
         except FileNotFoundError:
-            print(f"Trained model for AI{i + 1} not found. Ensure 'trained_model_{i + 1}.pth' is available.")
-            return
+            print(f"Trained model for AI{i + 1} not found. Ensure '{checkpoint}' is available.")
+            return None
+        except ValueError as e:
+            print(f"Model for AI{i + 1} does not fit: {e}")
+            if input_size != OBSERVATION_SIZE:
+                print("--opponent-model needs checkpoints trained with `training.py --opponent-model` "
+                      "or `actor_learner.py --opponent-model`.")
+            return None
         except Exception as e:
             print(f"Error loading model for AI{i + 1}: {e}")
-            return
+            return None
+    return models
 
-    # Main game flow
-    while len(players) > 1:  # Ensure at least two players are in the game
-        deck.reshuffle()
-        community_cards = []
-        pot_size = 0
 
-        # Reset player states and deal cards
-        for player in players:
-            player.clear_hand()
-            player.receive_cards(deck.deal(2))
-            player.active = True
-            player.current_bet = 0
+def main():
+    parser = argparse.ArgumentParser(description="Play No-Limit Texas Hold'em against five AI players.")
+    parser.add_argument("--heuristic", action="store_true",
+                        help="Use equity-based heuristic AIs only; no models are loaded and torch is never imported")
+    parser.add_argument("--models", nargs=5, metavar="CHECKPOINT", default=[f"trained_model_{i + 1}.pth" for i in range(5)],
+                        help="Checkpoint for each AI player (repeating a file shares its weights)")
+    parser.add_argument("--backend", choices=("torch", "numpy"), default="torch",
+                        help="Run the models with torch or with the NumPy inference backend")
+    parser.add_argument("--opponent-model", action="store_true",
+                        help="Track the opponents' tendencies and add them to the state vector (for models "
+                             f"trained with --opponent-model, on {OBSERVATION_SIZE + OPPONENT_FEATURES} inputs)")
+    args = parser.parse_args()
 
-        print("New Hand Begins!")
-        for player in players:
-            print(f"{player.name}'s Hand: {'[Hidden]' if 'AI' in player.name else player.show_hand()}")
+    # Initialize game components
+    players = [Player(f"AI{i + 1}") for i in range(5)] + [Player("Human")]
+    dealer_index = 0  # Start with the first player as the dealer
 
-        # Assign blinds
-        small_blind_index = (dealer_index + 1) % len(players)
-        big_blind_index = (dealer_index + 2) % len(players)
-        small_blind, big_blind = players[small_blind_index], players[big_blind_index]
-
-        small_blind_bet = 50
-        big_blind_bet = 100
-        small_blind.chips -= small_blind_bet
-        big_blind.chips -= big_blind_bet
-        small_blind.current_bet = small_blind_bet
-        big_blind.current_bet = big_blind_bet
-        pot_size = small_blind_bet + big_blind_bet
-
-        print(f"{small_blind.name} posts the small blind: {small_blind_bet}")
-        print(f"{big_blind.name} posts the big blind: {big_blind_bet}")
-
-        highest_bet = big_blind_bet
-
-        # Progress through the game phases
-        for phase in ["Pre-Flop", "Flop", "Turn", "River"]:
-            if phase == "Flop":
-                community_cards.extend(deck.deal(3))
-            elif phase in ["Turn", "River"]:
-                community_cards.extend(deck.deal(1))
-
-            print(f"\n--- {phase} Phase ---")
-            print(f"Community Cards: {', '.join(str(card) for card in community_cards) if community_cards else 'None'}")
-            print(f"Current Pot: {pot_size}")
-            print("Player Purses:")
-            for p in players:
-                print(f"{p.name}: {p.chips} chips")
-
-            # Run betting round
-            start_index = (big_blind_index + 1) % len(players)
-            pot_size, highest_bet, hand_complete = betting_round(
-                players, ai_models, community_cards, pot_size, highest_bet, start_index
-            )
-
-            if hand_complete:
-                break
-
-        # Determine winner
-        active_players = [p for p in players if p.active]
-        if len(active_players) == 1:
-            winner = active_players[0]
-            print(f"Winner: {winner.name} (last player standing).")
-            winner.chips += pot_size
-        else:
-            hand_strengths = [
-                calculate_hand_strength(player.hand, community_cards) for player in active_players
-            ]
-            winner_index = max(range(len(hand_strengths)), key=lambda i: hand_strengths[i][0])
-            winner = active_players[winner_index]
-            print(f"Winner: {winner.name} (best hand).")
-            winner.chips += pot_size
+    # Create an AI decision maker for each AI player, backed by its pre-trained model unless heuristic-only
+    equity_cache = EquityCache()
+    input_size = OBSERVATION_SIZE + (OPPONENT_FEATURES if args.opponent_model else 0)
+    models = [None] * 5 if args.heuristic else load_models(args.models, args.backend, input_size)
+    if models is None:
+        return
+    ai_models = [AIDecisionMaker(model, equity_cache=equity_cache, decision_cache=DecisionCache()) for model in models]
+    # Opponent statistics carry over from hand to hand
+    opponent_model = OpponentModel(len(players)) if args.opponent_model else None
+
+    # Main game flow
+    while len(players) > 1:  # Ensure at least two players are in the game
+        listener = TerminalListener(players)
+        encoder = StateEncoder(len(players), listener=listener, opponent_model=opponent_model)
+        agents = {f"AI{i + 1}": DecisionMakerAgent(ai, encoder) for i, ai in enumerate(ai_models)}
+        agents["Human"] = human_agent
+        engine = HandEngine([agents[player.name] for player in players], listener=encoder)
+        listener.engine = engine
+        chips = [player.chips for player in players]
+        engine.play_hand(chips, dealer_index)
+        for player, stack in zip(players, chips):
+            player.chips = stack
 
         # Remove players with no chips
-        players = [p for p in players if p.chips > 0]
+        remaining = [seat for seat, player in enumerate(players) if player.chips > 0]
+        players = [players[seat] for seat in remaining]
+        if opponent_model:
+            opponent_model.keep(remaining)
 
         # Rotate dealer
         dealer_index = (dealer_index + 1) % len(players)
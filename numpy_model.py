@@ -0,0 +1,147 @@
+import argparse
+import os
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+# Models loaded by `load`, keyed by file path and dtype
+_loaded_models = {}
+
+
+class NumpyPokerModel:
+    def __init__(self, weights, biases, scales=None):
+        """
+        Torch-free forward pass of a PokerAIModel-style MLP (Linear layers with ReLU in between).
+        Weights are kept transposed, as contiguous (in, out) arrays, in float32, float16 or int8;
+        int8 weights carry one float32 scale per output unit. The reduced precisions shrink the saved
+        file; the forward pass runs on float32 copies dequantized once here, not on every call.
+        :param weights: Weight arrays per layer, shape (in, out).
+        :param biases: float32 bias arrays per layer.
+        :param scales: float32 scale arrays per layer for int8 weights (None otherwise).
+        """
+        self.weights = [np.ascontiguousarray(weight) for weight in weights]
+        self.biases = [np.ascontiguousarray(bias, dtype=np.float32) for bias in biases]
+        self.scales = scales
+        self.dtype = self.weights[0].dtype.name
+        self.input_size = self.weights[0].shape[0]
+        if scales is None:
+            self.float_weights = [weight.astype(np.float32, copy=False) for weight in self.weights]
+        else:
+            self.float_weights = [weight.astype(np.float32) * scale for weight, scale in zip(self.weights, scales)]
+
+    @classmethod
+    def from_state_dict(cls, state_dict, dtype="float32"):
+        """
+        Exports the Linear layers of a PokerAIModel state dict.
+        :param state_dict: Mapping of parameter names to torch tensors or arrays.
+        :param dtype: Weight precision: 'float32', 'float16' or 'int8' (symmetric, per output unit).
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; choose one of {', '.join(DTYPES)}.")
+        prefixes = [name[:-len(".weight")] for name in state_dict if name.endswith(".weight")]
+        weights, biases, scales = [], [], []
+        for prefix in prefixes:
+            weight = np.asarray(state_dict[prefix + ".weight"], dtype=np.float32).T
+            biases.append(np.asarray(state_dict[prefix + ".bias"], dtype=np.float32))
+            if dtype == "int8":
+                scale = np.maximum(np.abs(weight).max(axis=0), 1e-12) / 127.0
+                weights.append(np.round(weight / scale).astype(np.int8))
+                scales.append(scale.astype(np.float32))
+            else:
+                weights.append(weight.astype(dtype))
+        return cls(weights, biases, scales if dtype == "int8" else None)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, dtype="float32"):
+        """
+        Converts a torch .pth checkpoint; this is the only path that needs torch.
+        """
+        import torch
+        return cls.from_state_dict({name: tensor.numpy() for name, tensor in
+                                    torch.load(checkpoint, weights_only=True).items()}, dtype)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads weights saved with `save`, without torch.
+        """
+        with np.load(path) as data:
+            count = int(data["layers"])
+            weights = [data[f"weight{i}"] for i in range(count)]
+            biases = [data[f"bias{i}"] for i in range(count)]
+            scales = [data[f"scale{i}"] for i in range(count)] if "scale0" in data else None
+        return cls(weights, biases, scales)
+
+    def save(self, path):
+        """
+        Saves the exported weights as an .npz file.
+        """
+        arrays = {"layers": np.array(len(self.weights))}
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"weight{i}"] = weight
+            arrays[f"bias{i}"] = bias
+            if self.scales is not None:
+                arrays[f"scale{i}"] = self.scales[i]
+        np.savez(path, **arrays)
+
+    def forward(self, states):
+        """
+        :param states: Array of shape (N, input_size) or (input_size,).
+        :return: float32 action values of shape (N, actions) or (actions,).
+        """
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.float_weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+        return x
+
+    def predict(self, state):
+        """
+        Same contract as PokerAIModel.predict: action values for one state (or a batch).
+        """
+        return self.forward(state)
+
+    def act(self, states):
+        """
+        Greedy actions for an array of states, like BatchInference.act.
+        :return: int64 array of shape (N,).
+        """
+        return self.forward(states).argmax(axis=-1)
+
+
+def load(path, dtype="float32"):
+    """
+    Loads a NumPy model from an .npz file (torch-free) or converts a .pth checkpoint. Every caller
+    asking for the same file and dtype gets the same instance.
+    :param path: Path of a file written by NumpyPokerModel.save, or of a torch checkpoint.
+    :param dtype: Weight precision used when converting a torch checkpoint.
+    :return: NumpyPokerModel.
+    """
+    key = (os.path.realpath(path), dtype)
+    model = _loaded_models.get(key)
+    if model is None:
+        if path.endswith(".npz"):
+            model = NumpyPokerModel.from_file(path)
+        else:
+            model = NumpyPokerModel.from_checkpoint(path, dtype)
+        _loaded_models[key] = model
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export PokerAIModel checkpoints to torch-free .npz files.")
+    parser.add_argument("checkpoints", nargs="+")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32")
+    args = parser.parse_args()
+    for checkpoint in args.checkpoints:
+        output = os.path.splitext(checkpoint)[0] + (".npz" if args.dtype == "float32" else f".{args.dtype}.npz")
+        NumpyPokerModel.from_checkpoint(checkpoint, args.dtype).save(output)
+        print(f"{checkpoint} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
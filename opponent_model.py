@@ -0,0 +1,158 @@
+from engine import STREETS
+
+# Number of features OpponentModel.features writes
+OPPONENT_FEATURES = 4
+
+# Prior frequencies and their weight in observations, so a seat with little history reads as an
+# average opponent rather than an extreme one
+PRIOR_WEIGHT = 2.0
+PRIOR_FOLD_TO_RAISE = 0.5
+PRIOR_RAISE = 0.2
+PRIOR_BET_SIZE = 0.75
+# Bet sizes (fractions of the pot) are capped here when scaled into a feature
+MAX_BET_SIZE = 2.0
+
+
+class OpponentModel:
+    def __init__(self, num_seats, decay=0.98, listener=None):
+        """
+        Tendencies of the player in each seat, learned from HandEngine events across hands: how often
+        they fold when facing a raise, how often they raise on each street, and their average raise
+        size. Each statistic is a pair of exponentially decayed counts kept in per-seat lists, so an
+        action updates a handful of numbers in constant time and old behaviour fades out.
+        Use it as an engine listener, or pass it to StateEncoder, which forwards the events and
+        appends `features` to the model's input vector.
+        :param num_seats: Number of seats at the table.
+        :param decay: Weight kept by past observations of a seat each time it is observed again.
+        :param listener: Optional listener every event is passed on to.
+        """
+        self.num_seats = num_seats
+        self.decay = decay
+        self.listener = listener
+        n = num_seats
+        self.fold_chances = [0.0] * n
+        self.folds = [0.0] * n
+        self.street_actions = [[0.0] * n for _ in STREETS]
+        self.street_raises = [[0.0] * n for _ in STREETS]
+        self.raise_count = [0.0] * n
+        self.raise_sizes = [0.0] * n
+
+        # Betting state of the current hand
+        self.bets = [0] * n
+        self.folded = [False] * n
+        self.highest_bet = 0
+        self.raised = False
+        self.street = 0
+        self.handlers = {"hand_start": self.on_hand_start, "blind": self.on_blind, "street": self.on_street,
+                         "action": self.on_action}
+
+    def __call__(self, event, **details):
+        handler = self.handlers.get(event)
+        if handler:
+            handler(**details)
+        if self.listener:
+            self.listener(event, **details)
+
+    def on_hand_start(self, dealer, hole_cards, chips):
+        for seat in range(self.num_seats):
+            self.bets[seat] = 0
+            self.folded[seat] = False
+        self.highest_bet = 0
+        self.raised = False
+        self.street = 0
+
+    def on_blind(self, seat, amount, blind):
+        self.bets[seat] += amount
+        if self.bets[seat] > self.highest_bet:
+            self.highest_bet = self.bets[seat]
+
+    def on_street(self, street, board):
+        self.street = STREETS.index(street)
+        if self.street:
+            for seat in range(self.num_seats):
+                self.bets[seat] = 0
+            self.highest_bet = 0
+            self.raised = False
+
+    def on_action(self, seat, action, amount, pot):
+        decay = self.decay
+        before = self.bets[seat]
+        if self.raised and before < self.highest_bet:
+            self.fold_chances[seat] = self.fold_chances[seat] * decay + 1.0
+            self.folds[seat] = self.folds[seat] * decay + (action == "fold")
+        actions = self.street_actions[self.street]
+        actions[seat] = actions[seat] * decay + 1.0
+        raises = self.street_raises[self.street]
+        if action == "raise":
+            raises[seat] = raises[seat] * decay + 1.0
+            pot_before = pot - (amount - before)
+            self.raise_count[seat] = self.raise_count[seat] * decay + 1.0
+            self.raise_sizes[seat] = self.raise_sizes[seat] * decay + (amount - before) / max(pot_before, 1)
+            self.highest_bet = amount
+            self.raised = True
+        else:
+            raises[seat] *= decay
+            if action == "fold":
+                self.folded[seat] = True
+        self.bets[seat] = amount
+
+    def fold_to_raise(self, seat):
+        """
+        Share of the times `seat` faced a raise that it folded.
+        """
+        return (self.folds[seat] + PRIOR_WEIGHT * PRIOR_FOLD_TO_RAISE) / (self.fold_chances[seat] + PRIOR_WEIGHT)
+
+    def raise_frequency(self, seat, street):
+        """
+        Share of the actions of `seat` on the given street (index into STREETS) that were raises.
+        """
+        return ((self.street_raises[street][seat] + PRIOR_WEIGHT * PRIOR_RAISE)
+                / (self.street_actions[street][seat] + PRIOR_WEIGHT))
+
+    def bet_size(self, seat):
+        """
+        Average chips `seat` puts in when raising, as a fraction of the pot before the raise.
+        """
+        return (self.raise_sizes[seat] + PRIOR_WEIGHT * PRIOR_BET_SIZE) / (self.raise_count[seat] + PRIOR_WEIGHT)
+
+    def features(self, seat, out):
+        """
+        Writes the opponent features for a decision by `seat` into `out`: the average fold-to-raise
+        frequency, the average and highest raise frequency on the current street, and the average
+        raise size (pot fraction, scaled to [0, 1]) of the opponents still in the hand.
+        :param out: Array with room for OPPONENT_FEATURES values.
+        """
+        count = 0
+        fold = raise_sum = raise_max = size = 0.0
+        street = self.street
+        for other in range(self.num_seats):
+            if other == seat or self.folded[other]:
+                continue
+            count += 1
+            fold += self.fold_to_raise(other)
+            frequency = self.raise_frequency(other, street)
+            raise_sum += frequency
+            if frequency > raise_max:
+                raise_max = frequency
+            size += self.bet_size(other)
+        if not count:
+            out[0], out[1], out[2], out[3] = PRIOR_FOLD_TO_RAISE, PRIOR_RAISE, PRIOR_RAISE, PRIOR_BET_SIZE / MAX_BET_SIZE
+            return
+        out[0] = fold / count
+        out[1] = raise_sum / count
+        out[2] = raise_max
+        out[3] = min(size / count, MAX_BET_SIZE) / MAX_BET_SIZE
+
+    def keep(self, seats):
+        """
+        Keeps the statistics of the given seats only, renumbered in that order; used when players
+        leave the table and the remaining ones move up.
+        """
+        for name in ("fold_chances", "folds", "raise_count", "raise_sizes"):
+            values = getattr(self, name)
+            setattr(self, name, [values[seat] for seat in seats])
+        self.street_actions = [[values[seat] for seat in seats] for values in self.street_actions]
+        self.street_raises = [[values[seat] for seat in seats] for values in self.street_raises]
+        self.num_seats = len(seats)
+        self.bets = [0] * self.num_seats
+        self.folded = [False] * self.num_seats
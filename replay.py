@@ -0,0 +1,145 @@
+import numpy as np
+
+from vec_env import OBSERVATION_SIZE
+
+
+class ReplayBuffer:
+    def __init__(self, capacity, state_size=OBSERVATION_SIZE, batch_size=256, seed=None, arrays=None):
+        """
+        Fixed-capacity ring buffer of transitions stored in preallocated NumPy arrays.
+        Once full, new transitions overwrite the oldest ones.
+        :param capacity: Maximum number of transitions.
+        :param state_size: Length of a state vector.
+        :param batch_size: Size of the minibatches returned by `sample`, whose arrays are also preallocated.
+        :param seed: Seed for minibatch sampling.
+        :param arrays: Optional dict with existing 'states', 'actions', 'rewards', 'next_states' and 'dones'
+                       arrays to use as storage (e.g. backed by shared memory).
+        """
+        if arrays is None:
+            arrays = {
+                "states": np.zeros((capacity, state_size), dtype=np.float32),
+                "actions": np.zeros(capacity, dtype=np.int64),
+                "rewards": np.zeros(capacity, dtype=np.float32),
+                "next_states": np.zeros((capacity, state_size), dtype=np.float32),
+                "dones": np.zeros(capacity, dtype=np.float32),
+            }
+        self.states = arrays["states"]
+        self.actions = arrays["actions"]
+        self.rewards = arrays["rewards"]
+        self.next_states = arrays["next_states"]
+        self.dones = arrays["dones"]
+        self.capacity = capacity
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+        self.batch = {name: np.zeros((batch_size,) + array.shape[1:], dtype=array.dtype)
+                      for name, array in arrays.items()}
+
+    def add(self, state, action, reward, next_state, done):
+        """
+        Stores one transition.
+        """
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Stores many transitions with vectorized writes, wrapping around the end of the buffer.
+        """
+        count = len(actions)
+        start = max(0, count - self.capacity)
+        if start:
+            # Only the newest `capacity` transitions would survive anyway
+            states, actions, rewards = states[start:], actions[start:], rewards[start:]
+            next_states, dones = next_states[start:], dones[start:]
+        index = (self.position + start + np.arange(count - start)) % self.capacity
+        self.states[index] = states
+        self.actions[index] = actions
+        self.rewards[index] = rewards
+        self.next_states[index] = next_states
+        self.dones[index] = dones
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self):
+        """
+        Draws a uniform minibatch into the preallocated batch arrays.
+        :return: Dict of arrays ('states', 'actions', 'rewards', 'next_states', 'dones'); they are
+                 overwritten by the next call.
+        """
+        index = self.rng.integers(0, self.size, size=len(self.batch["actions"]))
+        for name, out in self.batch.items():
+            np.take(getattr(self, name), index, axis=0, out=out)
+        return self.batch
+
+    def __len__(self):
+        return self.size
+
+
+class RolloutCollector:
+    def __init__(self, env, buffer, reward_scale=None):
+        """
+        Turns VectorPokerEnv steps into per-seat transitions. A seat's transition ends when that seat
+        acts again (reward 0) or when its hand finishes (its chip result, done).
+        :param env: VectorPokerEnv with auto_reset enabled.
+        :param buffer: ReplayBuffer receiving the transitions.
+        :param reward_scale: Divisor for chip rewards (defaults to the big blind).
+        """
+        self.env = env
+        self.buffer = buffer
+        self.reward_scale = reward_scale or env.big_blind
+        shape = (env.num_tables, env.num_players)
+        self.last_states = np.zeros(shape + (env.observation_size,), dtype=np.float32)
+        self.last_actions = np.zeros(shape, dtype=np.int64)
+        self.waiting = np.zeros(shape, dtype=bool)
+        self.observations = None
+
+    def collect(self, policy, num_steps, epsilon=0.1, rng=None):
+        """
+        Steps every table `num_steps` times with an epsilon-greedy policy and stores the transitions.
+        :param policy: Object with act(states) -> actions, e.g. BatchInference.
+        :param epsilon: Probability of a random action.
+        :return: Number of transitions stored.
+        """
+        env = self.env
+        rng = rng or env.rng
+        tables = env.tables
+        if self.observations is None:
+            self.observations = env.reset()
+        stored = 0
+        for _ in range(num_steps):
+            observations = self.observations
+            seats = env.seat.copy()
+            actions = policy.act(observations)
+            explore = rng.random(env.num_tables) < epsilon
+            actions[explore] = rng.integers(0, 3, size=int(explore.sum()))
+
+            # The acting seat's previous decision is now complete
+            rows = tables[self.waiting[tables, seats]]
+            if rows.size:
+                self.buffer.add_batch(self.last_states[rows, seats[rows]], self.last_actions[rows, seats[rows]],
+                                      np.zeros(rows.size, dtype=np.float32), observations[rows],
+                                      np.zeros(rows.size, dtype=np.float32))
+                stored += rows.size
+            self.last_states[tables, seats] = observations
+            self.last_actions[tables, seats] = actions
+            self.waiting[tables, seats] = True
+
+            self.observations, rewards, dones = env.step(actions)
+            finished_tables, finished_seats = np.nonzero(self.waiting & dones[:, None])
+            if finished_tables.size:
+                count = finished_tables.size
+                self.buffer.add_batch(self.last_states[finished_tables, finished_seats],
+                                      self.last_actions[finished_tables, finished_seats],
+                                      rewards[finished_tables, finished_seats] / self.reward_scale,
+                                      np.zeros((count, env.observation_size), dtype=np.float32),
+                                      np.ones(count, dtype=np.float32))
+                self.waiting[dones] = False
+                stored += count
+        return stored
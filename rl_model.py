@@ -1,6 +1,11 @@
+import os
+
 import torch
 import torch.nn as nn
 
+# Models loaded by load_model, keyed by checkpoint path and architecture
+_loaded_models = {}
+
 
 class PokerAIModel(nn.Module):
     def __init__(self, input_size, action_size):
@@ -18,11 +23,13 @@ class PokerAIModel(nn.Module):
 
     def predict(self, state):
         """
-        Predicts action probabilities based on the current state.
-        :param state: Game state as a tensor.
+        Predicts action probabilities based on the current state, without tracking gradients.
+        For many decisions at once use inference.BatchInference instead.
+        :param state: Game state as a tensor, array or list.
         :return: Action probabilities.
         """
-        return self.forward(torch.tensor(state, dtype=torch.float))
+        with torch.inference_mode():
+            return self.forward(torch.as_tensor(state, dtype=torch.float))
 
     def update(self, state, action, reward, next_state, optimizer, discount_factor=0.99):
         """
@@ -40,3 +47,25 @@ class PokerAIModel(nn.Module):
         loss = loss_fn(q_values, target)
         loss.backward()
         optimizer.step()
+
+
+def load_model(checkpoint, input_size=10, action_size=3):
+    """
+    Loads a PokerAIModel checkpoint for play. Every caller asking for the same file gets the same
+    model instance, so seats sharing a checkpoint share one copy of the weights.
+    :param checkpoint: Path of the .pth state dict.
+    :return: The model, in evaluation mode.
+    :raises ValueError: If the checkpoint was trained on a different number of inputs.
+    """
+    key = (os.path.realpath(checkpoint), input_size, action_size)
+    model = _loaded_models.get(key)
+    if model is None:
+        state_dict = torch.load(checkpoint, weights_only=True)
+        trained_size = state_dict["fc.0.weight"].shape[1]
+        if trained_size != input_size:
+            raise ValueError(f"{checkpoint} was trained on {trained_size} inputs, not {input_size}.")
+        model = PokerAIModel(input_size=input_size, action_size=action_size)
+        model.load_state_dict(state_dict)
+        model.eval()
+        _loaded_models[key] = model
+    return model
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import weakref
+
+from ai_logic import AIDecisionMaker, DecisionCache
+from engine import DecisionMakerAgent, HandEngine, RandomAgent
+from game_mechanics import CARDS
+from state_encoder import StateEncoder
+
+
+# Actions a client may send; a check is played as a call of nothing
+CLIENT_ACTIONS = {"fold": "fold", "check": "call", "call": "call", "raise": "raise"}
+
+
+def encode_message(message):
+    return (json.dumps(message) + "\n").encode()
+
+
+class HumanSeat:
+    def __init__(self, reader, writer, timeout):
+        """
+        A connected client playing one seat. Messages are JSON objects, one per line.
+        :param reader: asyncio StreamReader of the connection.
+        :param writer: asyncio StreamWriter of the connection.
+        :param timeout: Seconds the client has to answer an action request.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.connected = True
+        self.timeouts = 0
+        # Pending readline, shared between waiting for the table to start and the action requests
+        self.reading = None
+        # Id of the last action request
+        self.requests = 0
+
+    def send(self, message):
+        if self.connected and not self.writer.is_closing():
+            self.writer.write(encode_message(message))
+
+    async def flush(self):
+        """
+        Waits for the queued messages to be sent; a client that went away is marked disconnected.
+        """
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.connected = False
+
+    async def request_action(self, engine, seat):
+        """
+        Asks the client for a decision and waits for it without blocking the other tables.
+        A client that times out checks when it can and folds otherwise; one that disconnected folds.
+        Malformed replies (unknown action, non-numeric raise amount) are answered with an error and
+        get the same default.
+        Every request carries an "id"; a reply with another id, or one that arrived before the
+        request was sent (e.g. a late answer to a request that timed out), is ignored.
+        :return: An engine decision.
+        """
+        owed = engine.to_call(seat)
+        default = "call" if owed == 0 else "fold"
+        if self.connected and self.reading is not None and self.reading.done():
+            # Sent before this request, so not an answer to it
+            self._take_line()
+        if not self.connected:
+            return default
+        self.requests += 1
+        self.send({"type": "act", "id": self.requests, "seat": seat, "to_call": owed, "pot": engine.pot,
+                   "chips": engine.chips[seat], "can_raise": engine.can_raise(seat),
+                   "min_raise_to": engine.min_raise_to(), "board": [str(CARDS[card]) for card in engine.board_cards()]})
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._reading()), deadline - loop.time())
+            except asyncio.TimeoutError:
+                # The read stays pending; whatever it returns is dropped at the next request
+                self.timeouts += 1
+                self.send({"type": "timeout", "id": self.requests, "action": default})
+                return default
+            except ConnectionError:
+                pass
+            line = self._take_line()
+            if not line:
+                return default
+            try:
+                reply = json.loads(line)
+                if reply.get("id", self.requests) != self.requests:
+                    continue
+                action = CLIENT_ACTIONS[reply["action"]]
+                if action == "raise" and "amount" in reply:
+                    return "raise", int(reply["amount"])
+                return action
+            except (ValueError, KeyError, TypeError, AttributeError, OverflowError):
+                self.send({"type": "error", "message": "Expected {\"action\": \"fold\", \"check\", \"call\" or "
+                                                       "\"raise\", optionally with an integer \"amount\"}.",
+                           "action": default})
+                return default
+
+    def _take_line(self):
+        """
+        Takes the line of the finished pending read; an empty line (or a connection error) marks the
+        client disconnected.
+        """
+        reading, self.reading = self.reading, None
+        try:
+            line = reading.result()
+        except ConnectionError:
+            line = b""
+        if not line:
+            self.connected = False
+        return line
+
+    def _reading(self):
+        if self.reading is None:
+            self.reading = asyncio.ensure_future(self.reader.readline())
+        return self.reading
+
+    async def wait_for_start(self, started):
+        """
+        Waits for the table to start while watching the connection. A read still pending when the
+        table starts is kept; a line it reads before the first action request is ignored.
+        :param started: Future resolved when the table starts.
+        :return: False if the client disconnected first.
+        """
+        while not started.done():
+            reading = self._reading()
+            await asyncio.wait({reading, started}, return_when=asyncio.FIRST_COMPLETED)
+            if not reading.done():
+                break
+            if not self._take_line():
+                return False
+            # Anything else sent before the game starts is ignored
+        return True
+
+
+class Table:
+    def __init__(self, table_id, num_seats, humans, bot_factory, stack=1000, small_blind=50, big_blind=100,
+                 bot_executor=None, seed=None):
+        """
+        One table hosted by the server: the first `humans` seats are taken by clients, the rest by bots.
+        :param bot_factory: Callable bot_factory(table, seat) returning an engine agent.
+        :param bot_executor: Optional executor (e.g. a ThreadPoolExecutor) that slow bots are run on,
+                             so they do not stall the event loop; fast bots run inline.
+        """
+        self.table_id = table_id
+        self.num_seats = num_seats
+        self.humans = [None] * humans
+        self.stack = stack
+        self.bot_executor = bot_executor
+        self.hands_played = 0
+        self.decisions = 0
+        self.started = asyncio.get_running_loop().create_future()
+        self.closed = asyncio.get_running_loop().create_future()
+        self.engine = HandEngine([None] * num_seats, small_blind, big_blind, listener=self.broadcast, seed=seed)
+        self.engine.agents = [bot_factory(self, seat) for seat in range(num_seats)]
+
+    @property
+    def open_seat(self):
+        return self.humans.index(None) if None in self.humans else None
+
+    def broadcast(self, event, **details):
+        """
+        Engine listener forwarding events to the human seats. Hole cards are only sent to their owner.
+        """
+        if event == "hand_start":
+            for seat, human in enumerate(self.humans):
+                human.send({"type": "hand_start", "seat": seat, "dealer": details["dealer"], "chips": details["chips"],
+                            "hole_cards": [str(CARDS[card]) for card in details["hole_cards"][seat]]})
+            return
+        if event == "street":
+            details = dict(details, board=[str(CARDS[card]) for card in details["board"]])
+        message = dict(details, type=event)
+        for human in self.humans:
+            human.send(message)
+
+    async def play(self, max_hands=None):
+        """
+        Plays hands for as long as every human stays connected. Busted seats re-buy to the full stack.
+        """
+        loop = asyncio.get_running_loop()
+        engine = self.engine
+        num_humans = len(self.humans)
+        chips = [self.stack] * self.num_seats
+        dealer = 0
+        while all(human.connected for human in self.humans) and (max_hands is None or self.hands_played < max_hands):
+            for seat in range(self.num_seats):
+                if chips[seat] == 0:
+                    chips[seat] = self.stack
+            steps = engine.hand_steps(chips, dealer)
+            try:
+                seat = next(steps)
+                while True:
+                    if seat < num_humans:
+                        decision = await self.humans[seat].request_action(engine, seat)
+                    elif self.bot_executor is not None:
+                        decision = await loop.run_in_executor(self.bot_executor, engine.agents[seat], engine, seat)
+                    else:
+                        decision = engine.agents[seat](engine, seat)
+                    self.decisions += 1
+                    seat = steps.send(decision)
+            except StopIteration:
+                pass
+            self.hands_played += 1
+            dealer = (dealer + 1) % self.num_seats
+            for human in self.humans:
+                await human.flush()
+            # Let the other tables run between hands even if this one only has fast bots
+            await asyncio.sleep(0)
+
+
+class ModelBots:
+    def __init__(self, model, cache_size=10000):
+        """
+        Bot factory for TableServer seating model-driven bots. Each table gets one StateEncoder in
+        front of its listener and one decision maker with its own decision cache, both shared by the
+        table's bots. A table's bots decide one at a time, but tables run on the bot executor's
+        threads concurrently, so decision makers (and their caches) are never shared between tables.
+        :param model: Model with predict(state), e.g. a NumpyPokerModel.
+        :param cache_size: Decision cache entries per table.
+        """
+        self.model = model
+        self.cache_size = cache_size
+        self.decision_makers = weakref.WeakKeyDictionary()
+
+    def __call__(self, table, seat):
+        engine = table.engine
+        if not isinstance(engine.listener, StateEncoder):
+            engine.listener = StateEncoder(table.num_seats, table.stack, listener=engine.listener)
+        if table not in self.decision_makers:
+            self.decision_makers[table] = AIDecisionMaker(self.model,
+                                                          decision_cache=DecisionCache(self.cache_size))
+        return DecisionMakerAgent(self.decision_makers[table], engine.listener)
+
+
+class TableServer:
+    def __init__(self, num_seats=6, humans=1, human_timeout=30.0, bot_factory=None, bot_executor=None,
+                 stack=1000, small_blind=50, big_blind=100, seed=None):
+        """
+        Hosts many concurrent tables on one asyncio event loop. Each connecting client is seated at the
+        next open human seat; a table starts as soon as all its human seats are taken and closes when
+        one of its humans disconnects.
+        :param num_seats: Seats per table.
+        :param humans: Human (client) seats per table.
+        :param human_timeout: Seconds a client has for each decision.
+        :param bot_factory: Callable bot_factory(table, seat) returning an engine agent (random bots by default).
+        :param bot_executor: Optional executor to run bot decisions on.
+        :param seed: Seed for the deals and the default bots.
+        """
+        if not 1 <= humans <= num_seats:
+            raise ValueError("A table needs between 1 and num_seats human seats.")
+        self.num_seats = num_seats
+        self.humans = humans
+        self.human_timeout = human_timeout
+        self.rng = random.Random(seed)
+        self.bot_factory = bot_factory or (lambda table, seat: RandomAgent(seed=self.rng.getrandbits(64)))
+        self.bot_executor = bot_executor
+        self.stack = stack
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.waiting = None
+        self.tables = {}
+        self.next_table_id = 0
+        self.hands_played = 0
+        self.decisions = 0
+
+    async def handle_client(self, reader, writer):
+        human = HumanSeat(reader, writer, self.human_timeout)
+        if self.waiting is None:
+            self.waiting = Table(self.next_table_id, self.num_seats, self.humans, self.bot_factory, self.stack,
+                                 self.small_blind, self.big_blind, self.bot_executor, self.rng.getrandbits(64))
+            self.next_table_id += 1
+        table = self.waiting
+        seat = table.open_seat
+        table.humans[seat] = human
+        human.send({"type": "seated", "table": table.table_id, "seat": seat})
+        if table.open_seat is not None:
+            # The last client to sit down runs the table; a client leaving before then gives up its seat
+            if await human.wait_for_start(table.started):
+                await table.closed
+            else:
+                table.humans[seat] = None
+                writer.close()
+            return
+        self.waiting = None
+        table.started.set_result(None)
+        self.tables[table.table_id] = table
+        try:
+            await table.play()
+        finally:
+            del self.tables[table.table_id]
+            self.hands_played += table.hands_played
+            self.decisions += table.decisions
+            for human in table.humans:
+                human.send({"type": "table_closed", "hands": table.hands_played})
+                human.writer.close()
+            table.closed.set_result(None)
+
+    async def wait_closed(self, timeout=5.0):
+        """
+        Waits until every running table has noticed its clients left and closed.
+        """
+        deadline = time.perf_counter() + timeout
+        while self.tables and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None, backlog=1024):
+        """
+        Starts listening on a TCP port, or on a Unix socket when `path` is given.
+        :param backlog: Pending-connection queue length; keep it above the expected burst of new clients.
+        :return: The asyncio Server.
+        """
+        if path:
+            return await asyncio.start_unix_server(self.handle_client, path, backlog=backlog)
+        return await asyncio.start_server(self.handle_client, host, port, backlog=backlog)
+
+
+async def load_client(host, port, path, duration, stats, seed):
+    """
+    Simulated human: answers every action request at random until `duration` seconds pass.
+    """
+    rng = random.Random(seed)
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["type"] == "act":
+                roll = rng.random()
+                action = "fold" if roll < 0.2 else "raise" if roll < 0.35 and message["can_raise"] else "call"
+                writer.write(encode_message({"action": action}))
+                await writer.drain()
+                stats["decisions"] += 1
+            elif message["type"] == "hand_end":
+                stats["hands"] += 1
+    finally:
+        writer.close()
+
+
+async def run_load_test(clients, duration, host="127.0.0.1", port=8765, path=None, seed=0):
+    """
+    Connects `clients` simulated humans to a running server and reports the throughput they see.
+    :return: Dictionary with hands and decisions per second summed over the clients.
+    """
+    stats = {"hands": 0, "decisions": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(load_client(host, port, path, duration, stats, seed + i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {"clients": clients, "seconds": elapsed, "hands_per_second": stats["hands"] / elapsed,
+            "human_decisions_per_second": stats["decisions"] / elapsed}
+
+
+async def _serve_forever(server, args):
+    listener = await server.serve(args.host, args.port, args.unix)
+    print(f"Serving {args.seats}-seat tables with {args.humans} human seat(s) on "
+          f"{args.unix or f'{args.host}:{args.port}'}")
+    async with listener:
+        await listener.serve_forever()
+
+
+async def _self_test(args):
+    """
+    Runs a server and the load generator in the same event loop.
+    """
+    server = TableServer(args.seats, args.humans, args.timeout, seed=args.seed)
+    listener = await server.serve(args.host, args.port, args.unix)
+    async with listener:
+        result = await run_load_test(args.clients, args.duration, args.host, args.port, args.unix, args.seed)
+        await server.wait_closed()
+    result["tables"] = server.next_table_id
+    result["server_decisions_per_second"] = server.decisions / result["seconds"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio multi-table Hold'em server and load generator.")
+    parser.add_argument("mode", choices=("serve", "load", "selftest"),
+                        help="serve tables, run the load generator against a server, or both in one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Unix socket path to use instead of TCP")
+    parser.add_argument("--seats", type=int, default=6)
+    parser.add_argument("--humans", type=int, default=1, help="Human seats per table")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds a human has for each decision")
+    parser.add_argument("--clients", type=int, default=200, help="Simulated humans for the load generator")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--model", help="Checkpoint (.npz or .pth) driving the bots, run with the NumPy backend; "
+                                            "random bots are used without one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        bot_factory = None
+        if args.model:
+            import numpy_model
+            bot_factory = ModelBots(numpy_model.load(args.model))
+        asyncio.run(_serve_forever(TableServer(args.seats, args.humans, args.timeout, bot_factory, seed=args.seed),
+                                   args))
+        return
+    if args.mode == "load":
+        result = asyncio.run(run_load_test(args.clients, args.duration, args.host, args.port, args.unix, args.seed))
+    else:
+        result = asyncio.run(_self_test(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
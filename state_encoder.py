@@ -0,0 +1,143 @@
+import numpy as np
+
+from engine import STREETS
+from equity import load_preflop_table, preflop_equity
+from hand_evaluator import MAX_HAND_RANK
+from hand_state import HandState
+from opponent_model import OPPONENT_FEATURES
+from vec_env import OBSERVATION_SIZE
+
+
+class StateEncoder:
+    def __init__(self, num_seats, stack=1000, listener=None, preflop_table=None, opponent_model=None):
+        """
+        Keeps the features of the model's input vector up to date from HandEngine events, so a
+        decision only has to fill a reused buffer instead of rebuilding the state from players.
+        The features match VectorPokerEnv.observe, so models trained there can be used directly.
+        Use the encoder as the engine's listener; other listeners can be chained behind it.
+        :param num_seats: Number of seats at the table.
+        :param stack: Reference stack the chip features are scaled by (the training stack).
+        :param listener: Optional listener every event is passed on to.
+        :param preflop_table: Preflop equity table (defaults to the bundled one).
+        :param opponent_model: Optional opponent_model.OpponentModel. The encoder passes it every
+                               event and appends its OPPONENT_FEATURES features to the vector, for
+                               models built with input_size = OBSERVATION_SIZE + OPPONENT_FEATURES.
+        """
+        self.num_seats = num_seats
+        self.stack = stack
+        self.listener = listener
+        self.preflop_table = load_preflop_table() if preflop_table is None else preflop_table
+        self.opponent_model = opponent_model
+        self.state = np.zeros(OBSERVATION_SIZE + (OPPONENT_FEATURES if opponent_model else 0), dtype=np.float32)
+        self.opponent_state = self.state[OBSERVATION_SIZE:]
+
+        self.chips = [0] * num_seats
+        self.bets = [0] * num_seats
+        self.hole_cards = [None] * num_seats
+        # Made hand per seat, brought up to date with the board only when the seat's strength is needed
+        self.hand_states = [HandState() for _ in range(num_seats)]
+        # Hand strength per seat, computed at most once per street (None until needed)
+        self.strength = [None] * num_seats
+        self.board = []
+        self.pot = 0
+        self.highest_bet = 0
+        self.num_active = num_seats
+        self.street = 0
+        self.dealer = 0
+
+    def __call__(self, event, **details):
+        handler = getattr(self, f"on_{event}", None)
+        if handler:
+            handler(**details)
+        if self.opponent_model:
+            self.opponent_model(event, **details)
+        if self.listener:
+            self.listener(event, **details)
+
+    def on_hand_start(self, dealer, hole_cards, chips):
+        for seat in range(self.num_seats):
+            self.chips[seat] = chips[seat]
+            self.bets[seat] = 0
+            self.hole_cards[seat] = hole_cards[seat]
+            self.hand_states[seat].reset(hole_cards[seat])
+            self.strength[seat] = None
+        self.board = []
+        self.pot = 0
+        self.highest_bet = 0
+        self.num_active = self.num_seats
+        self.street = 0
+        self.dealer = dealer
+
+    def on_blind(self, seat, amount, blind):
+        self.chips[seat] -= amount
+        self.bets[seat] += amount
+        self.pot += amount
+        self.highest_bet = max(self.highest_bet, self.bets[seat])
+
+    def on_street(self, street, board):
+        self.street = STREETS.index(street)
+        self.board = board
+        if self.street:
+            for seat in range(self.num_seats):
+                self.bets[seat] = 0
+                self.strength[seat] = None
+            self.highest_bet = 0
+
+    def on_action(self, seat, action, amount, pot):
+        self.chips[seat] -= amount - self.bets[seat]
+        self.bets[seat] = amount
+        self.pot = pot
+        if amount > self.highest_bet:
+            self.highest_bet = amount
+        if action == "fold":
+            self.num_active -= 1
+            # Preflop strength depends on the number of opponents left
+            if self.street == 0:
+                self.strength = [None] * self.num_seats
+
+    def hand_strength(self, seat):
+        """
+        Preflop equity against the remaining opponents (0.5 without a preflop table); afterwards the
+        normalized rank of the seat's made hand. Cached until the street or the field changes.
+        """
+        strength = self.strength[seat]
+        if strength is None:
+            if self.street:
+                # Folded seats never get here, so their hands are never evaluated
+                hand = self.hand_states[seat]
+                hand.add(self.board[hand.num_cards - 2:])
+                strength = hand.rank / MAX_HAND_RANK
+            elif self.preflop_table is None:
+                strength = 0.5
+            else:
+                opponents = min(max(self.num_active - 1, 1), self.preflop_table.shape[1])
+                strength = preflop_equity(self.preflop_table, self.hole_cards[seat], opponents)
+            self.strength[seat] = strength
+        return strength
+
+    def encode(self, seat):
+        """
+        Writes the state of `seat` into the reused float32 buffer: hand strength, pot odds,
+        stack-to-pot ratio, position, street, active opponents, call cost relative to the stack,
+        stack, highest bet and pot (the last three relative to the reference stack), followed by the
+        opponent features when there is an opponent model.
+        :return: The buffer, overwritten by the next call.
+        """
+        n = self.num_seats
+        state = self.state
+        chips = self.chips[seat]
+        owed = self.highest_bet - self.bets[seat]
+        pot = self.pot
+        state[0] = self.hand_strength(seat)
+        state[1] = owed / (pot + owed) if pot + owed else 0.0
+        state[2] = min(chips / pot, 10.0) / 10.0 if pot else 1.0
+        state[3] = ((seat - self.dealer - 1) % n) / max(1, n - 1)
+        state[4] = self.street / 3.0
+        state[5] = (self.num_active - 1) / max(1, n - 1)
+        state[6] = min(owed / max(chips, 1), 1.0)
+        state[7] = chips / self.stack
+        state[8] = self.highest_bet / self.stack
+        state[9] = pot / (n * self.stack)
+        if self.opponent_model:
+            self.opponent_model.features(seat, self.opponent_state)
+        return state
@@ -1,7 +1,9 @@
 import unittest
 
+import numpy as np
+
 from game_mechanics import Card, Deck, Player
-from utils import evaluate_hand, compare_hands, calculate_pot_odds
+from utils import evaluate_hand, compare_hands, calculate_pot_odds, hand_rank
 
 
 class TestGameMechanics(unittest.TestCase):
@@ -9,6 +11,17 @@ class TestGameMechanics(unittest.TestCase):
         card = Card('Ace', 'Spades')
         self.assertEqual(str(card), "Ace of Spades")
 
+    def test_cards_are_interned(self):
+        import pickle
+        card = Card('Ace', 'Spades')
+        self.assertIs(card, Card('Ace', 'Spades'))
+        self.assertIs(pickle.loads(pickle.dumps(card)), card)
+        self.assertEqual((card.id, card.rank_index, card.suit_bit), (51, 12, 8))
+        self.assertFalse(hasattr(card, '__dict__'))
+        self.assertFalse(hasattr(Player("TestPlayer"), '__dict__'))
+        with self.assertRaises(ValueError):
+            Card('1', 'Spades')
+
     def test_deck_initialization(self):
         deck = Deck()
         self.assertEqual(len(deck.cards), 52)
@@ -20,6 +33,19 @@ class TestGameMechanics(unittest.TestCase):
         self.assertEqual(len(dealt_cards), 5)
         self.assertEqual(len(deck.cards), 47)
 
+    def test_deck_is_seeded_and_resets_in_place(self):
+        deck = Deck(seed=3)
+        first = deck.deal_ids(17)
+        self.assertEqual(len(set(first)), 17)
+        self.assertEqual(first, Deck(seed=3).deal_ids(17))
+        deck.reshuffle()
+        self.assertEqual(len(deck), 52)
+        self.assertEqual(sorted(deck.deal_ids(52)), list(range(52)))
+        workers = Deck(seed=3).spawn(2)
+        self.assertNotEqual(workers[0].deal_ids(5), workers[1].deal_ids(5))
+        self.assertEqual([deck.deal_ids(5) for deck in Deck(seed=3).spawn(2)],
+                         [deck.deal_ids(5) for deck in Deck(seed=3).spawn(2)])
+
     def test_player_bet(self):
         player = Player("TestPlayer", chips=1000)
         bet_amount = player.bet(100)
@@ -59,6 +85,15 @@ class TestUtils(unittest.TestCase):
         result = compare_hands(hand1, hand2)
         self.assertEqual(result, 0)  # It's a tie
 
+    def test_compare_hands_numpy_ranks(self):
+        from hand_evaluator import evaluate_batch
+        self.assertEqual(compare_hands(np.int32(5000), np.int32(10)), 1)
+        ranks = evaluate_batch(np.array([[51, 47, 43, 39, 35], [0, 5, 10, 15, 21]]))
+        self.assertEqual(compare_hands(ranks[1], ranks[0]), -1)
+        self.assertEqual(compare_hands(ranks[0], evaluate_hand([Card('Ace', 'Spades'), Card('King', 'Spades'),
+                                                                Card('Queen', 'Spades'), Card('Jack', 'Spades'),
+                                                                Card('10', 'Spades')])), 0)
+
     def test_ai_does_not_use_human_hand(self):
         from game_mechanics import Card
         from ai_logic import AIDecisionMaker
@@ -75,5 +110,861 @@ class TestUtils(unittest.TestCase):
         assert decision in ["fold", "call", "raise"], "Invalid AI action."
 
 
+class TestHandEvaluator(unittest.TestCase):
+    def test_kicker_breaks_tie(self):
+        community_cards = [Card('Ace', 'Clubs'), Card('Ace', 'Hearts'), Card('7', 'Spades'), Card('4', 'Diamonds'), Card('2', 'Clubs')]
+        king_kicker = hand_rank([Card('King', 'Spades'), Card('9', 'Hearts')], community_cards)
+        queen_kicker = hand_rank([Card('Queen', 'Spades'), Card('9', 'Diamonds')], community_cards)
+        self.assertEqual(compare_hands(king_kicker, queen_kicker), 1)
+
+    def test_board_plays_is_a_tie(self):
+        community_cards = [Card('10', 'Clubs'), Card('Jack', 'Hearts'), Card('Queen', 'Spades'), Card('King', 'Diamonds'), Card('Ace', 'Clubs')]
+        rank1 = hand_rank([Card('2', 'Spades'), Card('3', 'Hearts')], community_cards)
+        rank2 = hand_rank([Card('4', 'Spades'), Card('5', 'Hearts')], community_cards)
+        self.assertEqual(compare_hands(rank1, rank2), 0)
+
+    def test_category_order(self):
+        wheel = [Card('Ace', 'Hearts'), Card('2', 'Clubs'), Card('3', 'Spades'), Card('4', 'Diamonds'), Card('5', 'Hearts')]
+        flush = [Card('2', 'Hearts'), Card('7', 'Hearts'), Card('9', 'Hearts'), Card('Jack', 'Hearts'), Card('King', 'Hearts')]
+        self.assertEqual(evaluate_hand(wheel)[0], "Straight")
+        self.assertEqual(evaluate_hand(wheel)[2], (Card.RANKS.index('5'),))
+        self.assertEqual(evaluate_hand(flush)[0], "Flush")
+        self.assertEqual(compare_hands(evaluate_hand(flush), evaluate_hand(wheel)), 1)
+
+    def test_saved_tables_match_built_tables(self):
+        import hand_evaluator
+        self.assertEqual(hand_evaluator._load_tables(), hand_evaluator._build_tables())
+
+    def test_seven_card_rank_is_best_five(self):
+        import itertools
+        import random
+        from hand_evaluator import evaluate
+        rng = random.Random(7)
+        for _ in range(500):
+            cards = rng.sample(range(52), 7)
+            self.assertEqual(evaluate(cards), max(evaluate(combo) for combo in itertools.combinations(cards, 5)))
+
+    def test_batch_matches_scalar(self):
+        from hand_evaluator import evaluate, evaluate_batch
+        rng = np.random.default_rng(11)
+        cards = np.argsort(rng.random((5000, 52)), axis=1)[:, :7]
+        expected = [evaluate(row.tolist()) for row in cards]
+        self.assertEqual(evaluate_batch(cards).tolist(), expected)
+        self.assertEqual(evaluate_batch(cards[:, :5]).tolist(), [evaluate(row[:5].tolist()) for row in cards])
+
+    def test_incremental_hand_state_matches_evaluate(self):
+        import random
+        from hand_evaluator import evaluate
+        from hand_state import HandState
+        rng = random.Random(3)
+        state = HandState()
+        for _ in range(500):
+            cards = rng.sample(range(52), 7)
+            state.reset(cards[:2])
+            for end in (5, 6, 7):
+                state.add(cards[state.num_cards:end])
+                self.assertEqual(state.rank, evaluate(cards[:end]))
+        # Eight-nine of hearts on 10h-Jc-2h: open-ended straight draw (7 or Q) plus a flush draw
+        state.reset([24, 28])
+        state.add([32, 38, 0])
+        self.assertEqual(state.category, 1)
+        self.assertTrue(state.flush_draw)
+        self.assertEqual(state.straight_outs, (1 << 5) | (1 << 10))
+        state.add([21])  # Seven of diamonds completes the straight
+        self.assertEqual(state.category, 5)
+
+
+class TestEquity(unittest.TestCase):
+    def test_pocket_aces_heads_up(self):
+        from equity import estimate_equity
+        result = estimate_equity((48, 49), (), num_opponents=1, max_samples=20000, seed=3)
+        self.assertAlmostEqual(result.equity, 0.852, delta=0.015)
+        self.assertEqual(result.samples, 20000)
+
+    def test_confidence_target_stops_early(self):
+        from equity import estimate_equity
+        result = estimate_equity((48, 49), (), num_opponents=3, max_samples=100000, target_margin=0.02, seed=3)
+        self.assertLess(result.samples, 100000)
+        self.assertLessEqual(result.margin, 0.02)
+
+    def test_win_probability_uses_cards(self):
+        from ai_logic import AIDecisionMaker
+        ai = AIDecisionMaker(seed=5)
+        community_cards = [Card('Ace', 'Clubs'), Card('Ace', 'Hearts'), Card('King', 'Spades')]
+        strong = ai.calculate_win_probability([Card('Ace', 'Spades'), Card('King', 'Hearts')], community_cards)
+        weak = ai.calculate_win_probability([Card('2', 'Spades'), Card('7', 'Hearts')], community_cards)
+        self.assertGreater(strong, 0.95)
+        self.assertLess(weak, 0.35)
+
+    def test_exact_equity_matches_brute_force(self):
+        import itertools
+        from equity import exact_equity
+        from hand_evaluator import evaluate
+        hole_cards, community_cards = [48, 45], [0, 5, 10, 46, 20]
+        deck = [c for c in range(52) if c not in hole_cards + community_cards]
+        hero = evaluate(hole_cards + community_cards)
+        shares = []
+        for opponent in itertools.combinations(deck, 2):
+            villain = evaluate(list(opponent) + community_cards)
+            shares.append(1.0 if hero > villain else 0.5 if hero == villain else 0.0)
+        result = exact_equity(hole_cards, community_cards, num_opponents=1)
+        self.assertEqual(result.samples, len(shares))
+        self.assertAlmostEqual(result.equity, sum(shares) / len(shares))
+
+    def test_turn_enumeration_agrees_with_sampling(self):
+        from equity import estimate_equity, exact_equity
+        exact = exact_equity((48, 49), (0, 5, 10, 15), num_opponents=1)
+        sampled = estimate_equity((48, 49), (0, 5, 10, 15), num_opponents=1, max_samples=20000, seed=9,
+                                  allow_exact=False)
+        self.assertAlmostEqual(exact.equity, sampled.equity, delta=0.02)
+        self.assertEqual(estimate_equity((48, 49), (0, 5, 10, 15), max_samples=20000).margin, 0.0)
+
+    def test_time_limit_holds_with_a_busy_executor(self):
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from equity import estimate_equity
+        release = threading.Event()
+        with ThreadPoolExecutor(2) as executor:
+            executor.submit(release.wait)
+            executor.submit(release.wait)
+            start = time.perf_counter()
+            result = estimate_equity((48, 49), (), num_opponents=3, max_samples=10 ** 6, time_limit=0.05,
+                                     executor=executor, num_chunks=4, seed=1)
+            elapsed = time.perf_counter() - start
+            release.set()
+        self.assertLess(elapsed, 0.1)
+        self.assertGreater(result.samples, 0)
+        self.assertLess(result.samples, 10 ** 6)
+
+    def test_preflop_table_lookup(self):
+        from equity import load_preflop_table, preflop_equity, starting_hand_index
+        table = load_preflop_table()
+        self.assertIsInstance(table, np.memmap)
+        self.assertIs(load_preflop_table(), table)
+        self.assertAlmostEqual(preflop_equity(table, (48, 49), 1), 0.852, delta=0.01)
+        self.assertGreater(preflop_equity(table, (48, 44), 1), preflop_equity(table, (48, 45), 1))  # AKs > AKo
+        self.assertEqual(starting_hand_index(48, 44), starting_hand_index(47, 51))
+
+    def test_range_equity_matrix(self):
+        from equity import COMBOS, NUM_COMBOS, combo_index, exact_equity, range_equity
+        board = [0, 17, 38, 9]
+        everything = np.ones(NUM_COMBOS)
+        result = range_equity(everything, everything, board)
+        self.assertEqual(result.runouts, 48)
+        self.assertAlmostEqual(result.equity, 0.5, places=6)
+        aces, kings = combo_index(48, 49), combo_index(44, 45)
+        self.assertTrue(np.isnan(result.matrix[aces, combo_index(48, 50)]))  # Shares the ace of hearts
+        self.assertTrue(np.isnan(result.matrix[combo_index(1, 9), kings]))  # Blocked by the board
+        self.assertAlmostEqual(result.matrix[aces, kings] + result.matrix[kings, aces], 1.0, places=6)
+
+        # One combo against a full range is its equity against a random hand
+        hero = np.zeros(NUM_COMBOS)
+        hero[aces] = 1.0
+        expected = exact_equity(COMBOS[aces], board).equity
+        self.assertAlmostEqual(range_equity(hero, everything, board).equity, expected, places=5)
+
+    def test_canonical_key_ignores_suit_labels(self):
+        from equity import canonical_key
+        # Ah Kh on 2h 7c 9d is the same hand as As Ks on 2s 7d 9c
+        self.assertEqual(canonical_key([48, 44], [0, 22, 29]), canonical_key([51, 47], [3, 21, 30]))
+        self.assertNotEqual(canonical_key([48, 44], [0, 22, 29]), canonical_key([48, 45], [0, 22, 29]))
+
+    def test_equity_cache_counters_and_eviction(self):
+        from equity import EquityCache, cached_equity
+        cache = EquityCache(max_size=2)
+        first = cached_equity(cache, [48, 44], [0, 22, 29], max_samples=500, seed=1)
+        self.assertIs(cached_equity(cache, [51, 47], [3, 21, 30], max_samples=500, seed=2), first)
+        cached_equity(cache, [48, 44], [0, 22, 29], num_opponents=2, max_samples=500, seed=1)
+        cached_equity(cache, [20, 1], [0, 22, 29], max_samples=500, seed=1)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 3, 1))
+        self.assertEqual(len(cache), 2)
+
+        # The budget is part of the key, and estimates cut off by the time limit are not kept
+        cache = EquityCache()
+        cut = cached_equity(cache, [48, 44], [0, 22, 29], max_samples=100000, target_margin=0.001, time_limit=0,
+                            batch_size=100, seed=1)
+        self.assertLess(cut.samples, 100000)
+        self.assertEqual(len(cache), 0)
+        small = cached_equity(cache, [48, 44], [0, 22, 29], max_samples=500, seed=1)
+        self.assertIsNot(cached_equity(cache, [48, 44], [0, 22, 29], max_samples=2000, seed=1), small)
+        self.assertIs(cached_equity(cache, [48, 44], [0, 22, 29], max_samples=500, seed=2), small)
+        self.assertEqual(len(cache), 2)
+
+
+class StackedDeck:
+    def __init__(self, cards):
+        self.cards = cards
+
+    def reshuffle(self):
+        pass
+
+    def deal_ids(self, num):
+        return list(self.cards[:num])
+
+
+class TestHandEngine(unittest.TestCase):
+    def test_chips_are_conserved(self):
+        from engine import HandEngine, RandomAgent
+        engine = HandEngine([RandomAgent(seed=seat) for seat in range(6)], seed=1)
+        for hand in range(500):
+            chips = [300 + 100 * seat for seat in range(6)]
+            deltas = engine.play_hand(chips, hand % 6)
+            self.assertEqual(sum(deltas), 0)
+            self.assertEqual(sum(chips), sum(300 + 100 * seat for seat in range(6)))
+
+    def test_heads_up_dealer_posts_small_blind_and_acts_first(self):
+        from engine import HandEngine
+        order = []
+
+        def agent(engine, seat):
+            order.append((engine.street, seat))
+            return "fold"
+
+        engine = HandEngine([agent, agent], seed=1)
+        chips = [1000, 1000]
+        engine.play_hand(chips, dealer=1)
+        self.assertEqual(order, [(0, 1)])
+        self.assertEqual(chips, [1050, 950])
+
+    def test_min_raise_is_enforced(self):
+        from engine import HandEngine
+        raises = []
+
+        def raiser(engine, seat):
+            if engine.street == 0 and not raises:
+                raises.append(engine.min_raise_to())
+                return "raise", 150  # Below the minimum, clamped up to 200
+            return "call"
+
+        engine = HandEngine([raiser, raiser, raiser], seed=1)
+        chips = [1000, 1000, 1000]
+        engine.play_hand(chips, dealer=0)
+        self.assertEqual(raises, [200])
+        self.assertEqual(engine.contributed, [200, 200, 200])
+
+    def test_board_plays_splits_pot(self):
+        from engine import HandEngine, calling_agent
+        # Both players hold low cards under a Broadway straight on the board
+        engine = HandEngine([calling_agent, calling_agent])
+        engine.deck = StackedDeck([0, 5, 10, 15, 32, 36, 40, 44, 48])
+        chips = [1000, 1000]
+        self.assertEqual(engine.play_hand(chips, dealer=0), [0, 0])
+
+    def test_short_stack_only_wins_main_pot(self):
+        from engine import HandEngine, calling_agent
+        # Seat 0 holds aces, seat 1 kings, seat 2 queens; the board is dry
+        engine = HandEngine([calling_agent, lambda engine, seat: "raise", calling_agent])
+        engine.deck = StackedDeck([48, 49, 44, 45, 40, 41, 0, 5, 14, 23, 31])
+        chips = [100, 1000, 1000]
+        deltas = engine.play_hand(chips, dealer=0)
+        self.assertEqual(deltas[0], 200)
+        self.assertEqual(deltas[1] + deltas[2], -200)
+        self.assertGreater(deltas[1], 0)
+
+
+class TestVectorPokerEnv(unittest.TestCase):
+    def test_step_shapes_and_chip_conservation(self):
+        from vec_env import VectorPokerEnv
+        env = VectorPokerEnv(64, num_players=6, seed=2)
+        observations = env.reset()
+        self.assertEqual(observations.shape, (64, 10))
+        rng = np.random.default_rng(2)
+        finished = 0
+        for _ in range(200):
+            observations, rewards, dones = env.step(rng.integers(0, 3, size=64))
+            self.assertTrue((rewards.sum(axis=1) == 0).all())
+            self.assertFalse(rewards[~dones].any())
+            finished += dones.sum()
+        self.assertEqual(finished, env.hands_played)
+        self.assertGreater(finished, 0)
+
+    def test_matches_hand_engine(self):
+        from engine import HandEngine
+        from vec_env import VectorPokerEnv
+        rng = np.random.default_rng(4)
+        env = VectorPokerEnv(1, num_players=4, seed=4)
+        env.reset()
+        for _ in range(100):
+            cards = env.hole_cards[0].reshape(-1).tolist() + env.board[0].tolist()
+            dealer = int(env.dealer[0])
+            actions = []
+            done = False
+            while not done:
+                action = int(rng.choice(3, p=[0.2, 0.5, 0.3]))
+                actions.append((int(env.seat[0]), action))
+                _, rewards, dones = env.step(np.array([action]))
+                done = dones[0]
+            replay = iter(actions)
+
+            def agent(engine, seat):
+                expected_seat, action = next(replay)
+                self.assertEqual(seat, expected_seat)
+                return ("fold", "call", "raise")[action]
+
+            engine = HandEngine([agent] * 4)
+            engine.deck = StackedDeck(cards)
+            self.assertEqual(engine.play_hand([1000] * 4, dealer), rewards[0].tolist())
+
+    def test_opponent_features_match_opponent_model(self):
+        from engine import HandEngine
+        from opponent_model import OpponentModel
+        from vec_env import OBSERVATION_SIZE, VectorPokerEnv
+        rng = np.random.default_rng(6)
+        env = VectorPokerEnv(1, num_players=4, seed=6, opponent_model=True, opponent_decay=0.9)
+        self.assertEqual(env.reset().shape, (1, OBSERVATION_SIZE + 4))
+        opponents = OpponentModel(4, decay=0.9)
+        features = np.zeros(4, dtype=np.float32)
+        for _ in range(100):
+            cards = env.hole_cards[0].reshape(-1).tolist() + env.board[0].tolist()
+            dealer = int(env.dealer[0])
+            decisions = []
+            observations = env.observations
+            done = False
+            while not done:
+                action = int(rng.choice(3, p=[0.2, 0.4, 0.4]))
+                decisions.append((action, observations[0, OBSERVATION_SIZE:].copy()))
+                observations, _, dones = env.step(np.array([action]))
+                done = dones[0]
+            replay = iter(decisions)
+
+            def agent(engine, seat):
+                action, expected = next(replay)
+                opponents.features(seat, features)
+                np.testing.assert_allclose(features, expected, rtol=1e-5)
+                return ("fold", "call", "raise")[action]
+
+            engine = HandEngine([agent] * 4, listener=opponents)
+            engine.deck = StackedDeck(cards)
+            engine.play_hand([1000] * 4, dealer)
+        self.assertGreater(env.observations[0, OBSERVATION_SIZE + 1], 0.25)
+
+
+class TestTournament(unittest.TestCase):
+    def test_duplicate_deals_cancel_luck_between_identical_bots(self):
+        from tournament import play_block
+        totals, totals_sq, deals = play_block(["trained_model_1.pth"] * 3, num_deals=50, seed=1)
+        self.assertEqual(deals, 50)
+        self.assertEqual(totals.tolist(), [0, 0, 0])
+        self.assertEqual(totals_sq.tolist(), [0, 0, 0])
+
+    def test_results_are_zero_sum_and_seeded(self):
+        from tournament import play_block
+        checkpoints = ["trained_model_1.pth", "trained_model_2.pth", "trained_model_3.pth"]
+        first = play_block(checkpoints, num_deals=50, seed=7)
+        self.assertEqual(first[0].sum(), 0)
+        self.assertEqual(first[0].tolist(), play_block(checkpoints, num_deals=50, seed=7)[0].tolist())
+
+
+class TestBatchInference(unittest.TestCase):
+    def test_batched_actions_match_single_predictions(self):
+        import torch
+        from inference import BatchInference
+        from rl_model import PokerAIModel
+        torch.manual_seed(0)
+        model = PokerAIModel(input_size=10, action_size=3)
+        states = np.random.default_rng(0).random((37, 10), dtype=np.float32)
+        expected = [int(torch.argmax(model.predict(state))) for state in states]
+
+        policy = BatchInference(model, max_batch=16)
+        self.assertEqual(policy.act(states).tolist(), expected)
+        answers = []
+        for i, state in enumerate(states):
+            policy.submit(state, lambda action, i=i: answers.append((i, action)))
+        self.assertEqual(len(answers), 32)  # Two full buffers were flushed automatically
+        self.assertEqual(policy.flush(), 5)
+        self.assertEqual(answers, list(enumerate(expected)))
+
+
+class TestTraining(unittest.TestCase):
+    def test_replay_buffer_wraps_around(self):
+        from replay import ReplayBuffer
+        buffer = ReplayBuffer(capacity=5, state_size=2, batch_size=8, seed=0)
+        buffer.add([0, 0], 0, 0.0, [0, 0], False)
+        states = np.arange(12, dtype=np.float32).reshape(6, 2)
+        buffer.add_batch(states, np.arange(6), np.ones(6), states, np.zeros(6))
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.position, 2)
+        self.assertEqual(sorted(buffer.actions.tolist()), [1, 2, 3, 4, 5])
+        batch = buffer.sample()
+        self.assertTrue(set(batch["actions"].tolist()) <= {1, 2, 3, 4, 5})
+        self.assertTrue((batch["states"][:, 0] == batch["actions"] * 2).all())
+
+    def test_collect_and_train(self):
+        import torch
+        from inference import BatchInference
+        from rl_model import PokerAIModel
+        from replay import ReplayBuffer, RolloutCollector
+        from training import QTrainer
+        from vec_env import VectorPokerEnv
+        torch.manual_seed(0)
+        model = PokerAIModel(input_size=10, action_size=3)
+        buffer = ReplayBuffer(capacity=10000, batch_size=64, seed=0)
+        collected = RolloutCollector(VectorPokerEnv(64, seed=0), buffer).collect(BatchInference(model), 20)
+        self.assertEqual(len(buffer), collected)
+        self.assertGreater(buffer.dones[:collected].sum(), 0)
+        trainer = QTrainer(model, target_update=2)
+        result = trainer.train(buffer, 4)
+        self.assertTrue(np.isfinite(result["loss"]))
+        self.assertGreater(result["transitions_per_second"], 0)
+        for weight, target_weight in zip(model.parameters(), trainer.target.parameters()):
+            self.assertTrue(torch.equal(weight, target_weight))
+
+
+class TestStateEncoder(unittest.TestCase):
+    def test_matches_vector_env_observations(self):
+        from engine import HandEngine
+        from state_encoder import StateEncoder
+        from vec_env import VectorPokerEnv
+        rng = np.random.default_rng(5)
+        env = VectorPokerEnv(1, num_players=4, seed=5)
+        observations = env.reset()
+        for _ in range(50):
+            cards = env.hole_cards[0].reshape(-1).tolist() + env.board[0].tolist()
+            dealer = int(env.dealer[0])
+            decisions = []
+            done = False
+            while not done:
+                action = int(rng.choice(3, p=[0.2, 0.5, 0.3]))
+                decisions.append((action, observations[0].copy()))
+                observations, _, dones = env.step(np.array([action]))
+                done = dones[0]
+            replay = iter(decisions)
+
+            def agent(engine, seat):
+                action, expected = next(replay)
+                np.testing.assert_allclose(encoder.encode(seat), expected, rtol=1e-5, atol=1e-6)
+                return ("fold", "call", "raise")[action]
+
+            encoder = StateEncoder(4)
+            engine = HandEngine([agent] * 4, listener=encoder)
+            engine.deck = StackedDeck(cards)
+            engine.play_hand([1000] * 4, dealer)
+
+    def test_state_reaches_the_model(self):
+        import torch
+        from ai_logic import AIDecisionMaker
+        from engine import DecisionMakerAgent, HandEngine
+        from state_encoder import StateEncoder
+
+        class RecordingModel:
+            def __init__(self):
+                self.states = []
+
+            def predict(self, state):
+                self.states.append(state)
+                return torch.tensor([0.0, 1.0, 0.0])
+
+        model = RecordingModel()
+        encoder = StateEncoder(3)
+        agent = DecisionMakerAgent(AIDecisionMaker(model), encoder)
+        HandEngine([agent] * 3, listener=encoder, seed=3).play_hand([1000] * 3)
+        self.assertGreater(len(model.states), 0)
+        self.assertTrue(all(state is encoder.state for state in model.states))
+
+    def test_opponent_model_features(self):
+        from engine import HandEngine, RandomAgent
+        from opponent_model import OPPONENT_FEATURES, OpponentModel
+        from state_encoder import StateEncoder
+        from vec_env import OBSERVATION_SIZE
+
+        def maniac(engine, seat):
+            return "raise"
+
+        def rock(engine, seat):
+            return "fold"
+
+        opponents = OpponentModel(3, decay=0.9)
+        encoder = StateEncoder(3, opponent_model=opponents)
+        engine = HandEngine([maniac, rock, RandomAgent(seed=0)], listener=encoder, seed=5)
+        for hand in range(200):
+            engine.play_hand([1000] * 3, hand % 3)
+        self.assertGreater(opponents.raise_frequency(0, 0), 0.7)
+        self.assertLess(opponents.raise_frequency(1, 0), 0.1)
+        self.assertGreater(opponents.fold_to_raise(1), 0.9)
+        self.assertLess(opponents.fold_to_raise(0), 0.1)
+
+        encoder.on_hand_start(0, [[0, 1], [2, 3], [4, 5]], [1000] * 3)
+        state = encoder.encode(2)
+        self.assertEqual(len(state), OBSERVATION_SIZE + OPPONENT_FEATURES)
+        self.assertAlmostEqual(state[-2], opponents.raise_frequency(0, 0), places=6)
+        opponents.keep([1, 2])
+        self.assertGreater(opponents.fold_to_raise(0), 0.9)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_profiler_counts_streets_and_decisions(self):
+        from engine import RandomAgent, self_play
+        from instrumentation import GameProfiler
+        profiler = GameProfiler()
+        agents = [RandomAgent(seed=seat) for seat in range(4)]
+        self_play(agents, 50, seed=1, profiler=profiler)
+        report = profiler.report()
+        self.assertEqual(report["hands"]["count"], 50)
+        self.assertEqual(report["streets"]["Pre-Flop"]["count"], 50)
+        self.assertEqual(report["counters"]["street"], sum(street["count"] for street in report["streets"].values()))
+        self.assertEqual(report["counters"]["action"],
+                         sum(decision["count"] for decision in report["decisions"].values()))
+        self.assertLessEqual(report["decisions"]["River"]["p50_us"], report["decisions"]["River"]["p99_us"])
+
+    def test_benchmark_measure(self):
+        from benchmarks import measure
+        result = measure(lambda: sum(range(100)), operations=10, min_time=0.01)
+        self.assertAlmostEqual(result["seconds_per_op"] * result["ops_per_second"], 1.0)
+
+
+class TestStartup(unittest.TestCase):
+    def test_heuristic_modules_do_not_import_torch(self):
+        import subprocess
+        import sys
+        code = ("import sys, main, ai_logic, benchmarks, engine, state_encoder, vec_env\n"
+                "ai = ai_logic.AIDecisionMaker()\n"
+                "engine.self_play([engine.DecisionMakerAgent(ai)] * 3, 2, seed=0)\n"
+                "benchmarks.run_benchmarks({'engine_hand_6_ai_players'}, min_time=0.01)\n"
+                "print('torch' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_game_mechanics_does_not_load_the_evaluator(self):
+        import subprocess
+        import sys
+        code = "import sys, game_mechanics\nprint('hand_evaluator' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_checkpoints_are_loaded_once(self):
+        from rl_model import load_model
+        self.assertIs(load_model("trained_model_1.pth"), load_model("./trained_model_1.pth"))
+        self.assertIsNot(load_model("trained_model_1.pth"), load_model("trained_model_2.pth"))
+
+
+class TestNumpyModel(unittest.TestCase):
+    def test_matches_torch(self):
+        import os
+        import tempfile
+        import torch
+        from numpy_model import NumpyPokerModel
+        from rl_model import load_model
+        states = np.random.default_rng(1).random((500, 10), dtype=np.float32)
+        expected = load_model("trained_model_1.pth")(torch.from_numpy(states)).detach().numpy()
+        for dtype, tolerance in (("float32", 1e-5), ("float16", 1e-3), ("int8", 2e-2)):
+            model = NumpyPokerModel.from_checkpoint("trained_model_1.pth", dtype)
+            np.testing.assert_allclose(model.forward(states), expected, atol=tolerance)
+            np.testing.assert_allclose(model.predict(states[0]), expected[0], atol=tolerance)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.npz")
+            model.save(path)
+            loaded = NumpyPokerModel.from_file(path)
+            self.assertEqual(loaded.dtype, "int8")
+            np.testing.assert_array_equal(loaded.act(states), model.act(states))
+
+    def test_tournament_backends_agree(self):
+        from tournament import play_block
+        checkpoints = ["trained_model_1.pth", "trained_model_2.pth"]
+        torch_result = play_block(checkpoints, num_deals=30, seed=3)
+        numpy_result = play_block(checkpoints, num_deals=30, seed=3, backend="numpy")
+        self.assertEqual(torch_result[0].tolist(), numpy_result[0].tolist())
+
+
+class TestTableServer(unittest.TestCase):
+    def test_many_tables_and_human_timeouts(self):
+        import asyncio
+        import json
+        from server import TableServer, run_load_test
+
+        async def scenario():
+            server = TableServer(num_seats=3, humans=1, human_timeout=0.05, seed=1)
+            listener = await server.serve(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            result = await run_load_test(20, 0.5, port=port)
+
+            # A client that never answers is checked or folded for after the timeout
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            messages = []
+            while sum(message["type"] == "timeout" for message in messages) < 3:
+                messages.append(json.loads(await reader.readline()))
+            writer.close()
+            await server.wait_closed()
+            listener.close()
+            return server, result, messages
+
+        server, result, messages = asyncio.run(scenario())
+        self.assertEqual(server.next_table_id, 21)
+        self.assertFalse(server.tables)
+        self.assertGreater(result["hands_per_second"], 0)
+        self.assertGreater(server.hands_played, 20)
+        hand_start = next(message for message in messages if message["type"] == "hand_start")
+        self.assertEqual(len(hand_start["hole_cards"]), 2)
+        self.assertNotIn("hole_cards", next(message for message in messages if message["type"] == "action"))
+
+    def test_late_reply_is_not_taken_for_the_next_request(self):
+        import asyncio
+        import json
+        from server import TableServer
+
+        async def read_until(reader, kind):
+            while True:
+                message = json.loads(await reader.readline())
+                if message["type"] == kind:
+                    return message
+
+        async def scenario():
+            server = TableServer(num_seats=2, humans=1, human_timeout=0.2, seed=1)
+            listener = await server.serve(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            seat = (await read_until(reader, "seated"))["seat"]
+            first = await read_until(reader, "act")
+            await read_until(reader, "timeout")
+            writer.write(json.dumps({"id": first["id"], "action": "fold"}).encode() + b"\n")
+            second = await read_until(reader, "act")
+            writer.write(json.dumps({"id": second["id"], "action": "raise"}).encode() + b"\n")
+            action = await read_until(reader, "action")
+            while action["seat"] != seat:
+                action = await read_until(reader, "action")
+            writer.close()
+            await server.wait_closed()
+            listener.close()
+            return first, second, action
+
+        first, second, action = asyncio.run(scenario())
+        self.assertGreater(second["id"], first["id"])
+        self.assertTrue(second["can_raise"])
+        self.assertEqual(action["action"], "raise")
+
+    def test_model_bots_keep_a_decision_cache_per_table(self):
+        import asyncio
+        from server import ModelBots, Table
+
+        class Model:
+            def predict(self, state):
+                return np.array([0.2, 0.5, 0.3])
+
+        async def scenario():
+            bots = ModelBots(Model())
+            return bots, [Table(table_id, 3, 1, bots, seed=table_id) for table_id in range(2)]
+
+        bots, tables = asyncio.run(scenario())
+        makers = [[agent.decision_maker for agent in table.engine.agents[1:]] for table in tables]
+        self.assertIs(makers[0][0], makers[0][1])
+        self.assertIsNot(makers[0][0], makers[1][0])
+        self.assertIsNot(makers[0][0].decision_cache, makers[1][0].decision_cache)
+
+    def test_malformed_replies_and_departed_clients(self):
+        import asyncio
+        import json
+        from server import TableServer
+
+        async def read_until(reader, kind):
+            while True:
+                message = json.loads(await reader.readline())
+                if message["type"] == kind:
+                    return message
+
+        async def scenario():
+            server = TableServer(num_seats=3, humans=2, human_timeout=1.0, seed=1)
+            listener = await server.serve(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            # The first client leaves before the table fills up and gives its seat back
+            _, departed = await asyncio.open_connection("127.0.0.1", port)
+            departed.close()
+            await asyncio.sleep(0.05)
+            clients = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+            seats = [(await read_until(reader, "seated"))["seat"] for reader, _ in clients]
+            reader, writer = clients[0]
+            await read_until(reader, "act")
+            writer.write(b'{"action": "raise", "amount": "lots"}\n')
+            error = await read_until(reader, "error")
+            await read_until(reader, "act")
+            writer.write(b'{"action": "shove"}\n')
+            await read_until(reader, "error")
+            for _, client in clients:
+                client.close()
+            await server.wait_closed()
+            listener.close()
+            return server, seats, error
+
+        server, seats, error = asyncio.run(scenario())
+        self.assertEqual(sorted(seats), [0, 1])
+        self.assertIn(error["action"], ("call", "fold"))
+        self.assertEqual(server.next_table_id, 1)  # The departed client did not leave a table behind
+        self.assertFalse(server.tables)
+
+
+class TestDecisionCache(unittest.TestCase):
+    def test_model_decisions_are_cached_until_weights_change(self):
+        import torch
+        from ai_logic import AIDecisionMaker, DecisionCache
+        from rl_model import PokerAIModel
+        torch.manual_seed(0)
+        model = PokerAIModel(input_size=10, action_size=3)
+        cache = DecisionCache(state_step=0.1)
+        ai = AIDecisionMaker(model, decision_cache=cache)
+        state = np.full(10, 0.52, dtype=np.float32)
+        first = ai.decide_action([], [], 0.0, state)
+        self.assertEqual(ai.decide_action([], [], 0.0, state + 0.01), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        model.load_state_dict(PokerAIModel(input_size=10, action_size=3).state_dict())
+        ai.decide_action([], [], 0.0, state)
+        self.assertEqual((cache.hits, cache.misses, cache.invalidations), (1, 2, 1))
+
+    def test_heuristic_decisions_share_suit_isomorphic_hands(self):
+        from ai_logic import AIDecisionMaker, DecisionCache
+        cache = DecisionCache()
+        ai = AIDecisionMaker(decision_cache=cache, seed=0)
+        calls = []
+        estimate = ai.calculate_win_probability
+        ai.calculate_win_probability = lambda *args: calls.append(args) or estimate(*args)
+        board = [Card('2', 'Clubs'), Card('7', 'Diamonds'), Card('Jack', 'Clubs')]
+        ai.decide_action([Card('Ace', 'Hearts'), Card('King', 'Hearts')], board, 0.31)
+        ai.decide_action([Card('Ace', 'Spades'), Card('King', 'Spades')],
+                         [Card('2', 'Clubs'), Card('7', 'Diamonds'), Card('Jack', 'Clubs')], 0.33)
+        self.assertEqual(len(calls), 1)
+        self.assertAlmostEqual(cache.hit_rate(), 0.5)
+
+
+class TestActorLearner(unittest.TestCase):
+    def test_published_weights_are_read_consistently(self):
+        import torch
+        from actor_learner import SharedBlock, publish_weights, read_weights, weight_specs
+        from rl_model import PokerAIModel
+        model = PokerAIModel(input_size=10, action_size=3)
+        shapes = [(name, tuple(tensor.shape)) for name, tensor in model.state_dict().items()]
+        block = SharedBlock(weight_specs(shapes))
+        try:
+            publish_weights(block, model)
+            version, copy = read_weights(block, shapes, -1)
+            self.assertEqual(version, 2)
+            states = np.random.default_rng(0).random((20, 10), dtype=np.float32)
+            np.testing.assert_allclose(copy.forward(states), model(torch.from_numpy(states)).detach().numpy(),
+                                       atol=1e-5)
+            self.assertIsNone(read_weights(block, shapes, version)[1])
+            block.arrays["version"][0] += 1  # An update in progress is skipped
+            self.assertIsNone(read_weights(block, shapes, version)[1])
+        finally:
+            block.close()
+
+    def test_sampling_skips_entries_being_overwritten(self):
+        from actor_learner import SharedBlock, SharedReplayBuffer, replay_specs
+        from replay import ReplayBuffer
+        block = SharedBlock(replay_specs(2, 100))
+        try:
+            names = ("states", "actions", "rewards", "next_states", "dones")
+            for actor, count in ((0, 250), (1, 30)):
+                region = slice(actor * 100, (actor + 1) * 100)
+                writer = ReplayBuffer(100, arrays={name: block.arrays[name][region] for name in names})
+                states = np.zeros((count, 10), dtype=np.float32)
+                writer.add_batch(states, 1000 * actor + np.arange(count), np.zeros(count, dtype=np.float32), states,
+                                 np.zeros(count, dtype=np.float32))
+                block.arrays["written"][actor] = count
+                del writer
+            buffer = SharedReplayBuffer(block, 2, 100, batch_size=4000, seed=0, window=10)
+            self.assertEqual(len(buffer), 80 + 30)
+            actions = buffer.sample()["actions"]
+            # Actor 0 is full: its 20 oldest entries (150..169) are next in line to be overwritten
+            self.assertEqual(set(actions[actions < 1000].tolist()), set(range(170, 250)))
+            self.assertEqual(set(actions[actions >= 1000].tolist()), set(range(1000, 1030)))
+            del buffer, actions
+        finally:
+            block.close()
+
+    def test_training_run_writes_compatible_checkpoint(self):
+        import os
+        import tempfile
+        import torch
+        from actor_learner import run_actor_learner
+        from rl_model import PokerAIModel
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "trained_model_test.pth")
+            result = run_actor_learner(30, output, num_actors=1, tables_per_actor=32, capacity_per_actor=5000,
+                                       batch_size=64, publish_every=10, checkpoint_every=20)
+            model = PokerAIModel(input_size=10, action_size=3)
+            model.load_state_dict(torch.load(output, weights_only=True))
+        self.assertGreater(result["collected_per_second"], 0)
+
+
+class TestHandHistory(unittest.TestCase):
+    def test_round_trip_and_append(self):
+        import os
+        import tempfile
+        from engine import RandomAgent, self_play
+        from hand_history import HandHistoryWriter, read_blocks, read_hands
+
+        events = []
+
+        def recorder(event, **details):
+            if event == "hand_start":
+                # The engine reuses its list of hole cards
+                details["hole_cards"] = list(details["hole_cards"])
+            events.append((event, details))
+
+        agents = [RandomAgent(seed=seat) for seat in range(4)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hands.thh")
+            with HandHistoryWriter(path, listener=recorder, block_hands=16) as writer:
+                self_play(agents, 50, seed=2, listener=writer)
+            with HandHistoryWriter(path, block_hands=16) as writer:
+                self_play(agents, 10, seed=3, listener=writer)
+            hands = list(read_hands(path))
+            self.assertEqual([hand["hand_id"] for hand in hands], list(range(60)))
+            self.assertEqual(sum(len(block) for block, _ in read_blocks(path)), 60)
+
+            deltas = [details["deltas"] for event, details in events if event == "hand_end"]
+            self.assertEqual([hand["deltas"] for hand in hands[:50]], deltas)
+            actions = [details for event, details in events if event == "action"]
+            recorded = [action for hand in hands[:50] for action in hand["actions"] if "blind" not in action[2]]
+            self.assertEqual([(action["seat"], action["action"], action["amount"], action["pot"]) for action in actions],
+                             [(seat, action, amount, pot) for seat, _, action, amount, pot in recorded])
+            starts = [details for event, details in events if event == "hand_start"]
+            self.assertEqual([hand["hole_cards"] for hand in hands[:50]], [start["hole_cards"] for start in starts])
+            self.assertEqual([hand["chips"] for hand in hands[:50]], [start["chips"] for start in starts])
+            self.assertEqual([(hand["small_blind"], hand["big_blind"]) for hand in hands], [(50, 100)] * 60)
+            showdowns = [details["rank"] is not None for event, details in events if event == "win"]
+            self.assertEqual(any(showdowns), any(hand["showdown"] for hand in hands[:50]))
+            for hand in hands:
+                self.assertEqual(sum(hand["deltas"]), 0)
+                self.assertTrue(set(hand["winners"]))
+
+            # A partly written last block is ignored
+            with open(path, "ab") as f:
+                f.write(b"\x05\x00\x00\x00\x00\x00\x00\x00\x01")
+            self.assertEqual(len(list(read_hands(path))), 60)
+
+            # Appending cuts the partial block off before writing new ones
+            with HandHistoryWriter(path, block_hands=16) as writer:
+                self_play(agents, 40, seed=5, listener=writer)
+            hands = list(read_hands(path))
+            self.assertEqual([hand["hand_id"] for hand in hands], list(range(100)))
+            for hand in hands:
+                self.assertEqual(sum(hand["deltas"]), 0)
+
+    def test_player_stats_match_hand_by_hand_counts(self):
+        import os
+        import tempfile
+        from analytics import analyze
+        from engine import RandomAgent, self_play
+        from hand_history import HandHistoryWriter, read_hands
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hands.thh")
+            with HandHistoryWriter(path, block_hands=64) as writer:
+                self_play([RandomAgent(seed=seat) for seat in range(3)], 500, seed=4, listener=writer)
+            hands = list(read_hands(path))
+            report = analyze([path], workers=1).report()
+            self.assertEqual(analyze([path], workers=2).report(), report)
+
+        for seat, stats in enumerate(report):
+            vpip = sum(any(s == seat and street == 0 and action in ("call", "raise")
+                           for s, street, action, _, _ in hand["actions"]) for hand in hands)
+            showdowns = [hand for hand in hands if seat in hand["showdown"]]
+            button = [hand["deltas"][seat] for hand in hands if hand["dealer"] == seat]
+            self.assertEqual(stats["hands"], 500)
+            self.assertAlmostEqual(stats["vpip"], vpip / 500)
+            self.assertAlmostEqual(stats["showdown_win_rate"],
+                                   sum(seat in hand["winners"] for hand in showdowns) / len(showdowns))
+            self.assertAlmostEqual(stats["chips_per_hand_by_position"][2], sum(button) / len(button))
+
+
 if __name__ == '__main__':
     unittest.main()
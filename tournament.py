@@ -0,0 +1,127 @@
+import argparse
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import numpy_model
+from equity import CONFIDENCE_Z, sample_without_replacement
+from hand_evaluator import NUM_CARDS
+from vec_env import OBSERVATION_SIZE, VectorPokerEnv
+
+DEFAULT_CHECKPOINTS = [f"trained_model_{i + 1}.pth" for i in range(5)]
+
+
+def load_policies(checkpoints, backend="torch"):
+    """
+    Loads one batched policy per checkpoint.
+    :param checkpoints: Checkpoint paths (.pth, or .npz exported by numpy_model for the numpy backend).
+    :param backend: 'torch' for BatchInference, or 'numpy' for a torch-free NumpyPokerModel
+                    (.npz files are then loaded without importing torch at all).
+    :return: List of objects with act(states).
+    """
+    if backend == "numpy":
+        return [numpy_model.load(checkpoint) for checkpoint in checkpoints]
+    import torch
+    from inference import BatchInference
+    from rl_model import load_model
+    torch.set_num_threads(1)
+    return [BatchInference(load_model(checkpoint, OBSERVATION_SIZE)) for checkpoint in checkpoints]
+
+
+def play_block(checkpoints, num_deals, seed, stack=1000, small_blind=50, big_blind=100, backend="torch"):
+    """
+    Plays a block of duplicate deals between the given bots, one seat per bot. Every deal is replayed
+    once per seat rotation, so each bot holds every seat's cards once; luck of the deal cancels out.
+    :param checkpoints: Checkpoint paths, one per seat (2 to 9).
+    :param num_deals: Number of distinct deals; num_deals * len(checkpoints) hands are played.
+    :param seed: Seed (or SeedSequence) for the deals.
+    :param backend: Inference backend, see `load_policies`.
+    :return: (per-bot chip totals, per-bot sums of squared per-deal totals, number of deals).
+    """
+    policies = load_policies(checkpoints, backend)
+    num_seats = len(policies)
+    rng = np.random.default_rng(seed)
+    deals = sample_without_replacement(np.arange(NUM_CARDS, dtype=np.int8), num_deals, 2 * num_seats + 5, rng)
+
+    # Table d * num_seats + r replays deal d with every bot moved r seats on
+    rotation = np.tile(np.arange(num_seats), num_deals)
+    bot_at_seat = (np.arange(num_seats)[None, :] + rotation[:, None]) % num_seats
+    env = VectorPokerEnv(num_deals * num_seats, num_seats, stack, small_blind, big_blind, auto_reset=False)
+    observations = env.reset(np.repeat(deals, num_seats, axis=0), np.repeat(np.arange(num_deals) % num_seats, num_seats))
+    actions = np.zeros(env.num_tables, dtype=np.int64)
+    results = np.zeros((env.num_tables, num_seats), dtype=np.int64)
+    while not env.finished.all():
+        live = np.flatnonzero(~env.finished)
+        bots = bot_at_seat[live, env.seat[live]]
+        for bot, policy in enumerate(policies):
+            rows = live[bots == bot]
+            if rows.size:
+                actions[rows] = policy.act(observations[rows])
+        observations, rewards, _ = env.step(actions)
+        results += rewards
+
+    per_deal = np.zeros((num_deals, num_seats), dtype=np.int64)
+    np.add.at(per_deal, (np.repeat(np.arange(num_deals), num_seats)[:, None], bot_at_seat), results)
+    return per_deal.sum(axis=0), (per_deal.astype(np.float64) ** 2).sum(axis=0), num_deals
+
+
+def run_tournament(checkpoints, num_hands, block_deals=2000, workers=None, seed=0, big_blind=100, backend="torch"):
+    """
+    Splits the tournament into independently seeded blocks over a process pool and merges the results.
+    :param checkpoints: Checkpoint paths, one per seat.
+    :param num_hands: Approximate number of hands in total (rounded up to whole duplicate blocks).
+    :param block_deals: Deals per work item.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param backend: Inference backend, see `load_policies`.
+    :return: List of (checkpoint, hands, bb/100, 95% confidence half-width) per bot.
+    """
+    num_seats = len(checkpoints)
+    if not 2 <= num_seats <= 9:
+        raise ValueError("A tournament needs between 2 and 9 checkpoints.")
+    num_blocks = max(1, math.ceil(num_hands / (block_deals * num_seats)))
+    seeds = np.random.SeedSequence(seed).spawn(num_blocks)
+    totals = np.zeros(num_seats)
+    totals_sq = np.zeros(num_seats)
+    deals = 0
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_block, checkpoints, block_deals, block_seed, big_blind=big_blind,
+                                   backend=backend)
+                   for block_seed in seeds]
+        for future in futures:
+            block_totals, block_totals_sq, block_count = future.result()
+            totals += block_totals
+            totals_sq += block_totals_sq
+            deals += block_count
+
+    mean = totals / deals
+    stderr = np.sqrt(np.maximum(totals_sq / deals - mean ** 2, 0.0) / deals)
+    # Each deal is worth num_seats hands per bot; express results in big blinds per 100 hands
+    scale = 100.0 / (num_seats * big_blind)
+    return [(checkpoint, deals * num_seats, mean[i] * scale, CONFIDENCE_Z * stderr[i] * scale)
+            for i, checkpoint in enumerate(checkpoints)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded duplicate hands between model checkpoints.")
+    parser.add_argument("checkpoints", nargs="*", default=DEFAULT_CHECKPOINTS)
+    parser.add_argument("--hands", type=int, default=1000000, help="Approximate total number of hands")
+    parser.add_argument("--block-deals", type=int, default=2000, help="Deals per work item")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("torch", "numpy"), default="torch")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_tournament(args.checkpoints, args.hands, args.block_deals, args.workers, args.seed,
+                             backend=args.backend)
+    elapsed = time.perf_counter() - start
+    hands = results[0][1]
+    print(f"{hands} hands per bot in {elapsed:.1f}s ({hands / elapsed:.0f} hands/second)")
+    for checkpoint, _, win_rate, margin in sorted(results, key=lambda result: -result[2]):
+        print(f"{checkpoint}: {win_rate:+.2f} +/- {margin:.2f} bb/100")
+
+
+if __name__ == "__main__":
+    main()
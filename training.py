@@ -0,0 +1,108 @@
+import argparse
+import copy
+import time
+
+import torch
+import torch.nn as nn
+
+from inference import BatchInference
+from replay import ReplayBuffer, RolloutCollector
+from rl_model import PokerAIModel
+from vec_env import VectorPokerEnv
+
+
+class QTrainer:
+    def __init__(self, model, learning_rate=1e-3, discount_factor=0.99, target_update=500):
+        """
+        Minibatch Q-learning with a target network.
+        :param model: The PokerAIModel to train.
+        :param learning_rate: Adam learning rate.
+        :param discount_factor: Discount applied to the next state's value.
+        :param target_update: Number of training steps between target network refreshes.
+        """
+        self.model = model
+        self.target = copy.deepcopy(model)
+        self.target.eval()
+        self.optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+        self.loss_fn = nn.MSELoss()
+        self.discount_factor = discount_factor
+        self.target_update = target_update
+        self.steps = 0
+
+    def train_step(self, buffer):
+        """
+        Performs one gradient step on a minibatch sampled from `buffer`.
+        :return: The loss value.
+        """
+        batch = buffer.sample()
+        states = torch.from_numpy(batch["states"])
+        actions = torch.from_numpy(batch["actions"])
+        rewards = torch.from_numpy(batch["rewards"])
+        next_states = torch.from_numpy(batch["next_states"])
+        dones = torch.from_numpy(batch["dones"])
+
+        q_values = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        with torch.no_grad():
+            max_next_q = self.target(next_states).max(dim=1).values
+            targets = rewards + self.discount_factor * max_next_q * (1.0 - dones)
+        loss = self.loss_fn(q_values, targets)
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+
+        self.steps += 1
+        if self.steps % self.target_update == 0:
+            self.target.load_state_dict(self.model.state_dict())
+        return loss.item()
+
+    def train(self, buffer, num_steps):
+        """
+        Runs `num_steps` minibatch updates.
+        :return: Dictionary with the final loss, elapsed seconds and transitions trained per second.
+        """
+        start = time.perf_counter()
+        loss = None
+        for _ in range(num_steps):
+            loss = self.train_step(buffer)
+        elapsed = time.perf_counter() - start
+        transitions = num_steps * len(buffer.batch["actions"])
+        return {"loss": loss, "seconds": elapsed,
+                "transitions_per_second": transitions / elapsed if elapsed else float("inf")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a PokerAIModel by self-play with minibatch Q-learning.")
+    parser.add_argument("--tables", type=int, default=1024)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--steps-per-iteration", type=int, default=8)
+    parser.add_argument("--updates-per-iteration", type=int, default=8)
+    parser.add_argument("--capacity", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="trained_model_trainer.pth")
+    parser.add_argument("--opponent-model", action="store_true",
+                        help="Add the opponent features to the observations, for `main.py --opponent-model`")
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    env = VectorPokerEnv(args.tables, seed=args.seed, opponent_model=args.opponent_model)
+    model = PokerAIModel(input_size=env.observation_size, action_size=3)
+    buffer = ReplayBuffer(args.capacity, env.observation_size, batch_size=args.batch_size, seed=args.seed)
+    collector = RolloutCollector(env, buffer)
+    trainer = QTrainer(model)
+    policy = BatchInference(model)
+    start = time.perf_counter()
+    collected = trained = 0
+    for _ in range(args.iterations):
+        collected += collector.collect(policy, args.steps_per_iteration)
+        if len(buffer) >= args.batch_size:
+            trainer.train(buffer, args.updates_per_iteration)
+            trained += args.updates_per_iteration * args.batch_size
+    elapsed = time.perf_counter() - start
+    torch.save(model.state_dict(), args.output)
+    print(f"Collected {collected} and trained on {trained} transitions in {elapsed:.1f}s "
+          f"({trained / elapsed:.0f} transitions/second trained). Model saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import itertools
 import logging
-from collections import Counter
-from game_mechanics import Card
+import numbers
+from hand_evaluator import evaluate, hand_category, hand_tie_break
 
 # Hand rankings based on Texas Hold'em rules
 HAND_RANKS = {
@@ -16,6 +16,37 @@ HAND_RANKS = {
     "Straight Flush": 9,
     "Royal Flush": 10
 }
+HAND_NAMES = {value: name for name, value in HAND_RANKS.items()}
+
+
+def card_to_int(card):
+    """
+    Converts a Card object to its integer encoding (rank_index * 4 + suit_index).
+    :param card: Card object.
+    :return: Integer in 0..51.
+    """
+    return card.id
+
+
+def cards_to_ints(cards):
+    """
+    Converts a list of Card objects to their integer encodings.
+    """
+    return [card.id for card in cards]
+
+
+def hand_rank(hand, community_cards):
+    """
+    Computes the integer rank of a player's best hand. Ranks form a total order:
+    the higher rank wins and equal ranks split the pot, so kickers are always respected.
+    :param hand: List of 2 Card objects (player's hole cards)
+    :param community_cards: List of 3 to 5 Card objects (community cards)
+    :return: Integer hand rank in 1..7462.
+    """
+    all_cards = hand + community_cards
+    if len(all_cards) < 5:
+        raise ValueError("Insufficient cards to evaluate hand strength.")
+    return evaluate(cards_to_ints(all_cards))
 
 
 def calculate_hand_strength(hand, community_cards):
@@ -27,95 +58,80 @@ def calculate_hand_strength(hand, community_cards):
              and best_hand is the list of cards representing the strongest hand.
     """
     all_cards = hand + community_cards
-    if len(all_cards) < 5:
-        raise ValueError("Insufficient cards to evaluate hand strength.")
-
-    best_rank = ("High Card", [])
-    for combo in itertools.combinations(all_cards, 5):
-        rank = evaluate_hand(combo)
-        if HAND_RANKS[rank[0]] > HAND_RANKS[best_rank[0]]:
-            best_rank = rank
-    return HAND_RANKS[best_rank[0]], best_rank[1]
+    rank = hand_rank(hand, community_cards)
+    best_hand = next(list(combo) for combo in itertools.combinations(all_cards, 5)
+                     if evaluate(cards_to_ints(combo)) == rank)
+    return hand_category(rank), best_hand
 
 
 def evaluate_hand(cards):
     """
-    Evaluates a single hand (5 cards) to determine its rank.
+    Evaluates a hand of 5 to 7 cards to determine its rank.
     Handles tie-breaking by returning the sorted hand for comparison.
-    :param cards: List of 5 Card objects
+    :param cards: List of 5 to 7 Card objects
     :return: A tuple (rank_name, sorted_hand, rank_value), where rank_name is the hand rank,
-             sorted_hand is the best card sequence, and rank_value is a tuple for tie-breaking.
-    """
-    suits = [card.suit for card in cards]
-    ranks = [card.rank for card in cards]
-    rank_counts = Counter(ranks)
-    sorted_cards = sorted(cards, key=lambda x: Card.RANKS.index(x.rank), reverse=True)
-
-    # Check for flush
-    is_flush = len(set(suits)) == 1
-
-    # Check for straight
-    rank_indices = [Card.RANKS.index(rank) for rank in ranks]
-    rank_indices.sort()
-    is_straight = all(rank_indices[i] - rank_indices[i - 1] == 1 for i in range(1, len(rank_indices)))
-
-    # Check combinations and determine rank value
-    if is_flush and is_straight and sorted_cards[0].rank == "Ace":
-        return "Royal Flush", sorted_cards, (10,)
-    elif is_flush and is_straight:
-        return "Straight Flush", sorted_cards, (9, max(rank_indices))
-    elif 4 in rank_counts.values():
-        four_of_a_kind = [rank for rank, count in rank_counts.items() if count == 4][0]
-        kicker = [rank for rank in ranks if rank != four_of_a_kind][0]
-        return "Four of a Kind", sorted_cards, (8, Card.RANKS.index(four_of_a_kind), Card.RANKS.index(kicker))
-    elif 3 in rank_counts.values() and 2 in rank_counts.values():
-        three_of_a_kind = [rank for rank, count in rank_counts.items() if count == 3][0]
-        pair = [rank for rank, count in rank_counts.items() if count == 2][0]
-        return "Full House", sorted_cards, (7, Card.RANKS.index(three_of_a_kind), Card.RANKS.index(pair))
-    elif is_flush:
-        return "Flush", sorted_cards, tuple(Card.RANKS.index(card.rank) for card in sorted_cards)
-    elif is_straight:
-        return "Straight", sorted_cards, (5, max(rank_indices))
-    elif 3 in rank_counts.values():
-        three_of_a_kind = [rank for rank, count in rank_counts.items() if count == 3][0]
-        kickers = [rank for rank in ranks if rank != three_of_a_kind]
-        kickers.sort(key=lambda x: Card.RANKS.index(x), reverse=True)
-        return "Three of a Kind", sorted_cards, (4, Card.RANKS.index(three_of_a_kind)) + tuple(
-            Card.RANKS.index(k) for k in kickers)
-    elif list(rank_counts.values()).count(2) == 2:
-        pairs = [rank for rank, count in rank_counts.items() if count == 2]
-        pairs.sort(key=lambda x: Card.RANKS.index(x), reverse=True)
-        kicker = [rank for rank in ranks if rank not in pairs][0]
-        return "Two Pair", sorted_cards, (3,) + tuple(Card.RANKS.index(p) for p in pairs) + (Card.RANKS.index(kicker),)
-    elif 2 in rank_counts.values():
-        pair = [rank for rank, count in rank_counts.items() if count == 2][0]
-        kickers = [rank for rank in ranks if rank != pair]
-        kickers.sort(key=lambda x: Card.RANKS.index(x), reverse=True)
-        return "One Pair", sorted_cards, (2, Card.RANKS.index(pair)) + tuple(Card.RANKS.index(k) for k in kickers)
+             sorted_hand is the cards sorted from highest to lowest, and rank_value is a tuple
+             of rank indices (Card.RANKS positions) for tie-breaking within the hand rank.
+    """
+    rank = evaluate(cards_to_ints(cards))
+    sorted_cards = sorted(cards, key=lambda x: x.rank_index, reverse=True)
+    return HAND_NAMES[hand_category(rank)], sorted_cards, hand_tie_break(rank)
+
+
+def compare_hands(hand1, hand2):
+    """
+    Compares two evaluated hands.
+    :param hand1: Integer rank from hand_rank (a Python or NumPy integer, e.g. from evaluate_batch), or a
+                  tuple returned by evaluate_hand.
+    :param hand2: Integer rank from hand_rank, or a tuple returned by evaluate_hand.
+    :return: 1 if hand1 wins, -1 if hand2 wins, 0 for a tie.
+    """
+    if isinstance(hand1, numbers.Integral) and isinstance(hand2, numbers.Integral):
+        key1, key2 = int(hand1), int(hand2)
     else:
-        return "High Card", sorted_cards, tuple(Card.RANKS.index(card.rank) for card in sorted_cards)
+        key1, key2 = _comparison_key(hand1), _comparison_key(hand2)
+    return (key1 > key2) - (key1 < key2)
+
+
+def _comparison_key(hand):
+    """
+    Maps an integer rank or an evaluate_hand tuple to a comparable (category, tie_break) tuple.
+    """
+    if isinstance(hand, numbers.Integral):
+        hand = int(hand)
+        return hand_category(hand), hand_tie_break(hand)
+    rank_name, _, rank_value = hand
+    return HAND_RANKS[rank_name], tuple(rank_value)
 
 
 def log_game_state(state, filename="game_log.txt"):
     """
-    Logs the current state of the game to a file.
+    Logs the current state of the game to a text file, for occasional human-readable logging. Bulk
+    hand logging (self-play, training) should use hand_history.HandHistoryWriter instead.
     :param state: Dictionary containing game state information (e.g., player chips, pot size, community cards).
     :param filename: The file to log the state to.
     """
-    logging.basicConfig(filename=filename, level=logging.INFO, format='%(asctime)s - %(message)s')
-    logging.info(f"Game State: {state}")
+    logger = logging.getLogger(f"game_log.{filename}")
+    if not logger.handlers:
+        handler = logging.FileHandler(filename)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    logger.info("Game State: %s", state)
 
 
 def calculate_pot_odds(player_bet, pot_size, call_amount):
     """
     Calculates the pot odds for a player.
-    :param player_bet: Current bet placed by the player.
+    :param player_bet: Current bet placed by the player (already part of the pot).
     :param pot_size: Total pot size.
     :param call_amount: Amount required to call the current bet.
-    :return: Pot odds as a float (e.g., 0.25 for 25%).
+    :return: Pot odds as a float (e.g., 0.25 for 25%): the share of the pot after calling that the call pays for.
     """
-    total_investment = player_bet + call_amount
-    return total_investment / (pot_size + total_investment)
+    if call_amount <= 0:
+        return 0.0
+    return call_amount / (pot_size + call_amount)
 
 
 def generate_deck_visual(deck):
@@ -0,0 +1,343 @@
+import numpy as np
+
+from equity import load_preflop_table, sample_without_replacement, starting_hand_indices
+from hand_evaluator import MAX_HAND_RANK, NUM_CARDS, evaluate_batch
+from opponent_model import (MAX_BET_SIZE, OPPONENT_FEATURES, PRIOR_BET_SIZE, PRIOR_FOLD_TO_RAISE, PRIOR_RAISE,
+                            PRIOR_WEIGHT)
+
+# Action indices, in the order of the PokerAIModel outputs used by AIDecisionMaker.decide_action
+FOLD, CALL, RAISE = 0, 1, 2
+# Length of the observation vector, matching PokerAIModel(input_size=10)
+OBSERVATION_SIZE = 10
+BOARD_SIZES = (0, 3, 4, 5)
+
+
+class VectorPokerEnv:
+    def __init__(self, num_tables, num_players=6, stack=1000, small_blind=50, big_blind=100, seed=None,
+                 auto_reset=True, opponent_model=False, opponent_decay=0.98):
+        """
+        Steps many No-Limit Hold'em tables at once. All table state lives in NumPy arrays with one
+        row per table (struct-of-arrays), and every table advances by one decision per step.
+        Each hand starts from equal stacks, so a single pot covers every showdown; finished hands
+        are paid out and re-dealt automatically with the button moved on.
+        :param num_tables: Number of tables N.
+        :param num_players: Seats per table P.
+        :param stack: Starting stack of every seat in every hand.
+        :param small_blind: Small blind amount.
+        :param big_blind: Big blind amount, also the (fixed) raise size unit.
+        :param seed: Seed for dealing.
+        :param auto_reset: Re-deal finished hands automatically. When False, a table that finishes its
+                           hand stays idle until the next reset, which allows replaying fixed deals.
+        :param opponent_model: Track every seat's tendencies across hands like opponent_model.OpponentModel
+                               and append its OPPONENT_FEATURES to the observations, for training models
+                               played with `main.py --opponent-model`.
+        :param opponent_decay: Weight kept by past observations of a seat (OpponentModel's decay).
+        """
+        if stack <= big_blind:
+            raise ValueError("The stack must be larger than the big blind.")
+        self.num_tables = num_tables
+        self.num_players = num_players
+        self.stack = stack
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.rng = np.random.default_rng(seed)
+        self.preflop_table = load_preflop_table()
+        self.tables = np.arange(num_tables)
+        self.full_deck = np.arange(NUM_CARDS, dtype=np.int8)
+
+        n, p = num_tables, num_players
+        self.chips = np.zeros((n, p), dtype=np.int64)
+        self.bets = np.zeros((n, p), dtype=np.int64)
+        self.contributed = np.zeros((n, p), dtype=np.int64)
+        self.folded = np.zeros((n, p), dtype=bool)
+        self.all_in = np.zeros((n, p), dtype=bool)
+        self.acted = np.zeros((n, p), dtype=bool)
+        self.hole_cards = np.zeros((n, p, 2), dtype=np.int8)
+        self.board = np.zeros((n, 5), dtype=np.int8)
+        self.street = np.zeros(n, dtype=np.int64)
+        self.seat = np.zeros(n, dtype=np.int64)
+        self.dealer = np.arange(n, dtype=np.int64) % p
+        self.pot = np.zeros(n, dtype=np.int64)
+        self.highest_bet = np.zeros(n, dtype=np.int64)
+        self.last_raise = np.zeros(n, dtype=np.int64)
+        self.pending = np.zeros(n, dtype=np.int64)
+        self.num_active = np.zeros(n, dtype=np.int64)
+        self.num_can_act = np.zeros(n, dtype=np.int64)
+        self.observation_size = OBSERVATION_SIZE + (OPPONENT_FEATURES if opponent_model else 0)
+        self.observations = np.zeros((n, self.observation_size), dtype=np.float32)
+        self.finished = np.zeros(n, dtype=bool)
+        self.auto_reset = auto_reset
+        self.hands_played = 0
+
+        # Decayed per-seat counts of the opponent model, kept across hands
+        self.opponent_model = opponent_model
+        self.opponent_decay = opponent_decay
+        if opponent_model:
+            self.fold_chances = np.zeros((n, p))
+            self.folds = np.zeros((n, p))
+            self.street_actions = np.zeros((n, 4, p))
+            self.street_raises = np.zeros((n, 4, p))
+            self.raise_count = np.zeros((n, p))
+            self.raise_sizes = np.zeros((n, p))
+            # Whether somebody raised on the current street (blinds do not count)
+            self.raised = np.zeros(n, dtype=bool)
+
+    def reset(self, cards=None, dealers=None):
+        """
+        Deals a fresh hand at every table.
+        :param cards: Optional array of shape (N, 2 * P + 5) with the cards to deal at each table:
+                      seat i gets columns 2i and 2i + 1 and the last five columns form the board.
+        :param dealers: Optional array of shape (N,) with the dealer seat at each table.
+        :return: Observations of shape (N, observation_size) for the seat to act at each table (see `observe`).
+        """
+        if dealers is not None:
+            self.dealer[:] = dealers
+        self.finished[:] = False
+        self._start_hands(self.tables, cards)
+        return self.observe()
+
+    def step(self, actions):
+        """
+        Applies one action at every table for the seat whose turn it is.
+        :param actions: Integer array of shape (N,) with FOLD, CALL or RAISE. Folding when nothing is
+                        owed checks; a raise that is not allowed calls. Raises are min-raises.
+                        Entries for finished tables (auto_reset=False) are ignored.
+        :return: (observations, rewards, dones): observations (N, observation_size) for the next seat to act,
+                 rewards (N, P) chip results of hands finished by this step and dones (N,) flags
+                 for those tables, which already hold a newly dealt hand when auto_reset is on.
+        """
+        t = self.tables if self.auto_reset else np.flatnonzero(~self.finished)
+        actions = np.asarray(actions)[t]
+        s = self.seat[t]
+        bets = self.bets[t, s]
+        chips = self.chips[t, s]
+        highest_bet = self.highest_bet[t]
+        last_raise = self.last_raise[t]
+        owed = highest_bet - bets
+
+        raising = (actions == RAISE) & ~self.acted[t, s] & (chips > owed) & (self.num_can_act[t] > 1)
+        folding = (actions == FOLD) & (owed > 0)
+        calling = ~raising & ~folding
+        raise_to = np.minimum(highest_bet + last_raise, bets + chips)
+        pay = np.where(raising, raise_to - bets, np.where(calling, np.minimum(owed, chips), 0))
+        if self.opponent_model:
+            self._record_actions(t, s, raising, folding, owed > 0, pay)
+
+        self.chips[t, s] = chips - pay
+        self.bets[t, s] = bets + pay
+        self.contributed[t, s] += pay
+        self.pot[t] += pay
+        went_all_in = (pay > 0) & (pay == chips)
+        self.all_in[t, s] |= went_all_in
+        self.folded[t, s] |= folding
+        self.num_active[t] -= folding
+        self.num_can_act[t] -= went_all_in | folding
+
+        # A full raise reopens the betting for every other seat
+        full_raise = raising & (raise_to - highest_bet >= last_raise)
+        self.last_raise[t] = np.where(full_raise, raise_to - highest_bet, last_raise)
+        self.acted[t[full_raise]] = False
+        self.highest_bet[t] = np.where(raising, raise_to, highest_bet)
+        self.acted[t, s] = True
+        self.pending[t] = np.where(raising, self.num_can_act[t] - ~went_all_in, self.pending[t] - 1)
+
+        rewards, dones = self._advance(t)
+        return self.observe(), rewards, dones
+
+    def _record_actions(self, rows, seats, raising, folding, owing, pay):
+        """
+        Updates the opponent statistics of the acting seats with OpponentModel.on_action's rules,
+        before the actions are applied.
+        """
+        decay = self.opponent_decay
+        faced = self.raised[rows] & owing
+        self.fold_chances[rows, seats] = np.where(faced, self.fold_chances[rows, seats] * decay + 1.0,
+                                                  self.fold_chances[rows, seats])
+        self.folds[rows, seats] = np.where(faced, self.folds[rows, seats] * decay + folding, self.folds[rows, seats])
+        street = self.street[rows]
+        self.street_actions[rows, street, seats] = self.street_actions[rows, street, seats] * decay + 1.0
+        self.street_raises[rows, street, seats] = self.street_raises[rows, street, seats] * decay + raising
+        pot_before = np.maximum(self.pot[rows], 1)
+        self.raise_count[rows, seats] = np.where(raising, self.raise_count[rows, seats] * decay + 1.0,
+                                                 self.raise_count[rows, seats])
+        self.raise_sizes[rows, seats] = np.where(raising, self.raise_sizes[rows, seats] * decay + pay / pot_before,
+                                                 self.raise_sizes[rows, seats])
+        self.raised[rows] |= raising
+
+    def _start_hands(self, rows, cards=None):
+        """
+        Resets stacks, deals (random cards unless `cards` is given) and posts blinds at the given tables.
+        """
+        p = self.num_players
+        self.chips[rows] = self.stack
+        self.bets[rows] = 0
+        self.contributed[rows] = 0
+        self.folded[rows] = False
+        self.all_in[rows] = False
+        self.acted[rows] = False
+        if cards is None:
+            cards = sample_without_replacement(self.full_deck, rows.size, 2 * p + 5, self.rng)
+        self.hole_cards[rows] = cards[:, :2 * p].reshape(rows.size, p, 2)
+        self.board[rows] = cards[:, 2 * p:]
+
+        dealer = self.dealer[rows]
+        small_blind_seat = dealer if p == 2 else (dealer + 1) % p
+        big_blind_seat = (small_blind_seat + 1) % p
+        for seat, amount in ((small_blind_seat, self.small_blind), (big_blind_seat, self.big_blind)):
+            self.chips[rows, seat] -= amount
+            self.bets[rows, seat] = amount
+            self.contributed[rows, seat] = amount
+        self.pot[rows] = self.small_blind + self.big_blind
+        self.highest_bet[rows] = self.big_blind
+        self.last_raise[rows] = self.big_blind
+        self.street[rows] = 0
+        self.num_active[rows] = p
+        self.num_can_act[rows] = p
+        self.pending[rows] = p
+        self.seat[rows] = (big_blind_seat + 1) % p
+        if self.opponent_model:
+            self.raised[rows] = False
+
+    def _next_seat(self, rows, after):
+        """
+        First seat after `after` at each table that has neither folded nor gone all-in.
+        """
+        p = self.num_players
+        candidates = (after[:, None] + 1 + np.arange(p)) % p
+        can_act = ~(self.folded[rows[:, None], candidates] | self.all_in[rows[:, None], candidates])
+        return candidates[np.arange(rows.size), can_act.argmax(axis=1)]
+
+    def _advance(self, rows):
+        """
+        Moves the turn on after an action: to the next seat, the next street, or the showdown.
+        :return: (rewards, dones) for hands finished along the way.
+        """
+        rewards = np.zeros((self.num_tables, self.num_players), dtype=np.int64)
+        dones = np.zeros(self.num_tables, dtype=bool)
+        while rows.size:
+            moving = rows[(self.pending[rows] > 0) & (self.num_active[rows] > 1)]
+            if moving.size:
+                self.seat[moving] = self._next_seat(moving, self.seat[moving])
+                # A lone seat able to act that owes nothing has nobody left to bet against
+                lone = (self.num_can_act[moving] == 1) & (self.bets[moving, self.seat[moving]] >= self.highest_bet[moving])
+                self.pending[moving[lone]] = 0
+
+            over = rows[(self.pending[rows] <= 0) | (self.num_active[rows] <= 1)]
+            ending = (self.num_active[over] == 1) | (self.street[over] == 3)
+            if ending.any():
+                self._finish(over[ending], rewards, dones)
+            rows = over[~ending]
+            if rows.size:
+                self.street[rows] += 1
+                self.bets[rows] = 0
+                self.acted[rows] = False
+                self.highest_bet[rows] = 0
+                self.last_raise[rows] = self.big_blind
+                self.pending[rows] = self.num_can_act[rows]
+                self.seat[rows] = self.dealer[rows]
+                if self.opponent_model:
+                    self.raised[rows] = False
+        return rewards, dones
+
+    def _finish(self, rows, rewards, dones):
+        """
+        Pays the pot to the best hands at the given tables, records the results and deals again.
+        """
+        p = self.num_players
+        hands = np.empty((rows.size, p, 7), dtype=np.int8)
+        hands[:, :, :2] = self.hole_cards[rows]
+        hands[:, :, 2:] = self.board[rows, None, :]
+        ranks = evaluate_batch(hands.reshape(-1, 7)).reshape(rows.size, p).astype(np.int64)
+        ranks[self.folded[rows]] = -1
+        winners = ranks == ranks.max(axis=1, keepdims=True)
+        count = winners.sum(axis=1)
+        share = self.pot[rows] // count
+        odd_chips = self.pot[rows] - share * count
+        self.chips[rows] += winners * share[:, None]
+        # Odd chips go to the first winner clockwise from the dealer, as in HandEngine
+        order = (self.dealer[rows, None] + 1 + np.arange(p)) % p
+        first_winner = order[np.arange(rows.size), winners[np.arange(rows.size)[:, None], order].argmax(axis=1)]
+        self.chips[rows, first_winner] += odd_chips
+
+        rewards[rows] = self.chips[rows] - self.stack
+        dones[rows] = True
+        self.hands_played += rows.size
+        if self.auto_reset:
+            self.dealer[rows] = (self.dealer[rows] + 1) % p
+            self._start_hands(rows)
+        else:
+            self.finished[rows] = True
+
+    def observe(self):
+        """
+        Encodes the situation of the seat to act at every table into the reused (N, observation_size)
+        float32 buffer: hand strength, pot odds, stack-to-pot ratio, position, street, active opponents,
+        call cost relative to the stack, stack, highest bet and pot (the last three relative to the
+        starting stack), followed by the opponent features when the opponent model is on.
+        The buffer is overwritten by the next call; copy it to keep it.
+        """
+        t, s = self.tables, self.seat
+        p = self.num_players
+        obs = self.observations
+        owed = (self.highest_bet - self.bets[t, s]).astype(np.float32)
+        chips = self.chips[t, s].astype(np.float32)
+        pot = self.pot.astype(np.float32)
+
+        obs[:, 0] = self._hand_strength()
+        obs[:, 1] = owed / (pot + owed)
+        obs[:, 2] = np.minimum(chips / pot, 10.0) / 10.0
+        obs[:, 3] = ((s - self.dealer - 1) % p) / max(1, p - 1)
+        obs[:, 4] = self.street / 3.0
+        obs[:, 5] = (self.num_active - 1) / max(1, p - 1)
+        obs[:, 6] = np.minimum(owed / np.maximum(chips, 1.0), 1.0)
+        obs[:, 7] = chips / self.stack
+        obs[:, 8] = self.highest_bet / self.stack
+        obs[:, 9] = pot / (p * self.stack)
+        if self.opponent_model:
+            self._opponent_features(obs[:, OBSERVATION_SIZE:])
+        return obs
+
+    def _opponent_features(self, out):
+        """
+        Writes OpponentModel.features for the seat to act at every table: average fold-to-raise
+        frequency, average and highest raise frequency on the current street, and average raise size
+        of the opponents still in the hand, or the priors when none are left.
+        """
+        t, s = self.tables, self.seat
+        others = ~self.folded
+        others[t, s] = False
+        count = others.sum(axis=1)
+        alone = count == 0
+        count = np.maximum(count, 1)
+        fold = (self.folds + PRIOR_WEIGHT * PRIOR_FOLD_TO_RAISE) / (self.fold_chances + PRIOR_WEIGHT)
+        frequency = ((self.street_raises[t, self.street] + PRIOR_WEIGHT * PRIOR_RAISE)
+                     / (self.street_actions[t, self.street] + PRIOR_WEIGHT))
+        size = (self.raise_sizes + PRIOR_WEIGHT * PRIOR_BET_SIZE) / (self.raise_count + PRIOR_WEIGHT)
+        out[:, 0] = np.where(alone, PRIOR_FOLD_TO_RAISE, (fold * others).sum(axis=1) / count)
+        out[:, 1] = np.where(alone, PRIOR_RAISE, (frequency * others).sum(axis=1) / count)
+        out[:, 2] = np.where(alone, PRIOR_RAISE, (frequency * others).max(axis=1))
+        out[:, 3] = np.minimum(np.where(alone, PRIOR_BET_SIZE, (size * others).sum(axis=1) / count),
+                               MAX_BET_SIZE) / MAX_BET_SIZE
+
+    def _hand_strength(self):
+        """
+        Preflop equity from the preflop table (0.5 without it); afterwards the normalized rank
+        of the seat's current made hand.
+        """
+        t, s = self.tables, self.seat
+        hole = self.hole_cards[t, s].astype(np.int64)
+        strength = np.zeros(self.num_tables, dtype=np.float32)
+        preflop = self.street == 0
+        if preflop.any():
+            if self.preflop_table is None:
+                strength[preflop] = 0.5
+            else:
+                index = starting_hand_indices(hole[preflop, 0], hole[preflop, 1])
+                opponents = np.clip(self.num_active[preflop] - 1, 1, self.preflop_table.shape[1])
+                strength[preflop] = self.preflop_table[index, opponents - 1]
+        for street in (1, 2, 3):
+            rows = np.flatnonzero(self.street == street)
+            if rows.size:
+                cards = np.hstack((hole[rows], self.board[rows, :BOARD_SIZES[street]]))
+                strength[rows] = evaluate_batch(cards) / MAX_HAND_RANK
+        return strength